@@ -0,0 +1,57 @@
+import random
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from shared.libs.hashing import AlphaId, AlphaIdCollection
+
+
+class Command(BaseCommand):
+    help = ('Compare the worker start-up cost of preloading AlphaIds against the lazy LRU caches and report the '
+            'per-call cost of cold and cached encode/decode')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--preload', type=int, default=100000,
+                            help='number of ids the old import-time preload encoded')
+        parser.add_argument('--calls', type=int, default=20000, help='number of encode/decode calls to time')
+
+    def handle(self, *args, **options):
+        AlphaIdCollection.cache_clear()
+        AlphaId.get_codec.cache_clear()
+
+        # what every worker used to pay at import: encode the first ids and fill both caches.
+        tracemalloc.start()
+        started = time.perf_counter()
+        preloaded_encoded, preloaded_decoded = {}, {}
+        for number in range(options['preload']):
+            encoded = AlphaId.compute_encoded(number)
+            preloaded_encoded[number] = encoded
+            preloaded_decoded[encoded] = number
+        preload_seconds = time.perf_counter() - started
+        _, preload_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del preloaded_encoded, preloaded_decoded
+
+        # what a worker pays now before serving its first id.
+        AlphaId.get_codec.cache_clear()
+        started = time.perf_counter()
+        AlphaId.decode(AlphaId.encode(1))
+        first_call_seconds = time.perf_counter() - started
+
+        numbers = [random.randrange(options['preload'] * 10) for _ in range(options['calls'])]
+        AlphaIdCollection.cache_clear()
+        started = time.perf_counter()
+        encoded = [AlphaId.encode(number) for number in numbers]
+        [AlphaId.decode(string) for string in encoded]
+        cold_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        [AlphaId.decode(AlphaId.encode(number)) for number in numbers]
+        warm_seconds = time.perf_counter() - started
+
+        self.stdout.write(f"import-time preload of {options['preload']} ids: {preload_seconds * 1000:.1f} ms, "
+                          f"{preload_peak / 1024 / 1024:.1f} MB")
+        self.stdout.write(f"lazy start-up (alphabet + first encode/decode): {first_call_seconds * 1000:.3f} ms")
+        self.stdout.write(f"encode+decode per call, uncached: {cold_seconds / options['calls'] * 1e6:.2f} us, "
+                          f"cached: {warm_seconds / options['calls'] * 1e6:.2f} us")
+        self.stdout.write(f"cache counters: {AlphaIdCollection.cache_info()}")
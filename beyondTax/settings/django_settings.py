@@ -158,7 +158,12 @@ CSRF_TRUSTED_ORIGINS = ['https://*.beyondtaxindia.com']
 
 INJECTION_MAPPINGS = PROJECT_APPS + ["shared"]
 
-PRELOAD_ALPHAID_LIMIT = 100000
+# size of each of the AlphaId encode/decode LRU caches
+ALPHAID_CACHE_SIZE = 100000
+
+# processes AIS and 26AS page text is extracted with, shards of PDF_PARSE_SHARD_PAGES pages go to each process
+PDF_PARSE_PROCESSES = 1
+PDF_PARSE_SHARD_PAGES = 25
 
 DATETIME_INPUT_FORMATS = base_settings.BASE_INPUT_DATETIME_FORMATS
 TIME_INPUT_FORMATS = base_settings.BASE_TIME_INPUT_FORMATS
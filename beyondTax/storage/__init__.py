@@ -0,0 +1,10 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.module_loading import import_string
+
+
+def private_storage():
+    # files only ever served through authenticated views, local media when S3 isn't configured.
+    if hasattr(settings, 'PRIVATE_FILE_STORAGE'):
+        return import_string(settings.PRIVATE_FILE_STORAGE)()
+    return default_storage
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class IncometaxConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'services.incomeTax'
+
+    def ready(self):
+        from services.incomeTax import signals  # noqa: F401
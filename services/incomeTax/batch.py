@@ -0,0 +1,232 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from services.incomeTax.models import SalaryIncome, RentalIncome, CapitalGains, BusinessIncome, InterestIncome, \
+    DividendIncome, IncomeFromBetting, ExemptIncome, AgricultureIncome, Deductions, TdsOrTcsDeduction, \
+    SelfAssesmentAndAdvanceTaxPaid
+from services.incomeTax.slabs import SlabTable
+
+
+class BatchTaxCalculations:
+    """
+    Vectorized counterpart of IncomeTaxCalculations.calculate_dual_regime for many returns of one year.
+
+    Every return becomes one row of a pandas frame holding its income heads, deductions and taxes paid, and the
+    slabs, rebate, surcharge, cess, interest u/s 234A/B/C and the 234F penalty are evaluated on whole columns.
+    Amounts are float64, results are rounded like IncomeTaxCalculations.round_off_decimal.
+    """
+    DEDUCTION_80C_FIELDS = ['life_insurance', 'provident_fund', 'elss_mutual_fund', 'home_loan_repayment',
+                            'tution_fees', 'stamp_duty_paid', 'others']
+    MEDICAL_FIELDS = ['medical_insurance_self', 'medical_preventive_health_checkup_self', 'medical_expenditure_self',
+                      'medical_insurance_parents', 'medical_preventive_health_checkup_parents',
+                      'medical_expenditure_parents']
+    INSTALLMENTS_234C = [0.15, 0.45, 0.75, 1.00]
+
+    def __init__(self, income_tax_return_year, base_standard_deduction=Decimal('50000')):
+        self.income_tax_return_year = income_tax_return_year
+        self.base_standard_deduction = float(base_standard_deduction)
+
+    def values_frame(self, model, income_tax_return_ids, fields):
+        rows = model.objects.filter(income_tax_return_id__in=income_tax_return_ids).values_list(
+            'income_tax_return_id', *fields)
+        frame = pd.DataFrame.from_records(list(rows), columns=['income_tax_return_id'] + fields)
+        for field in fields:
+            if frame[field].dtype == object and field != 'date':
+                frame[field] = frame[field].fillna(0).astype(float)
+        return frame
+
+    def group_sum(self, frame, column, income_tax_return_ids):
+        return frame.groupby('income_tax_return_id')[column].sum().reindex(income_tax_return_ids, fill_value=0.0)
+
+    def load_frame(self, income_tax_return_ids):
+        """
+        One row per return with every total the computation needs, built from one query per income table.
+        """
+        ids = list(income_tax_return_ids)
+        frame = pd.DataFrame(index=pd.Index(ids, name='income_tax_return_id'))
+
+        salaries = self.values_frame(SalaryIncome, ids, [
+            'gross_salary', 'basic_salary_component', 'hra_component', 'annual_rent_paid',
+            'do_you_live_in_these_cities'])
+        basic_salary = salaries['basic_salary_component']
+        city_based_deduction = np.where(salaries['do_you_live_in_these_cities'].astype(bool), basic_salary * 0.50,
+                                        basic_salary * 0.40)
+        regime_specific_deduction = np.minimum(
+            np.minimum(salaries['hra_component'], city_based_deduction),
+            salaries['annual_rent_paid'] - basic_salary * 0.10)
+        salaries['salary_old'] = salaries['gross_salary'] - (self.base_standard_deduction + regime_specific_deduction)
+        salaries['salary_new'] = salaries['gross_salary'] - self.base_standard_deduction
+        frame['salary_old'] = self.group_sum(salaries, 'salary_old', ids)
+        frame['salary_new'] = self.group_sum(salaries, 'salary_new', ids)
+
+        rentals = self.values_frame(RentalIncome, ids, [
+            'annual_rent', 'standard_deduction', 'interest_on_home_loan_dcp', 'interest_on_home_loan_pc'])
+        rentals['rental'] = rentals['annual_rent'] - (
+            rentals['standard_deduction'] + rentals['interest_on_home_loan_dcp'] + rentals['interest_on_home_loan_pc'])
+        frame['rental'] = self.group_sum(rentals, 'rental', ids)
+        frame['annual_rent'] = self.group_sum(rentals, 'annual_rent', ids)
+
+        capital_gains = self.values_frame(CapitalGains, ids, ['asset_type', 'term_type', 'gain_or_loss'])
+        long_term = capital_gains['term_type'] == CapitalGains.LongTerm
+        capital_gains['ltcg_112a'] = capital_gains['gain_or_loss'].where(
+            long_term & (capital_gains['asset_type'] == CapitalGains.ListedSharesOrMutualFunds), 0.0)
+        capital_gains['ltcg_others'] = capital_gains['gain_or_loss'].where(
+            long_term & (capital_gains['asset_type'] == CapitalGains.HouseProperty), 0.0)
+        capital_gains['stcg'] = capital_gains['gain_or_loss'].where(
+            capital_gains['term_type'] == CapitalGains.ShortTerm, 0.0)
+        for column in ('ltcg_112a', 'ltcg_others', 'stcg'):
+            frame[column] = self.group_sum(capital_gains, column, ids)
+        frame['capital_gains'] = frame['ltcg_112a'] + frame['ltcg_others'] + frame['stcg']
+
+        business = self.values_frame(BusinessIncome, ids, [
+            'gross_receipt_cheq_neft_rtgs_profit', 'gross_receipt_cash_upi_profit'])
+        business['business'] = business['gross_receipt_cheq_neft_rtgs_profit'] + business[
+            'gross_receipt_cash_upi_profit']
+        frame['business'] = self.group_sum(business, 'business', ids)
+
+        interest = self.values_frame(InterestIncome, ids, ['interest_income_type', 'interest_amount'])
+        interest['savings_interest'] = interest['interest_amount'].where(
+            interest['interest_income_type'] == InterestIncome.SavingsBankAccount, 0.0)
+        frame['interest'] = self.group_sum(interest, 'interest_amount', ids)
+        frame['savings_interest'] = self.group_sum(interest, 'savings_interest', ids)
+        frame['dividend'] = self.group_sum(self.values_frame(DividendIncome, ids, ['amount']), 'amount', ids)
+        frame['winnings'] = self.group_sum(self.values_frame(IncomeFromBetting, ids, ['amount']), 'amount', ids)
+        frame['exempt'] = self.group_sum(self.values_frame(ExemptIncome, ids, ['amount']), 'amount', ids)
+        frame['agriculture'] = self.group_sum(
+            self.values_frame(AgricultureIncome, ids, ['net_income']), 'net_income', ids)
+
+        deductions = self.values_frame(Deductions, ids, self.DEDUCTION_80C_FIELDS + [
+            'contribution_by_self', 'contribution_by_employeer'] + self.MEDICAL_FIELDS + ['senior_citizen_parents'])
+        deductions = deductions.set_index('income_tax_return_id').reindex(ids)
+        frame['deduction_80c'] = np.minimum(deductions[self.DEDUCTION_80C_FIELDS].sum(axis=1), 150000.0)
+        frame['nps_contribution'] = deductions['contribution_by_self'].fillna(0) + deductions[
+            'contribution_by_employeer'].fillna(0)
+        medical_limit = np.where(deductions['senior_citizen_parents'].eq(True), 125000.0, 100000.0)
+        frame['medical_premium'] = np.minimum(deductions[self.MEDICAL_FIELDS].sum(axis=1), medical_limit)
+        frame['interest_on_savings'] = np.minimum(frame['savings_interest'], 10000.0)
+        frame['total_deduction'] = (frame['deduction_80c'] + frame['nps_contribution'] + frame['medical_premium'] +
+                                    frame['interest_on_savings'])
+
+        frame['tds_or_tcs'] = self.group_sum(
+            self.values_frame(TdsOrTcsDeduction, ids, ['tds_or_tcs_amount']), 'tds_or_tcs_amount', ids)
+        taxes_paid = self.values_frame(SelfAssesmentAndAdvanceTaxPaid, ids, ['date', 'amount'])
+        within_year = (taxes_paid['date'] >= self.income_tax_return_year.start_date) & (
+            taxes_paid['date'] <= self.income_tax_return_year.end_date)
+        taxes_paid['advance_tax'] = taxes_paid['amount'].where(within_year, 0.0)
+        taxes_paid['self_assessment_tax'] = taxes_paid['amount'].where(~within_year, 0.0)
+        frame['advance_tax'] = self.group_sum(taxes_paid, 'advance_tax', ids)
+        frame['self_assessment_tax'] = self.group_sum(taxes_paid, 'self_assessment_tax', ids)
+        return frame
+
+    def slab_tax(self, slab_table, income):
+        boundaries = np.array([float(b) for b in slab_table.boundaries])
+        rates = np.array([float(r) for r in slab_table.rates])
+        cumulative_tax = np.array([float(t) for t in slab_table.cumulative_tax])
+        i = np.searchsorted(boundaries, income, side='right') - 1
+        slab = np.clip(i, 0, None)
+        return np.where(i < 0, 0.0, cumulative_tax[slab] + (income - boundaries[slab]) * rates[slab])
+
+    def surcharge(self, slab_table, income, tax_liability):
+        thresholds = np.array([float(t) for t in slab_table.surcharge_thresholds])
+        rates = np.array([float(r) for r in slab_table.surcharge_rates])
+        at_threshold = np.array([float(t) for t in slab_table.tax_with_surcharge_at_threshold])
+        # side='left' keeps income exactly at a threshold on the lower rate, like SlabTable.surcharge.
+        i = np.searchsorted(thresholds, income, side='left') - 1
+        band = np.clip(i, 0, None)
+        max_surcharge = at_threshold[band] + (income - thresholds[band]) - tax_liability
+        surcharge = np.maximum(0.0, np.minimum(tax_liability * rates[band], max_surcharge))
+        return np.where(i < 0, 0.0, surcharge)
+
+    def compute_regime(self, frame, regime, filing_date):
+        slab_table = SlabTable.for_year(self.income_tax_return_year, regime)
+        due_date = self.income_tax_return_year.due_date
+        result = pd.DataFrame(index=frame.index)
+        result['salary'] = frame['salary_' + regime]
+        result['gross_total_income'] = (
+            result['salary'] + frame['rental'] + frame['business'] + frame['capital_gains'] + frame['interest'] +
+            frame['dividend'] + frame['winnings'] + frame['exempt'] + frame['agriculture'])
+        result['total_income'] = result['gross_total_income'] - frame['total_deduction']
+        gross_total_income = result['gross_total_income'].to_numpy()
+        tax_liability = self.slab_tax(slab_table, gross_total_income)
+        tax_rebate = np.where(gross_total_income <= float(slab_table.rebate_income_limit),
+                              np.minimum(float(slab_table.max_rebate), tax_liability), 0.0)
+        surcharge = self.surcharge(slab_table, gross_total_income, tax_liability)
+        cess = (tax_liability + surcharge - tax_rebate) * 0.04
+        net_tax_payable = tax_liability + surcharge - tax_rebate + cess
+        advance_tax = frame['advance_tax'].to_numpy()
+        balance_tax_to_be_paid = net_tax_payable - advance_tax - frame['tds_or_tcs'].to_numpy()
+
+        if filing_date > due_date:
+            months_of_delay = (filing_date.year - due_date.year) * 12 + (filing_date.month - due_date.month)
+            interest_234A = balance_tax_to_be_paid * 0.01 * months_of_delay
+        else:
+            interest_234A = np.zeros(len(frame))
+        interest_234B = np.where(advance_tax >= net_tax_payable * 0.90, 0.0, balance_tax_to_be_paid * 0.01 * 9)
+        interest_234C = np.zeros(len(frame))
+        for percent in self.INSTALLMENTS_234C:
+            required_tax = net_tax_payable * percent
+            interest_234C += np.where(advance_tax < required_tax, (required_tax - advance_tax) * 0.01 * 3, 0.0)
+        if filing_date > due_date:
+            late_fee = 5000.0 if filing_date <= filing_date.replace(month=12, day=31) else 10000.0
+            penalty_us_234F = np.where(result['total_income'] <= 500000, 1000.0, late_fee)
+        else:
+            penalty_us_234F = np.zeros(len(frame))
+
+        result['tax_liability'] = tax_liability
+        result['net_tax_payable'] = net_tax_payable
+        result['balance_tax_to_be_paid'] = balance_tax_to_be_paid
+        result['interest_and_penalty'] = interest_234A + interest_234B + interest_234C + penalty_us_234F
+        result['tax_payable'] = balance_tax_to_be_paid + result['interest_and_penalty']
+        return result
+
+    def round_off(self, values):
+        # drop float noise below the paisa-of-a-paisa before rounding half up like round_off_decimal.
+        values = np.round(np.asarray(values, dtype=float), 6)
+        return np.sign(values) * np.floor(np.abs(values) + 0.5)
+
+    def summary_data(self, frame, filing_date):
+        """
+        {income_tax_return_id: summary page payload}, shaped like IncomeTaxCalculations.regime_summary_data.
+        """
+        shared = {
+            "total_rental_income": self.round_off(frame['annual_rent']),
+            "total_capital_gains_income": self.round_off(frame['capital_gains']),
+            "total_income_from_business": self.round_off(frame['business']),
+            "total_of_other_incomes": self.round_off(frame['interest'] + frame['dividend'] + frame['winnings']),
+            "total_exempt_income": self.round_off(frame['exempt'] + frame['agriculture']),
+            "total_deduction_amount": self.round_off(frame['total_deduction']),
+            "tds_or_tcs": self.round_off(frame['tds_or_tcs']),
+            "self_assessment_tax": self.round_off(frame['self_assessment_tax']),
+            "advance_tax": self.round_off(frame['advance_tax']),
+        }
+        regimes = {}
+        for regime in ("old", "new"):
+            result = self.compute_regime(frame, regime, filing_date)
+            regimes[regime + "_regime"] = {
+                "total_income_from_salaries": self.round_off(result['salary']),
+                "gross_total_income": self.round_off(result['gross_total_income']),
+                "total_income": self.round_off(result['total_income']),
+                "tax_liability_at_normal_rates": self.round_off(result['tax_liability']),
+                "net_tax_payable": self.round_off(result['net_tax_payable']),
+                "balance_tax_to_be_paid": self.round_off(result['balance_tax_to_be_paid']),
+                "interest_and_penalty": self.round_off(result['interest_and_penalty']),
+                "tax_payable": self.round_off(result['tax_payable']),
+            }
+
+        key_order = ["total_income_from_salaries", "total_rental_income", "total_capital_gains_income",
+                     "total_income_from_business", "total_of_other_incomes", "total_exempt_income",
+                     "total_deduction_amount", "tds_or_tcs", "self_assessment_tax", "advance_tax",
+                     "gross_total_income", "total_income", "tax_liability_at_normal_rates", "net_tax_payable",
+                     "balance_tax_to_be_paid", "interest_and_penalty", "tax_payable"]
+        summaries = {}
+        for position, income_tax_return_id in enumerate(frame.index):
+            summaries[int(income_tax_return_id)] = {
+                regime: {
+                    key: float(columns[key][position] if key in columns else shared[key][position])
+                    for key in key_order
+                }
+                for regime, columns in regimes.items()
+            }
+        return summaries
@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from services.incomeTax.models import IngestionJob
+from services.incomeTax.parsers import StatementParserRegistry
+from services.incomeTax.serializers import AISPdfUploadSerializer, TdsPdfSerializer, ChallanPdfUploadSerializer, \
+    SalaryIncomeSerializer, RentalIncomeSerializer, BusinessIncomeSerializer, DividendIncomeSerializer, \
+    InterestIncomeSerializer, TdsOrTcsDeductionSerializer, statement_password
+
+
+logger = logging.getLogger(__name__)
+
+
+def claimed(job):
+    """
+    The job's row while it is still running the attempt job was claimed for.
+    """
+    return IngestionJob.objects.filter(id=job.id, status=IngestionJob.Running, attempts=job.attempts)
+
+
+class JobHeartbeat(threading.Thread):
+    """
+    Refreshes a running job's updated_at every interval until stopped, so a slow unlock or a long page doesn't
+    leave the job looking stale to the other workers.
+    """
+
+    def __init__(self, job, interval):
+        super().__init__(name=f"ingestion-job-{job.id}-heartbeat", daemon=True)
+        self.job = job
+        self.interval = interval.total_seconds()
+        self.stopped = threading.Event()
+
+    def run(self):
+        try:
+            while not self.stopped.wait(self.interval):
+                claimed(self.job).update(updated_at=timezone.now())
+        finally:
+            # the thread has its own database connection.
+            connection.close()
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class IngestionJobService:
+    """
+    Database-backed queue of IngestionJob rows.
+
+    IngestionJobCreateApi only calls enqueue(). The run_ingestion_worker processes claim() jobs with
+    SELECT ... FOR UPDATE SKIP LOCKED and run() them, so PDF parsing never holds a web worker. A running job
+    refreshes updated_at every HEARTBEAT_INTERVAL from a JobHeartbeat thread and on every parsed page, one whose
+    worker died stops doing so and is claimed again. A worker whose job was claimed again doesn't finish it.
+    """
+    STALE_AFTER = timedelta(minutes=10)
+    HEARTBEAT_INTERVAL = timedelta(minutes=1)
+    MAX_ATTEMPTS = 3
+
+    def enqueue(self, income_tax_return, document_type, document):
+        return IngestionJob.objects.create(income_tax_return=income_tax_return, document_type=document_type,
+                                           document=document)
+
+    def claim(self):
+        while True:
+            now = timezone.now()
+            with transaction.atomic():
+                job = IngestionJob.objects.select_for_update(skip_locked=True).filter(
+                    Q(status=IngestionJob.Queued) |
+                    Q(status=IngestionJob.Running, updated_at__lt=now - self.STALE_AFTER)
+                ).order_by('created_at').first()
+                if job is None:
+                    return None
+                if job.attempts >= self.MAX_ATTEMPTS:
+                    job.status = IngestionJob.Failed
+                    job.error = "The document could not be processed, please upload it again."
+                    job.finished_at = now
+                    job.save(update_fields=['status', 'error', 'finished_at', 'updated_at'])
+                    continue
+                job.status = IngestionJob.Running
+                job.stage = IngestionJob.Extracting
+                job.attempts += 1
+                job.pages_done = 0
+                job.started_at = now
+                job.save(update_fields=['status', 'stage', 'attempts', 'pages_done', 'started_at', 'updated_at'])
+                return job
+
+    def run(self, job):
+        heartbeat = JobHeartbeat(job, self.HEARTBEAT_INTERVAL)
+        heartbeat.start()
+        try:
+            if job.document_type is None:
+                self.detect_document_type(job)
+            result = self.handlers[job.document_type](self, job)
+        except serializers.ValidationError as e:
+            self.finish(job, IngestionJob.Failed, error=self.error_message(e))
+        except Exception as e:
+            logger.exception("Ingestion job %s failed", job.id)
+            self.finish(job, IngestionJob.Failed, error=self.error_message(e))
+        else:
+            self.finish(job, IngestionJob.Completed, result=result)
+        finally:
+            heartbeat.stop()
+
+    def work(self, poll_interval=2.0, once=False):
+        """
+        Claim and run jobs until the queue is empty when once is set, forever otherwise.
+        """
+        while True:
+            job = self.claim()
+            if job is None:
+                if once:
+                    return
+                time.sleep(poll_interval)
+                continue
+            self.run(job)
+
+    def progress(self, job):
+        def update(pages_done, pages_total):
+            claimed(job).update(pages_done=pages_done, pages_total=pages_total, updated_at=timezone.now())
+        return update
+
+    def set_stage(self, job, stage):
+        job.stage = stage
+        claimed(job).update(stage=stage, updated_at=timezone.now())
+
+    def finish(self, job, status, result=None, error=""):
+        job.status = status
+        job.stage = IngestionJob.Done
+        job.result = result
+        job.error = error
+        job.finished_at = timezone.now()
+        if not claimed(job).update(status=status, stage=job.stage, result=result, error=error,
+                                   finished_at=job.finished_at, updated_at=job.finished_at):
+            logger.warning("Ingestion job %s was claimed again before attempt %s finished", job.id, job.attempts)
+
+    @staticmethod
+    def error_message(error):
+        if isinstance(error, serializers.ValidationError):
+            detail = error.detail
+            if isinstance(detail, list) and detail:
+                return str(detail[0])
+            return str(detail)
+        return "Unable to process the uploaded file."
+
+    def detect_document_type(self, job):
+        with job.document.open('rb') as document:
+            password = statement_password(job.income_tax_return, document)
+            parser = StatementParserRegistry.detect_pdf(document, password)
+        if parser is None:
+            raise serializers.ValidationError("Unable to recognise the uploaded document.")
+        job.document_type = {name: document_type for document_type, name in IngestionJob.DOCUMENT_TYPE_CHOICES}[
+            parser.document_type
+        ]
+        job.save(update_fields=['document_type', 'updated_at'])
+
+    def ingest_ais(self, job, document_type="ais"):
+        serializer = AISPdfUploadSerializer()
+        income_tax_return = job.income_tax_return
+        with job.document.open('rb') as document:
+            password = statement_password(income_tax_return, document, document_type)
+            extracted_data = serializer.extract_data_from_pdf(document, password, progress=self.progress(job),
+                                                              document_type=document_type)
+        if extracted_data is None:
+            raise serializers.ValidationError(f"Unable to extract text from the uploaded {document_type.upper()} file.")
+
+        self.set_stage(job, IngestionJob.Saving)
+        with transaction.atomic():
+            saved_data = serializer.save_extracted_data(extracted_data, income_tax_return)
+        return {
+            "salary": SalaryIncomeSerializer(saved_data["salary"], many=True).data,
+            "rent_received": RentalIncomeSerializer(saved_data["rent_received"], many=True).data,
+            "business_receipts": BusinessIncomeSerializer(saved_data["business_receipts"], many=True).data,
+            "dividends": DividendIncomeSerializer(saved_data["dividends"], many=True).data,
+            "interest_income": InterestIncomeSerializer(saved_data["interest_income"], many=True).data
+        }
+
+    def ingest_tis(self, job):
+        # the TIS extracts the same categories as the AIS and is saved the same way.
+        return self.ingest_ais(job, document_type="tis")
+
+    def ingest_tds(self, job):
+        serializer = TdsPdfSerializer()
+        income_tax_return = job.income_tax_return
+        with job.document.open('rb') as document:
+            password = statement_password(income_tax_return, document, "26as")
+            extracted_data = serializer.extract_tds_details_from_pdf(document, password, progress=self.progress(job))
+
+        self.set_stage(job, IngestionJob.Saving)
+        with transaction.atomic():
+            saved_records = serializer.save_extracted_data(extracted_data, income_tax_return)
+        return TdsOrTcsDeductionSerializer(saved_records, many=True).data
+
+    def ingest_challan(self, job):
+        serializer = ChallanPdfUploadSerializer()
+        with job.document.open('rb') as document:
+            extracted_data = serializer.extract_challan_details_from_pdf(document, progress=self.progress(job))
+
+            self.set_stage(job, IngestionJob.Saving)
+            # the challan keeps its own copy, the job's document can be cleaned up independently.
+            challan_pdf = File(document, name=os.path.basename(job.document.name))
+            return serializer.save_extracted_data(extracted_data, job.income_tax_return, challan_pdf)
+
+    handlers = {
+        IngestionJob.AIS: ingest_ais,
+        IngestionJob.TDS: ingest_tds,
+        IngestionJob.Challan: ingest_challan,
+        IngestionJob.TIS: ingest_tis,
+    }
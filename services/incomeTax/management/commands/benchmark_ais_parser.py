@@ -0,0 +1,70 @@
+import io
+import re
+import time
+import tracemalloc
+
+import fitz
+from django.core.management.base import BaseCommand, CommandError
+
+from services.incomeTax.pdf_corpus import PASSWORD, synthetic_ais
+from services.incomeTax.serializers import AISPdfUploadSerializer
+
+
+def legacy_extract(pdf_file, password):
+    # the parser this command was written to replace: the whole document as one string and one DOTALL scan
+    # per section.
+    doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
+    doc.authenticate(password)
+    text = ""
+    for page_num in range(len(doc)):
+        text += doc.load_page(page_num).get_text("text")
+    patterns = {
+        "salary": r"(\d+)\s+TDS-192\s+Salary received.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
+        "rent_received": r"(\d+)\s+TDS-194I\(b\)\s+Rent received.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
+        "dividends": r"(\d+)\s+TDS-194\[K\]?\s+Dividend received.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
+        "business_receipts": r"(\d+)\s+TDS-194J\s+Receipt of fees.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
+        "interest_income": r"(\d+)\s+SFT-016\(SB\)\s+Interest income.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
+    }
+    return {
+        key: [{"sr_no": int(match[0]), "information_source": match[1], "amount": match[3].replace(',', '')}
+              for match in re.compile(pattern, re.S).findall(text)]
+        for key, pattern in patterns.items()
+    }
+
+
+def measure(extract, content):
+    tracemalloc.start()
+    started = time.perf_counter()
+    extracted_data = extract(io.BytesIO(content), PASSWORD)
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return extracted_data, seconds, peak
+
+
+class Command(BaseCommand):
+    help = 'Compare the streaming AIS parser with whole-document extraction on a synthetic AIS PDF'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=200)
+        parser.add_argument('--processes', type=int, default=1, help='processes the streaming parser extracts with')
+        parser.add_argument('--incomplete-every', type=int, default=0,
+                            help='leave the information source out of every n-th record, the whole-document parser '
+                                 'then attributes it to a later record so the results are not compared')
+
+    def handle(self, *args, **options):
+        content = synthetic_ais(options['pages'], options['incomplete_every']).content
+        serializer = AISPdfUploadSerializer()
+        legacy_data, legacy_seconds, legacy_peak = measure(legacy_extract, content)
+        streamed_data, streamed_seconds, streamed_peak = measure(
+            lambda pdf_file, password: serializer.parse_data_from_pdf(pdf_file, password,
+                                                                      processes=options['processes']),
+            content
+        )
+
+        if not options['incomplete_every'] and streamed_data != legacy_data:
+            raise CommandError("The streaming parser extracted different records than the whole-document parser")
+        records = sum(len(items) for items in streamed_data.values())
+        self.stdout.write(f"{options['pages']} pages, {records} records")
+        self.stdout.write(f"whole document: {legacy_seconds * 1000:.1f} ms, peak {legacy_peak / 1024:.0f} KB")
+        self.stdout.write(f"streaming ({options['processes']} processes): {streamed_seconds * 1000:.1f} ms, peak {streamed_peak / 1024:.0f} KB")
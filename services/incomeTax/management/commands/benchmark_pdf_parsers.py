@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import resource
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from services.incomeTax.parsers import StatementParserRegistry, parse_pdfs
+from services.incomeTax.pdf_corpus import corpus
+
+
+def rss_kb():
+    with open('/proc/self/statm') as statm:
+        return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def run_case(document, processes):
+    # runs in a fresh process, so the peak RSS is this parse's and not a previous one's.
+    rss_before = rss_kb()
+    tracemalloc.start()
+    started = time.perf_counter()
+    if document.document_type == "challan":
+        extracted_data = parse_pdfs("challan", [io.BytesIO(document.content)], document.password,
+                                    processes=processes)[0]
+    else:
+        extracted_data = StatementParserRegistry.get(document.document_type).parse_pdf(
+            io.BytesIO(document.content), document.password, processes=processes
+        )
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_growth = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before, 0)
+    return extracted_data, seconds, peak, rss_growth
+
+
+def record_count(extracted_data):
+    if isinstance(extracted_data, dict) and all(isinstance(items, list) for items in extracted_data.values()):
+        return sum(len(items) for items in extracted_data.values())
+    if isinstance(extracted_data, list):
+        return len(extracted_data)
+    return int(extracted_data is not None)
+
+
+class Command(BaseCommand):
+    help = ('Parse a synthetic AIS, TIS, 26AS and challan corpus at several sizes, report time, pages per second and '
+            'memory of every parser and fail when any of them extracts other records than the corpus expects')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--types', default='ais,tis,26as,challan', help='comma separated document types')
+        parser.add_argument('--sizes', default='1,20,100', help='comma separated page counts')
+        parser.add_argument('--repeat', type=int, default=3, help='runs of every case, the fastest is reported')
+        parser.add_argument('--processes', type=int, default=1, help='processes the parsers extract with')
+        parser.add_argument('--output', help='directory to also write every corpus PDF and its expected data to')
+
+    def handle(self, *args, **options):
+        document_types = [document_type.strip() for document_type in options['types'].split(',')]
+        unknown = [document_type for document_type in document_types
+                   if document_type not in StatementParserRegistry.parsers]
+        if unknown:
+            raise CommandError(f"Unknown document types: {', '.join(unknown)}")
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        if options['output']:
+            os.makedirs(options['output'], exist_ok=True)
+
+        mismatches = []
+        for document in corpus(document_types, sizes):
+            name = f"{document.document_type}-{document.pages}"
+            if options['output']:
+                with open(os.path.join(options['output'], f"{name}.pdf"), 'wb') as pdf:
+                    pdf.write(document.content)
+                with open(os.path.join(options['output'], f"{name}.json"), 'w') as expected:
+                    json.dump(document.expected, expected, cls=DjangoJSONEncoder, indent=2)
+
+            runs = []
+            for _ in range(max(options['repeat'], 1)):
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    runs.append(executor.submit(run_case, document, options['processes']).result())
+            extracted_data = runs[0][0]
+            seconds = min(run[1] for run in runs)
+            peak = max(run[2] for run in runs)
+            rss_growth = max(run[3] for run in runs)
+
+            if extracted_data != document.expected:
+                mismatches.append(name)
+            self.stdout.write(
+                f"{name}: {record_count(extracted_data)} records, {seconds * 1000:.1f} ms, "
+                f"{document.pages / seconds:.0f} pages/s, tracemalloc peak {peak / 1024:.0f} KB, "
+                f"RSS +{rss_growth} KB"
+            )
+
+        if mismatches:
+            raise CommandError(f"Extracted data differs from the corpus for: {', '.join(mismatches)}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from services.incomeTax.models import IncomeTaxReturn, IncomeTaxReturnYears
+from services.incomeTax.services import ReturnTotalsService
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the ReturnTotals row of every return (or every return of a year) from its source tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', help='IncomeTaxReturnYears name, e.g. 2024-2025, defaults to every year')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        income_tax_returns = IncomeTaxReturn.objects.all()
+        if options['year']:
+            try:
+                income_tax_return_year = IncomeTaxReturnYears.objects.get(name=options['year'])
+            except IncomeTaxReturnYears.DoesNotExist:
+                raise CommandError(f"Income tax return year '{options['year']}' does not exist")
+            income_tax_returns = income_tax_returns.filter(income_tax_return_year=income_tax_return_year)
+
+        income_tax_return_ids = list(income_tax_returns.order_by('id').values_list('id', flat=True))
+        started = time.monotonic()
+        ReturnTotalsService().refresh(income_tax_return_ids, batch_size=options['batch_size'])
+        self.stdout.write(f"Rebuilt totals of {len(income_tax_return_ids)} returns in "
+                          f"{time.monotonic() - started:.2f}s")
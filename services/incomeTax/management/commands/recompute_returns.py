@@ -0,0 +1,74 @@
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from services.incomeTax.batch import BatchTaxCalculations
+from services.incomeTax.models import IncomeTaxReturn, IncomeTaxReturnYears, Computations
+from services.incomeTax.services import ComputationCacheService
+from services.incomeTax.snapshot import ReturnSnapshot
+from services.incomeTax.utils import IncomeTaxCalculations
+
+
+class Command(BaseCommand):
+    help = 'Recompute the summary computation of every return of a year with the vectorized batch engine'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', required=True, help='IncomeTaxReturnYears name, e.g. 2024-2025')
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--check-parity', type=int, default=0, metavar='N',
+                            help='compare N returns against the scalar IncomeTaxCalculations path and fail on '
+                                 'any difference over one rupee')
+
+    def handle(self, *args, **options):
+        try:
+            income_tax_return_year = IncomeTaxReturnYears.objects.get(name=options['year'])
+        except IncomeTaxReturnYears.DoesNotExist:
+            raise CommandError(f"Income tax return year '{options['year']}' does not exist")
+
+        batch = BatchTaxCalculations(income_tax_return_year)
+        computation_cache = ComputationCacheService()
+        filing_date = timezone.now().date()
+        returns = list(IncomeTaxReturn.objects.filter(
+            income_tax_return_year=income_tax_return_year
+        ).order_by('id').values_list('id', 'version'))
+
+        started = time.monotonic()
+        summaries = {}
+        for start in range(0, len(returns), options['batch_size']):
+            chunk = returns[start:start + options['batch_size']]
+            frame = batch.load_frame([income_tax_return_id for income_tax_return_id, _ in chunk])
+            chunk_summaries = batch.summary_data(frame, filing_date)
+            with transaction.atomic():
+                computation_cache.bulk_store(Computations.Summary, [
+                    (income_tax_return_id, version, chunk_summaries[income_tax_return_id])
+                    for income_tax_return_id, version in chunk
+                ])
+            if options['check_parity'] > len(summaries):
+                summaries.update(chunk_summaries)
+        self.stdout.write(f"Recomputed {len(returns)} returns of {income_tax_return_year.name} in "
+                          f"{time.monotonic() - started:.2f}s")
+
+        if options['check_parity']:
+            self.check_parity(summaries, options['check_parity'], filing_date)
+
+    def check_parity(self, summaries, limit, filing_date):
+        calc = IncomeTaxCalculations()
+        income_tax_returns = IncomeTaxReturn.objects.select_related(
+            'user', 'income_tax_return_year', 'deductions'
+        ).filter(id__in=list(summaries)[:limit])
+        mismatches = []
+        for income_tax_return in income_tax_returns:
+            computation = calc.calculate_dual_regime(ReturnSnapshot.from_income_tax_return(income_tax_return),
+                                                     Decimal('50000'), filing_date)
+            expected = calc.regime_summary_data(computation)
+            for regime, values in expected.items():
+                for key, value in values.items():
+                    actual = summaries[income_tax_return.id][regime][key]
+                    if abs(actual - value) > 1:
+                        mismatches.append(f"{income_tax_return.id} {regime}.{key}: batch {actual} scalar {value}")
+        if mismatches:
+            raise CommandError("Batch and scalar computations differ:\n" + "\n".join(mismatches))
+        self.stdout.write(f"Parity check passed for {len(income_tax_returns)} returns")
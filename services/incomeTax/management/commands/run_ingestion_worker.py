@@ -0,0 +1,40 @@
+import multiprocessing
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from services.incomeTax.ingestion import IngestionJobService
+
+
+def work(poll_interval, once):
+    IngestionJobService().work(poll_interval=poll_interval, once=once)
+
+
+class Command(BaseCommand):
+    help = 'Parse queued AIS, 26AS and challan uploads in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='seconds to wait when the queue is empty')
+        parser.add_argument('--once', action='store_true', help='exit once the queue is empty')
+
+    def handle(self, *args, **options):
+        if options['processes'] <= 1:
+            work(options['poll_interval'], options['once'])
+            return
+
+        # every worker process opens its own database connection. They are not daemonic so that they can start
+        # their own pool when PDF_PARSE_PROCESSES shards page extraction.
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=work, args=(options['poll_interval'], options['once']))
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from services.incomeTax.reports import ReportArtifactService, REPORTS
+
+
+class Command(BaseCommand):
+    help = 'Re-render stored PDF reports whose return or template changed since they were rendered'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=5.0,
+                            help='seconds to wait when no report is stale')
+        parser.add_argument('--once', action='store_true', help='exit once no report is stale')
+
+    def handle(self, *args, **options):
+        report_service = ReportArtifactService()
+        report_service.pdf_renderer.warm(report.template for report in REPORTS.values())
+        report_service.work(poll_interval=options['poll_interval'], once=options['once'])
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomeTax', '0057_computations'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='computations',
+            name='return_version',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='incometaxreturn',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='computations',
+            name='regime_type',
+            field=models.IntegerField(choices=[(1, 'new'), (2, 'old'), (3, 'summary')]),
+        ),
+        migrations.AddIndex(
+            model_name='computations',
+            index=models.Index(fields=['income_tax_return', 'regime_type'], name='incomeTax_c_income__7ad9ca_idx'),
+        ),
+    ]
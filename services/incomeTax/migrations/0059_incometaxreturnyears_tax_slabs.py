@@ -0,0 +1,26 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:36
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def invalidate_stored_computations(apps, schema_editor):
+    # surcharge is now computed on tax with marginal relief, stored computations are stale.
+    IncomeTaxReturn = apps.get_model('incomeTax', 'IncomeTaxReturn')
+    IncomeTaxReturn.objects.update(version=F('version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomeTax', '0058_computations_return_version_incometaxreturn_version_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='incometaxreturnyears',
+            name='tax_slabs',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.RunPython(invalidate_stored_computations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:48
+
+from collections import defaultdict
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Sum
+
+# ReturnTotals field -> (source model, summed expression), as in services.incomeTax.totals.ReturnTotalsQuery.
+SOURCES = (
+    ('salary_income', 'SalaryIncome', F('gross_salary')),
+    ('rental_income', 'RentalIncome', F('net_rental_income')),
+    ('capital_gains', 'CapitalGains', F('gain_or_loss')),
+    ('business_income', 'BusinessIncome', F('gross_receipt_cheq_neft_rtgs_profit') + F('gross_receipt_cash_upi_profit')),
+    ('agriculture_income', 'AgricultureIncome', F('gross_recipts')),
+    ('exempt_income', 'ExemptIncome', F('amount')),
+    ('interest_income', 'InterestIncome', F('interest_amount')),
+    ('interest_on_it_refunds', 'InterestOnItRefunds', F('amount')),
+    ('dividend_income', 'DividendIncome', F('amount')),
+    ('betting_income', 'IncomeFromBetting', F('amount')),
+    ('tds_or_tcs_amount', 'TdsOrTcsDeduction', F('tds_or_tcs_amount')),
+    ('self_assessment_amount', 'SelfAssesmentAndAdvanceTaxPaid', F('amount')),
+)
+DEDUCTION_FIELDS = (
+    'life_insurance', 'provident_fund', 'elss_mutual_fund', 'home_loan_repayment', 'tution_fees', 'stamp_duty_paid',
+    'others', 'contribution_by_self', 'contribution_by_employeer', 'medical_insurance_self',
+    'medical_preventive_health_checkup_self', 'medical_expenditure_self', 'medical_insurance_parents',
+    'medical_preventive_health_checkup_parents', 'medical_expenditure_parents', 'education_loan',
+    'electronic_vehicle_loan', 'home_loan_amount', 'interest_income', 'royality_on_books', 'income_on_patients',
+    'income_on_bio_degradable', 'rent_paid', 'contribution_to_agnipath', 'donation_to_political_parties',
+    'donation_others',
+)
+
+
+def build_return_totals(apps, schema_editor):
+    ReturnTotals = apps.get_model('incomeTax', 'ReturnTotals')
+    totals = defaultdict(dict)
+    for field, model_name, expression in SOURCES:
+        model = apps.get_model('incomeTax', model_name)
+        rows = model.objects.filter(income_tax_return__isnull=False).order_by().values(
+            'income_tax_return'
+        ).annotate(total=Sum(expression))
+        for row in rows:
+            totals[row['income_tax_return']][field] = row['total'] or Decimal(0)
+    Deductions = apps.get_model('incomeTax', 'Deductions')
+    for deductions in Deductions.objects.filter(income_tax_return__isnull=False).values(
+            'income_tax_return', *DEDUCTION_FIELDS):
+        income_tax_return_id = deductions.pop('income_tax_return')
+        totals[income_tax_return_id]['deductions'] = sum(deductions.values(), Decimal(0))
+    ReturnTotals.objects.bulk_create([
+        ReturnTotals(income_tax_return_id=income_tax_return_id, **fields)
+        for income_tax_return_id, fields in totals.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomeTax', '0059_incometaxreturnyears_tax_slabs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReturnTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('salary_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('rental_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('capital_gains', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('business_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('agriculture_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('exempt_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('interest_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('interest_on_it_refunds', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('dividend_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('betting_income', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('tds_or_tcs_amount', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('self_assessment_amount', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('deductions', models.DecimalField(decimal_places=2, default=0, max_digits=30)),
+                ('income_tax_return', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='totals', to='incomeTax.incometaxreturn')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(build_return_totals, migrations.RunPython.noop),
+    ]
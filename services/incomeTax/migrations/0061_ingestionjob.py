@@ -0,0 +1,38 @@
+# Generated by Django 5.0.3 on 2026-10-18 12:54
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomeTax', '0060_returntotals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('document_type', models.IntegerField(choices=[(1, 'ais'), (2, '26as'), (3, 'challan')])),
+                ('document', models.FileField(upload_to='ingestion_documents/')),
+                ('status', models.IntegerField(choices=[(1, 'queued'), (2, 'running'), (3, 'completed'), (4, 'failed')], default=1)),
+                ('stage', models.IntegerField(choices=[(1, 'received'), (2, 'extracting'), (3, 'saving'), (4, 'done')], default=1)),
+                ('pages_total', models.PositiveIntegerField(default=0)),
+                ('pages_done', models.PositiveIntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('result', models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('income_tax_return', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_jobs', to='incomeTax.incometaxreturn')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'created_at'], name='incomeTax_i_status_838234_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomeTax', '0061_ingestionjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParsedDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('sha256', models.CharField(max_length=64)),
+                ('document_type', models.IntegerField(choices=[(1, 'ais'), (2, '26as')])),
+                ('parser_version', models.PositiveIntegerField()),
+                ('extracted_data', models.JSONField()),
+            ],
+            options={
+                'unique_together': {('sha256', 'document_type', 'parser_version')},
+            },
+        ),
+    ]
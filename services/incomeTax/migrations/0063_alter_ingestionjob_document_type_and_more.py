@@ -0,0 +1,23 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomeTax', '0062_parseddocument'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ingestionjob',
+            name='document_type',
+            field=models.IntegerField(blank=True, choices=[(1, 'ais'), (2, '26as'), (3, 'challan'), (4, 'tis')], null=True),
+        ),
+        migrations.AlterField(
+            model_name='parseddocument',
+            name='document_type',
+            field=models.IntegerField(choices=[(1, 'ais'), (2, '26as'), (3, 'tis')]),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.0.3 on 2026-10-18 13:13
+
+import beyondTax.storage
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incomeTax', '0063_alter_ingestionjob_document_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportArtifact',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('report_type', models.IntegerField(choices=[(1, 'summary'), (2, 'old regime computation'), (3, 'new regime computation')])),
+                ('return_version', models.PositiveIntegerField()),
+                ('template_version', models.PositiveIntegerField()),
+                ('rendered_on', models.DateField()),
+                ('pdf', models.FileField(storage=beyondTax.storage.private_storage, upload_to='reports/')),
+                ('etag', models.CharField(max_length=64)),
+                ('income_tax_return', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='report_artifacts', to='incomeTax.incometaxreturn')),
+            ],
+            options={
+                'unique_together': {('income_tax_return', 'report_type')},
+            },
+        ),
+    ]
@@ -1,8 +1,10 @@
 from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import RegexValidator
 from django.db import models
 from django.utils.text import slugify
 from beyondTax import settings
+from beyondTax.storage import private_storage
 from shared import abstract_models
 from accounts import constants as accounts_constants
 
@@ -91,6 +93,8 @@ class IncomeTaxReturnYears(abstract_models.BaseModel):
     end_date = models.DateField()
     due_date = models.DateField()
     status = models.IntegerField(choices=STATUS_CHOICES, blank=True)
+    # per regime slab, rebate and surcharge config read by services.incomeTax.slabs.SlabTable, null uses defaults.
+    tax_slabs = models.JSONField(null=True, blank=True)
 
 
 class IncomeTaxReturn(abstract_models.BaseModel):
@@ -106,6 +110,8 @@ class IncomeTaxReturn(abstract_models.BaseModel):
     ais_pdf = models.FileField(upload_to='ais_documents/', blank=True)
     tds_pdf = models.FileField(upload_to='26as_documents/', blank=True)
     tis_pdf = models.FileField(upload_to='tis_documents/', blank=True)
+    # bumped by services.incomeTax.signals whenever an input of the tax computation changes.
+    version = models.PositiveIntegerField(default=1)
 
     def get_status_display(self):
         return dict(self.STATUS_CHOICES).get(self.status, 'Unknown')
@@ -196,7 +202,14 @@ class RentalIncome(abstract_models.BaseModel):
     net_rental_income = models.DecimalField(max_digits=30, decimal_places=2)
     ownership_percent = models.IntegerField()
 
+    # computed from the other fields on every save, bulk writes call calculate_derived_fields() themselves.
+    DERIVED_FIELDS = ('standard_deduction', 'net_rental_income')
+
     def save(self, *args, **kwargs):
+        self.calculate_derived_fields()
+        super(RentalIncome, self).save(*args, **kwargs)
+
+    def calculate_derived_fields(self):
         annual_rent = Decimal(self.annual_rent)
         property_tax_paid = Decimal(self.property_tax_paid)
         interest_on_home_loan_dcp = Decimal(self.interest_on_home_loan_dcp)
@@ -207,7 +220,6 @@ class RentalIncome(abstract_models.BaseModel):
                 annual_rent - property_tax_paid - self.standard_deduction -
                 interest_on_home_loan_dcp - interest_on_home_loan_pc
         )
-        super(RentalIncome, self).save(*args, **kwargs)
 
 
 class CapitalGains(abstract_models.BaseModel):
@@ -468,12 +480,132 @@ class SelfAssesmentAndAdvanceTaxPaid(abstract_models.BaseModel):
 
 
 class Computations(abstract_models.BaseModel):
-    New, Old = 1, 2
+    New, Old, Summary = 1, 2, 3
     REGIME_TYPE_CHOICES = (
         (New, 'new'),
         (Old, 'old'),
+        (Summary, 'summary'),
     )
     income_tax_return = models.ForeignKey(IncomeTaxReturn, on_delete=models.CASCADE,
                                           related_name='computations', null=True)
     regime_json_data = models.JSONField()
-    regime_type = models.IntegerField(choices=REGIME_TYPE_CHOICES)
\ No newline at end of file
+    regime_type = models.IntegerField(choices=REGIME_TYPE_CHOICES)
+    # IncomeTaxReturn.version the data was computed from, null when the data was posted by the client.
+    return_version = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['income_tax_return', 'regime_type']),
+        ]
+
+
+class ReturnTotals(abstract_models.BaseModel):
+    """
+    Per-return totals of the income, deductions and taxes paid tables, kept current by services.incomeTax.signals
+    and rebuilt with the rebuild_return_totals command.
+    """
+    income_tax_return = models.OneToOneField(IncomeTaxReturn, on_delete=models.CASCADE, related_name='totals')
+    salary_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    rental_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    capital_gains = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    business_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    agriculture_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    exempt_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    interest_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    interest_on_it_refunds = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    dividend_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    betting_income = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    tds_or_tcs_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    self_assessment_amount = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+    deductions = models.DecimalField(max_digits=30, decimal_places=2, default=0)
+
+
+class IngestionJob(abstract_models.BaseModel):
+    """
+    AIS, 26AS or challan PDF uploaded for background parsing, claimed from the database by the
+    run_ingestion_worker command.
+    """
+    AIS, TDS, Challan, TIS = 1, 2, 3, 4
+    DOCUMENT_TYPE_CHOICES = (
+        (AIS, 'ais'),
+        (TDS, '26as'),
+        (Challan, 'challan'),
+        (TIS, 'tis'),
+    )
+    Queued, Running, Completed, Failed = 1, 2, 3, 4
+    STATUS_CHOICES = (
+        (Queued, 'queued'),
+        (Running, 'running'),
+        (Completed, 'completed'),
+        (Failed, 'failed'),
+    )
+    Received, Extracting, Saving, Done = 1, 2, 3, 4
+    STAGE_CHOICES = (
+        (Received, 'received'),
+        (Extracting, 'extracting'),
+        (Saving, 'saving'),
+        (Done, 'done'),
+    )
+    income_tax_return = models.ForeignKey(IncomeTaxReturn, on_delete=models.CASCADE, related_name='ingestion_jobs')
+    # detected from the document's first page by the worker when not given.
+    document_type = models.IntegerField(choices=DOCUMENT_TYPE_CHOICES, null=True, blank=True)
+    document = models.FileField(upload_to='ingestion_documents/')
+    status = models.IntegerField(choices=STATUS_CHOICES, default=Queued)
+    stage = models.IntegerField(choices=STAGE_CHOICES, default=Received)
+    pages_total = models.PositiveIntegerField(default=0)
+    pages_done = models.PositiveIntegerField(default=0)
+    attempts = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder)
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+
+class ParsedDocument(abstract_models.BaseModel):
+    """
+    Records extracted from an AIS, TIS or 26AS PDF, keyed by the SHA-256 of the PDF bytes and the password it was
+    opened with, so uploading the same document again skips decryption and parsing.
+    """
+    AIS, TDS, TIS = 1, 2, 3
+    DOCUMENT_TYPE_CHOICES = (
+        (AIS, 'ais'),
+        (TDS, '26as'),
+        (TIS, 'tis'),
+    )
+    sha256 = models.CharField(max_length=64)
+    document_type = models.IntegerField(choices=DOCUMENT_TYPE_CHOICES)
+    parser_version = models.PositiveIntegerField()
+    extracted_data = models.JSONField()
+
+    class Meta:
+        unique_together = ('sha256', 'document_type', 'parser_version')
+
+
+class ReportArtifact(abstract_models.BaseModel):
+    """
+    A rendered PDF report of a return. It is served while it was rendered from the return's current version with
+    the report's current template version on the day it is downloaded, since interest u/s 234A and the 234F penalty
+    depend on the filing date. The run_report_worker command re-renders reports whose return or template changed.
+    """
+    Summary, OldRegimeComputation, NewRegimeComputation = 1, 2, 3
+    REPORT_TYPE_CHOICES = (
+        (Summary, 'summary'),
+        (OldRegimeComputation, 'old regime computation'),
+        (NewRegimeComputation, 'new regime computation'),
+    )
+    income_tax_return = models.ForeignKey(IncomeTaxReturn, on_delete=models.CASCADE, related_name='report_artifacts')
+    report_type = models.IntegerField(choices=REPORT_TYPE_CHOICES)
+    return_version = models.PositiveIntegerField()
+    template_version = models.PositiveIntegerField()
+    rendered_on = models.DateField()
+    pdf = models.FileField(upload_to='reports/', storage=private_storage)
+    # SHA-256 of the PDF, sent as the ETag.
+    etag = models.CharField(max_length=64)
+
+    class Meta:
+        unique_together = ('income_tax_return', 'report_type')
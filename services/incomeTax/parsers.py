@@ -0,0 +1,248 @@
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+
+from services.incomeTax.pdf_pages import iter_page_texts, first_page_text, pdf_source, open_document
+
+logger = logging.getLogger(__name__)
+
+
+# AIS and TIS both extract {category: [{"sr_no", "information_source", "amount"}]} over these categories, so
+# either is saved through AISPdfUploadSerializer.save_extracted_data.
+STATEMENT_CATEGORIES = ("salary", "rent_received", "dividends", "business_receipts", "interest_income")
+
+
+def statement_record(sr_no, information_source, amount):
+    return {"sr_no": int(sr_no), "information_source": information_source, "amount": amount.replace(',', '')}
+
+
+class StatementParserRegistry:
+    """
+    The parser of every tax statement format, by document type. detect() picks the parser from the text of a
+    statement's first page.
+    """
+    parsers = {}
+
+    @classmethod
+    def register(cls, parser_class):
+        cls.parsers[parser_class.document_type] = parser_class()
+        return parser_class
+
+    @classmethod
+    def get(cls, document_type):
+        return cls.parsers[document_type]
+
+    @classmethod
+    def detect(cls, text):
+        for parser in cls.parsers.values():
+            if parser.fingerprint.search(text):
+                return parser
+        return None
+
+    @classmethod
+    def detect_pdf(cls, pdf_file, password=None):
+        return cls.detect(first_page_text(pdf_file, password))
+
+
+def _parse_source(document_type, source, password):
+    try:
+        doc = open_document(source, password)
+        return StatementParserRegistry.get(document_type).parse(
+            doc.load_page(page_num).get_text("text") for page_num in range(len(doc))
+        )
+    except Exception:
+        logger.exception("Extracting %s data from PDF failed", document_type)
+        return None
+
+
+def parse_pdfs(document_type, pdf_files, password=None, processes=None):
+    """
+    The extracted data of every PDF, in order, None for the ones that couldn't be parsed. With more than one
+    process (settings.PDF_PARSE_PROCESSES by default) and more than one PDF, they are parsed in a process pool.
+    """
+    if processes is None:
+        processes = settings.PDF_PARSE_PROCESSES
+    sources = [pdf_source(pdf_file) for pdf_file in pdf_files]
+    if processes <= 1 or len(sources) <= 1:
+        return [_parse_source(document_type, source, password) for source in sources]
+    with ProcessPoolExecutor(max_workers=min(processes, len(sources))) as executor:
+        return list(executor.map(_parse_source, [document_type] * len(sources), sources,
+                                 [password] * len(sources)))
+
+
+class StatementParser:
+    """
+    Turns the page texts of one statement format into its extracted data. Patterns are compiled once as class
+    attributes, version is bumped whenever a change to the parser changes what it extracts.
+    """
+    document_type = None
+    version = 1
+    # searched on the first page only.
+    fingerprint = None
+
+    def parse(self, pages):
+        raise NotImplementedError
+
+    def parse_pdf(self, pdf_file, password=None, progress=None, processes=None):
+        return self.parse(iter_page_texts(pdf_file, password, progress=progress, processes=processes))
+
+
+class CategorisedStatementParser(StatementParser):
+    """
+    A statement whose records are grouped under STATEMENT_CATEGORIES.
+    """
+
+    def iter_records(self, pages):
+        raise NotImplementedError
+
+    def parse(self, pages):
+        extracted_data = {category: [] for category in STATEMENT_CATEGORIES}
+        for category, record in self.iter_records(pages):
+            extracted_data[category].append(record)
+        return extracted_data
+
+
+@StatementParserRegistry.register
+class AISParser(CategorisedStatementParser):
+    document_type = "ais"
+    fingerprint = re.compile(r"Annual Information Statement", re.I)
+
+    # every record starts on its own line with the serial number and the information code, the named group that
+    # matched is the category of the record. Codes this parser doesn't extract still end a record.
+    RECORD_HEADER = re.compile(
+        r"^(\d+)\s+(?:"
+        r"(?P<salary>TDS-192\s+Salary received)|"
+        r"(?P<rent_received>TDS-194I\(b\)\s+Rent received)|"
+        r"(?P<dividends>TDS-194\[K\]?\s+Dividend received)|"
+        r"(?P<business_receipts>TDS-194J\s+Receipt of fees)|"
+        r"(?P<interest_income>SFT-016\(SB\)\s+Interest income)|"
+        r"(?P<other>(?:TDS|TCS|SFT)-\S+))",
+        re.M
+    )
+    RECORD_DETAILS = re.compile(r"\s([A-Z][A-Z\s]* \([^)]*\))\s+(\d+)\s+([\d,]+)")
+
+    def iter_records(self, pages):
+        """
+        Yield (category, record) for every record of the pages, in document order.
+
+        A record runs from its header to the next one, so only the unfinished record at the end of a page is
+        carried over to the next page and at most a page of text is held at a time.
+        """
+        carry = ""
+        for page_text in pages:
+            carried = len(carry)
+            text = carry + page_text
+            carry = ""
+            headers = list(self.RECORD_HEADER.finditer(text))
+            for index, header in enumerate(headers):
+                is_last = index == len(headers) - 1
+                end = len(text) if is_last else headers[index + 1].start()
+                details = self.RECORD_DETAILS.search(text, header.end(), end)
+                if details is None:
+                    # a record that didn't finish on this page may on the next one, one that started on the
+                    # previous page is given up on.
+                    if is_last and header.start() >= carried:
+                        carry = text[header.start():]
+                    continue
+                if header.lastgroup != "other":
+                    yield header.lastgroup, statement_record(header.group(1), details.group(1), details.group(3))
+
+
+@StatementParserRegistry.register
+class TISParser(CategorisedStatementParser):
+    """
+    The TIS lists every information category with the processed and the derived value of each of its
+    information sources, the derived value is the amount.
+    """
+    document_type = "tis"
+    fingerprint = re.compile(r"Taxpayer Information Summary", re.I)
+
+    CATEGORY_HEADER = re.compile(
+        r"^(?:"
+        r"(?P<salary>Salary)|"
+        r"(?P<rent_received>Rent received)|"
+        r"(?P<dividends>Dividend)|"
+        r"(?P<business_receipts>Business receipts|Receipt of fees)|"
+        r"(?P<interest_income>Interest from savings bank)|"
+        r"(?P<other>[A-Z][A-Za-z ()/]+))\s*$",
+        re.M
+    )
+    SOURCE = re.compile(r"^(\d+)\s+([A-Z][A-Z\s]* \([^)]*\))\s+[\d,]+\s+([\d,]+)\s*$", re.M)
+
+    def iter_records(self, pages):
+        # the category of a page's first sources is the last one the previous page started.
+        category = None
+        for page_text in pages:
+            headers = list(self.CATEGORY_HEADER.finditer(page_text))
+            boundaries = [0] + [header.start() for header in headers] + [len(page_text)]
+            categories = [category] + [header.lastgroup for header in headers]
+            for start, end, page_category in zip(boundaries, boundaries[1:], categories):
+                if page_category in (None, "other"):
+                    continue
+                for source in self.SOURCE.finditer(page_text, start, end):
+                    yield page_category, statement_record(source.group(1), source.group(2), source.group(3))
+            category = categories[-1]
+
+
+@StatementParserRegistry.register
+class Form26ASParser(StatementParser):
+    """
+    Extracts [{"name_of_deductor", "tan", "gross_receipts", "tds_or_tcs_amount", "section"}], a record's section is
+    the first one named on its page or the last one named before it.
+    """
+    document_type = "26as"
+    fingerprint = re.compile(r"Annual Tax Statement|Form\s+26AS", re.I)
+
+    DETAILS = re.compile(r"(\d+)\s+([A-Z\s]+)\s+([A-Z0-9]+)\s+([\d,.]+)\s+([\d,.]+)\s+([\d,.]+)", re.S)
+    SECTION = re.compile(r"Section\s+(\d+)")
+
+    def parse(self, pages):
+        extracted_data = []
+        last_section = None
+        for text in pages:
+            section = self.SECTION.search(text)
+            if section:
+                last_section = section.group(1)
+
+            for match in self.DETAILS.findall(text):
+                extracted_data.append({
+                    "name_of_deductor": match[1].strip(),
+                    "tan": match[2].strip(),
+                    "gross_receipts": match[3].replace(',', ''),
+                    "tds_or_tcs_amount": match[4].replace(',', ''),
+                    "section": last_section,
+                })
+        return extracted_data
+
+
+@StatementParserRegistry.register
+class Challan280Parser(StatementParser):
+    """
+    Extracts {"bsr_code", "challan_no", "date_of_deposit", "amount"} from an ITNS 280 challan receipt, or None
+    when any of them is missing.
+    """
+    document_type = "challan"
+    fingerprint = re.compile(r"Challan Receipt|ITNS\s*280|Challan No\s*:", re.I)
+
+    BSR_CODE = re.compile(r"BSR code\s*:\s*(\d+)")
+    CHALLAN_NO = re.compile(r"Challan No\s*:\s*(\d+)")
+    DATE_OF_DEPOSIT = re.compile(r"Date of Deposit\s*:\s*(\d{2}-[A-Za-z]{3}-\d{4})")
+    AMOUNT = re.compile(r"Amount \(in Rs\.\)\s*:\s*₹\s*([\d,]+)")
+
+    def parse(self, pages):
+        text = "".join(pages)
+        bsr_code = self.BSR_CODE.search(text)
+        challan_no = self.CHALLAN_NO.search(text)
+        date_of_deposit = self.DATE_OF_DEPOSIT.search(text)
+        amount = self.AMOUNT.search(text)
+        if not (bsr_code and challan_no and date_of_deposit and amount):
+            return None
+        return {
+            "bsr_code": bsr_code.group(1),
+            "challan_no": challan_no.group(1),
+            "date_of_deposit": datetime.strptime(date_of_deposit.group(1), "%d-%b-%Y").date(),
+            "amount": amount.group(1).replace(',', '')
+        }
@@ -0,0 +1,149 @@
+"""
+Synthetic AIS, TIS, 26AS and challan PDFs for benchmarking the statement parsers, each built together with the
+data its parser is expected to extract. Statements are encrypted like the real ones, with the lower case PAN
+followed by the date of birth.
+"""
+import html
+import io
+from collections import namedtuple
+from datetime import date
+
+import fitz
+
+PAN = "ABCDE1234F"
+DATE_OF_BIRTH = date(1990, 1, 1)
+PASSWORD = f"{PAN.lower()}{DATE_OF_BIRTH.strftime('%d%m%Y')}"
+LINES_PER_PAGE = 58
+
+CorpusDocument = namedtuple('CorpusDocument', ['document_type', 'pages', 'content', 'password', 'expected'])
+
+AIS_SECTIONS = (
+    ("salary", "TDS-192 Salary received (Section 192)"),
+    ("rent_received", "TDS-194I(b) Rent received (Section 194I(b))"),
+    ("dividends", "TDS-194[K] Dividend received (Section 194K)"),
+    ("business_receipts", "TDS-194J Receipt of fees for professional services (Section 194J)"),
+    ("interest_income", "SFT-016(SB) Interest income (Savings bank)"),
+    (None, "TDS-194A Interest other than securities (Section 194A)"),
+)
+TIS_CATEGORIES = (
+    ("salary", "Salary"),
+    ("rent_received", "Rent received"),
+    ("dividends", "Dividend"),
+    ("business_receipts", "Business receipts"),
+    ("interest_income", "Interest from savings bank"),
+    (None, "Purchase of time deposits"),
+)
+
+
+def source_name(number):
+    # names in the statements are upper case letters only.
+    return f"{chr(65 + number % 26)}{chr(65 + number // 26 % 26)}{chr(65 + number // 676 % 26)}"
+
+
+def render(page_texts, password=PASSWORD):
+    doc = fitz.open()
+    for text in page_texts:
+        page = doc.new_page()
+        if text.isascii():
+            page.insert_text((40, 40), text, fontsize=8, lineheight=1.6)
+        else:
+            # the base 14 fonts have no ₹, the html renderer falls back to fonts that do.
+            page.insert_htmlbox(page.rect + (40, 40, -40, -40), f"<pre>{html.escape(text)}</pre>")
+    buffer = io.BytesIO()
+    if password:
+        doc.save(buffer, encryption=fitz.PDF_ENCRYPT_AES_256, user_pw=password, owner_pw=password)
+    else:
+        doc.save(buffer)
+    return buffer.getvalue()
+
+
+def paginate(lines):
+    return ["\n".join(lines[start:start + LINES_PER_PAGE]) for start in range(0, len(lines), LINES_PER_PAGE)]
+
+
+def synthetic_ais(pages, incomplete_every=0):
+    """
+    Records are laid out continuously so some straddle pages. Every incomplete_every-th record has no
+    information source line and isn't expected.
+    """
+    expected = {category: [] for category, _ in AIS_SECTIONS if category}
+    lines = ["Annual Information Statement (AIS)"]
+    sr_no = 0
+    while True:
+        sr_no += 1
+        category, section = AIS_SECTIONS[sr_no % len(AIS_SECTIONS)]
+        source = f"DEDUCTOR {source_name(sr_no)} LIMITED (ABCD{sr_no % 100000:05d}E)"
+        complete = not incomplete_every or sr_no % incomplete_every
+        record_lines = [f"{sr_no} {section}"] + ([source] if complete else []) + [f"{sr_no % 4 + 1}",
+                                                                                  f"{1000 * sr_no:,}"]
+        if len(lines) + len(record_lines) > pages * LINES_PER_PAGE:
+            break
+        lines += record_lines
+        if category and complete:
+            expected[category].append({"sr_no": sr_no, "information_source": source, "amount": str(1000 * sr_no)})
+    return CorpusDocument("ais", pages, render(paginate(lines)), PASSWORD, expected)
+
+
+def synthetic_tis(pages):
+    """
+    A category heading every few sources, so categories carry over to the next page.
+    """
+    expected = {category: [] for category, _ in TIS_CATEGORIES if category}
+    lines = ["Taxpayer Information Summary (TIS)"]
+    number = 0
+    while True:
+        category, heading = TIS_CATEGORIES[number // 7 % len(TIS_CATEGORIES)]
+        record_lines = [heading] if number % 7 == 0 else []
+        number += 1
+        source = f"SOURCE {source_name(number)} LIMITED (AAAC{number % 100000:05d}A)"
+        record_lines.append(f"{number % 7 + 1} {source} {1100 * number:,} {1000 * number:,}")
+        if len(lines) + len(record_lines) > pages * LINES_PER_PAGE:
+            break
+        lines += record_lines
+        if category:
+            expected[category].append({"sr_no": number % 7 + 1, "information_source": source,
+                                       "amount": str(1000 * number)})
+    return CorpusDocument("tis", pages, render(paginate(lines)), PASSWORD, expected)
+
+
+def synthetic_26as(pages, rows_per_page=20):
+    """
+    Only every third page names a section, the rest carry the last one over.
+    """
+    expected = []
+    page_texts = []
+    section = None
+    for page_num in range(pages):
+        lines = ["Annual Tax Statement (Form 26AS)"] if page_num == 0 else []
+        if page_num % 3 == 0:
+            section = str(192 + page_num // 3 % 5)
+            lines.append(f"Section {section}")
+        for row in range(rows_per_page):
+            number = page_num * rows_per_page + row + 1
+            deductor, tan = f"DEDUCTOR {source_name(number)}", f"TAN{number:06d}X"
+            lines.append(f"{number} {deductor} {tan} {number * 100:,}.00 {number * 10:,}.00 {number * 10:,}.00")
+            expected.append({"name_of_deductor": deductor, "tan": tan, "gross_receipts": f"{number * 100}.00",
+                             "tds_or_tcs_amount": f"{number * 10}.00", "section": section})
+        page_texts.append("\n".join(lines))
+    return CorpusDocument("26as", pages, render(page_texts), PASSWORD, expected)
+
+
+def synthetic_challan(number=1):
+    expected = {"bsr_code": f"05{number:05d}", "challan_no": f"{10000 + number}",
+                "date_of_deposit": date(2024, 9, number % 28 + 1), "amount": str(5000 * number)}
+    text = (f"Challan Receipt\nITNS 280\nBSR code : {expected['bsr_code']}\nChallan No : {expected['challan_no']}\n"
+            f"Date of Deposit : {expected['date_of_deposit'].strftime('%d-%b-%Y')}\n"
+            f"Amount (in Rs.) : ₹ {5000 * number:,}\n")
+    return CorpusDocument("challan", 1, render([text], password=None), None, expected)
+
+
+def corpus(document_types=("ais", "tis", "26as", "challan"), sizes=(1, 20, 100)):
+    """
+    Every document type at every size, challans are always one page.
+    """
+    for document_type in document_types:
+        if document_type == "challan":
+            yield synthetic_challan()
+            continue
+        for pages in sizes:
+            yield {"ais": synthetic_ais, "tis": synthetic_tis, "26as": synthetic_26as}[document_type](pages)
@@ -0,0 +1,110 @@
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+from django.conf import settings
+
+
+# the document each pool process opened from the shared source in its initializer.
+_document = None
+
+
+def pdf_source(pdf_file):
+    """
+    What to open the PDF from without copying it into a new bytes object: the path of an upload Django spooled
+    to disk or of any other file on disk, which MuPDF then reads as it needs, the shared buffer of an in-memory
+    upload, or, for any other file like object, its bytes.
+    """
+    if hasattr(pdf_file, 'temporary_file_path'):
+        return pdf_file.temporary_file_path()
+    file = pdf_file
+    # django File, UploadedFile and FieldFile wrap the actual file object.
+    while not isinstance(file, io.IOBase) and hasattr(file, 'file'):
+        file = file.file
+    if isinstance(file, io.BytesIO):
+        return file.getvalue()
+    if isinstance(file, io.BufferedReader) and isinstance(file.name, str) and os.path.isfile(file.name):
+        return file.name
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+class InvalidPdfPassword(Exception):
+    pass
+
+
+def open_document(source, password=None):
+    if isinstance(source, str):
+        doc = fitz.open(source, filetype="pdf")
+    else:
+        doc = fitz.open(stream=source, filetype="pdf")
+    if password is not None and not doc.authenticate(password):
+        raise InvalidPdfPassword("Invalid password for PDF document")
+    return doc
+
+
+def unlock_document(pdf_file, passwords):
+    """
+    The first of the passwords that opens the PDF, None when it isn't encrypted. MuPDF only reads the trailer and
+    the encryption dictionary to authenticate, no page is loaded, so a PDF none of them open fails before any
+    text is extracted.
+    """
+    doc = open_document(pdf_source(pdf_file))
+    try:
+        if not doc.needs_pass:
+            return None
+        for password in passwords:
+            if doc.authenticate(password):
+                return password
+        raise InvalidPdfPassword("None of the passwords open the PDF document")
+    finally:
+        doc.close()
+
+
+def _open_shard_document(source, password):
+    global _document
+    _document = open_document(source, password)
+
+
+def _shard_page_texts(start, stop):
+    return [_document.load_page(page_num).get_text("text") for page_num in range(start, stop)]
+
+
+def first_page_text(pdf_file, password=None):
+    doc = open_document(pdf_source(pdf_file), password)
+    return doc.load_page(0).get_text("text") if len(doc) else ""
+
+
+def iter_page_texts(pdf_file, password=None, progress=None, processes=None):
+    """
+    Yield the text of every page of the PDF in page order.
+
+    With more than one process (settings.PDF_PARSE_PROCESSES by default) and more pages than
+    settings.PDF_PARSE_SHARD_PAGES, the pages are split into shards of that many pages and extracted in a process
+    pool where every process opens the same file or bytes once. Shards are yielded in page order, so callers that carry
+    state from page to page, like the 26AS section, parse exactly as they would sequentially.
+    """
+    if processes is None:
+        processes = settings.PDF_PARSE_PROCESSES
+    source = pdf_source(pdf_file)
+    doc = open_document(source, password)
+    page_count = len(doc)
+    shard_pages = settings.PDF_PARSE_SHARD_PAGES
+
+    if processes <= 1 or page_count <= shard_pages:
+        for page_num in range(page_count):
+            yield doc.load_page(page_num).get_text("text")
+            if progress:
+                progress(page_num + 1, page_count)
+        return
+
+    doc.close()
+    starts = range(0, page_count, shard_pages)
+    stops = [min(start + shard_pages, page_count) for start in starts]
+    with ProcessPoolExecutor(max_workers=min(processes, len(starts)), initializer=_open_shard_document,
+                             initargs=(source, password)) as executor:
+        for stop, page_texts in zip(stops, executor.map(_shard_page_texts, starts, stops)):
+            yield from page_texts
+            if progress:
+                progress(stop, page_count)
@@ -0,0 +1,301 @@
+import hashlib
+import io
+import logging
+import re
+import time
+import zipfile
+from collections import namedtuple
+from decimal import Decimal
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import F, Q
+from django.dispatch import Signal
+from django.template.loader import get_template
+from django.utils import timezone
+from xhtml2pdf import pisa
+from xhtml2pdf.default import DEFAULT_CSS
+
+from services.incomeTax.models import ReportArtifact, IncomeTaxReturn
+from services.incomeTax.snapshot import ReturnSnapshot
+from services.incomeTax.utils import IncomeTaxCalculations
+from shared.libs.hashing import AlphaId
+
+
+logger = logging.getLogger(__name__)
+
+
+# sent after every render with the template_name, the seconds it took and whether it failed.
+pdf_rendered = Signal()
+
+
+class PdfRenderer:
+    """
+    Renders templates to PDF, one instance per worker process. xhtml2pdf matches every element against every rule
+    of its default stylesheet, so each template is rendered with the default stylesheet cut down to the rules for
+    elements it can contain, worked out once per template. Compiled templates are kept by Django's cached template
+    loader.
+    """
+    # html5lib adds these to documents and tables that don't have them.
+    IMPLIED_TAGS = {"html", "head", "body", "tbody"}
+    TAG = re.compile(r"<([a-zA-Z][a-zA-Z0-9]*)")
+    SELECTOR_TAG = re.compile(r"\s*([a-zA-Z][a-zA-Z0-9]*)")
+    RULE = re.compile(r"([^{}]+)\{([^{}]*)\}")
+    COMMENT = re.compile(r"/\*.*?\*/", re.S)
+    # elements of included or extended templates aren't in the template's own source.
+    INHERITS = re.compile(r"{%\s*(?:extends|include)\b")
+
+    def __init__(self):
+        self.stylesheets = {}
+
+    def default_css(self, template):
+        source = template.template.source
+        if source not in self.stylesheets:
+            if self.INHERITS.search(source):
+                self.stylesheets[source] = DEFAULT_CSS
+            else:
+                tags = {tag.lower() for tag in self.TAG.findall(source)} | self.IMPLIED_TAGS
+                rules = []
+                for selectors, declarations in self.RULE.findall(self.COMMENT.sub("", DEFAULT_CSS)):
+                    # a selector can only match when the element its first part names is in the document.
+                    kept = [selector.strip() for selector in selectors.split(",")
+                            if not self.SELECTOR_TAG.match(selector)
+                            or self.SELECTOR_TAG.match(selector).group(1).lower() in tags]
+                    if kept:
+                        rules.append(f"{', '.join(kept)} {{{declarations}}}")
+                self.stylesheets[source] = "\n".join(rules)
+        return self.stylesheets[source]
+
+    def render(self, template_name, context):
+        """
+        The PDF bytes, None when xhtml2pdf reports an error.
+        """
+        started = time.perf_counter()
+        template = get_template(template_name)
+        result = BytesIO()
+        pdf = pisa.pisaDocument(template.render(context), result, default_css=self.default_css(template))
+        pdf_rendered.send(sender=self.__class__, template_name=template_name,
+                          seconds=time.perf_counter() - started, failed=bool(pdf.err))
+        if pdf.err:
+            return None
+        return result.getvalue()
+
+    def warm(self, template_names):
+        """
+        Compile the templates and load xhtml2pdf's fonts before the first report is rendered.
+        """
+        for template_name in template_names:
+            self.default_css(get_template(template_name))
+        pisa.pisaDocument("<p></p>", BytesIO())
+
+
+class GeneratePdfMixin:
+    pdf_renderer = PdfRenderer()
+
+    def render_to_pdf(self, template_src, context_dict):
+        return self.pdf_renderer.render(template_src, context_dict)
+
+
+def summary_context(calc, computation):
+    context = {}
+    for regime, result in (("old_regime", computation.old), ("new_regime", computation.new)):
+        context[regime] = {
+            "salary_income": calc.round_off_decimal(result.total_income_from_salaries),
+            "rental_income": calc.round_off_decimal(computation.total_annual_rent),
+            "capital_gains_income": calc.round_off_decimal(computation.total_capital_gains_income),
+            "business_income": calc.round_off_decimal(computation.total_income_from_business),
+            "exempt_income": calc.round_off_decimal(computation.total_combined_exempt_income),
+            "gross_total_income": calc.round_off_decimal(result.gross_total_income),
+            "deductions": calc.round_off_decimal(computation.total_deduction_amount),
+            "total_income": calc.round_off_decimal(result.total_income),
+            "tax_on_total_income": calc.round_off_decimal(result.tax_liability),
+            "taxes_paid": calc.round_off_decimal(computation.total_tds_or_tcs),
+            "interest_and_penalties": calc.round_off_decimal(result.total_interest_234 + result.penalty_us_234F),
+            "tax_payable": calc.round_off_decimal(result.tax_payable),
+        }
+    net_tax_payable_old = computation.old.net_tax_payable
+    net_tax_payable_new = computation.new.net_tax_payable
+    context["recommended"] = {
+        "regime_type": "New Regime" if net_tax_payable_new < net_tax_payable_old else "Old Regime",
+        "savings": abs(net_tax_payable_new - net_tax_payable_old),
+    }
+    return context
+
+
+def old_regime_computation_context(calc, computation):
+    return {"old_regime_data": calc.regime_computation_data(computation, "old")}
+
+
+def new_regime_computation_context(calc, computation):
+    return {"new_regime_data": calc.regime_computation_data(computation, "new")}
+
+
+# bump a report's template_version whenever its template or context changes, every stored copy is then re-rendered.
+Report = namedtuple('Report', ['template', 'template_version', 'filename', 'context'])
+REPORTS = {
+    ReportArtifact.Summary: Report('itr_summary_report.html', 1, 'income-tax-report', summary_context),
+    ReportArtifact.OldRegimeComputation: Report('itr_computations_old_regime_report.html', 1,
+                                                'old-regime-computation', old_regime_computation_context),
+    ReportArtifact.NewRegimeComputation: Report('itr_computations_new_regime_report.html', 1,
+                                                'new-regime-computation', new_regime_computation_context),
+}
+
+
+class ZipStream(io.RawIOBase):
+    """
+    Write-only file for zipfile that hands back what was written since the last drain(), so an archive is sent
+    as it is written instead of being buffered whole. zipfile writes data descriptors to files it can't seek.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+class ReportArtifactService(GeneratePdfMixin):
+    """
+    Rendered PDF reports stored as ReportArtifact rows. A download renders the report only when no fresh copy is
+    stored, work() re-renders stored reports off the request path as soon as their return or template changes.
+    """
+    ARCHIVE_CHUNK_SIZE = 64 * 1024
+    # uploaded statements of a return, by the name they are given in the archive.
+    ARCHIVE_DOCUMENTS = (("ais.pdf", "ais_pdf"), ("26as.pdf", "tds_pdf"), ("tis.pdf", "tis_pdf"))
+
+    def fresh(self, income_tax_return_id, user, report_type, rendered_on):
+        return ReportArtifact.objects.filter(
+            income_tax_return_id=income_tax_return_id, income_tax_return__user=user, report_type=report_type,
+            return_version=F('income_tax_return__version'), template_version=REPORTS[report_type].template_version,
+            rendered_on=rendered_on
+        ).first()
+
+    def render(self, snapshot, report_type, rendered_on):
+        calc = IncomeTaxCalculations()
+        computation = calc.calculate_dual_regime(snapshot, Decimal('50000'), rendered_on)
+        report = REPORTS[report_type]
+        return self.render_to_pdf(report.template, report.context(calc, computation))
+
+    def store(self, income_tax_return, report_type, rendered_on, content):
+        report = REPORTS[report_type]
+        field = ReportArtifact._meta.get_field('pdf')
+        name = field.storage.save(
+            field.generate_filename(None, f"{AlphaId.encode(income_tax_return.id)}-{report.filename}.pdf"),
+            ContentFile(content)
+        )
+        previous_name = ReportArtifact.objects.filter(
+            income_tax_return=income_tax_return, report_type=report_type
+        ).values_list('pdf', flat=True).first()
+        artifact, _ = ReportArtifact.objects.update_or_create(
+            income_tax_return=income_tax_return, report_type=report_type,
+            defaults={'return_version': income_tax_return.version, 'template_version': report.template_version,
+                      'rendered_on': rendered_on, 'pdf': name, 'etag': hashlib.sha256(content).hexdigest()}
+        )
+        if previous_name and previous_name != name:
+            transaction.on_commit(lambda: field.storage.delete(previous_name))
+        return artifact
+
+    def get_or_render(self, income_tax_return_id, user, report_type):
+        """
+        The fresh report of the user's return, rendered and stored first when there is none. None when the
+        template fails to render, raises IncomeTaxReturn.DoesNotExist when the return isn't the user's.
+        """
+        rendered_on = timezone.now().date()
+        artifact = self.fresh(income_tax_return_id, user, report_type, rendered_on)
+        if artifact is not None:
+            return artifact
+        snapshot = ReturnSnapshot.load(income_tax_return_id, user)
+        content = self.render(snapshot, report_type, rendered_on)
+        if content is None:
+            return None
+        return self.store(snapshot.income_tax_return, report_type, rendered_on, content)
+
+    def archive_entries(self, user):
+        """
+        (name, file) of every report and uploaded statement of every return of the user, by year.
+        """
+        income_tax_returns = IncomeTaxReturn.objects.filter(user=user).select_related(
+            'income_tax_return_year'
+        ).order_by('income_tax_return_year__name')
+        for income_tax_return in income_tax_returns:
+            folder = income_tax_return.income_tax_return_year.name
+            for report_type, report in REPORTS.items():
+                artifact = self.get_or_render(income_tax_return.id, user, report_type)
+                if artifact is not None:
+                    yield f"{folder}/{report.filename}.pdf", artifact.pdf
+            for name, field_name in self.ARCHIVE_DOCUMENTS:
+                document = getattr(income_tax_return, field_name)
+                if document:
+                    yield f"{folder}/{name}", document
+
+    def iter_archive(self, user):
+        """
+        Yield a ZIP of archive_entries() chunk by chunk. PDFs are already compressed, so they are stored as they
+        are. A file missing from storage is left out.
+        """
+        stream = ZipStream()
+        with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for name, file in self.archive_entries(user):
+                try:
+                    source = file.open('rb')
+                except OSError:
+                    logger.warning("%s of user %s is missing from storage", file.name, user.id)
+                    continue
+                entry_info = zipfile.ZipInfo(name, time.localtime()[:6])
+                with source, archive.open(entry_info, 'w') as entry:
+                    for chunk in iter(lambda: source.read(self.ARCHIVE_CHUNK_SIZE), b''):
+                        entry.write(chunk)
+                        yield stream.drain()
+        yield stream.drain()
+
+    def stale(self):
+        template_changed = Q()
+        for report_type, report in REPORTS.items():
+            template_changed |= Q(report_type=report_type) & ~Q(template_version=report.template_version)
+        return ReportArtifact.objects.filter(~Q(return_version=F('income_tax_return__version')) | template_changed)
+
+    def refresh_next(self):
+        """
+        Re-render the stalest stored report no other worker is rendering, False when none is stale. A report that
+        fails to render is dropped, its next download renders it again and reports the error.
+        """
+        with transaction.atomic():
+            artifact = self.stale().select_for_update(skip_locked=True, of=('self',)).select_related(
+                'income_tax_return__user'
+            ).order_by('updated_at').first()
+            if artifact is None:
+                return False
+            rendered_on = timezone.now().date()
+            try:
+                snapshot = ReturnSnapshot.load(artifact.income_tax_return_id, artifact.income_tax_return.user)
+                content = self.render(snapshot, artifact.report_type, rendered_on)
+            except Exception:
+                logger.exception("Rendering report %s failed", artifact.id)
+                content = None
+            if content is None:
+                artifact.delete()
+                transaction.on_commit(lambda: artifact.pdf.storage.delete(artifact.pdf.name))
+            else:
+                self.store(snapshot.income_tax_return, artifact.report_type, rendered_on, content)
+        return True
+
+    def work(self, poll_interval=5.0, once=False):
+        """
+        Re-render stale reports until none is left when once is set, forever otherwise.
+        """
+        while True:
+            if not self.refresh_next():
+                if once:
+                    return
+                time.sleep(poll_interval)
@@ -1,15 +1,22 @@
 import re
 from datetime import datetime, date
-import fitz
+from decimal import Decimal
 from django.core.validators import RegexValidator
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Q, Sum
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from services.incomeTax.models import IncomeTaxProfile, IncomeTaxBankDetails, IncomeTaxAddress, IncomeTaxReturnYears, \
     IncomeTaxReturn, ResidentialStatusQuestions, ResidentialStatusAnswer, SalaryIncome, RentalIncome, BuyerDetails, \
     CapitalGains, TdsOrTcsDeduction, SelfAssesmentAndAdvanceTaxPaid, IncomeFromBetting, DividendIncome, \
     InterestOnItRefunds, ExemptIncome, BusinessIncome, AgricultureIncome, LandDetails, Deductions, InterestIncome, \
-    Computations
+    Computations, IngestionJob
+from services.incomeTax.parsers import StatementParserRegistry, parse_pdfs
+from services.incomeTax.pdf_pages import InvalidPdfPassword
+from services.incomeTax.simulation import Scenario, WhatIfSimulator, DEDUCTION_AMOUNTS, DEDUCTION_FLAGS, \
+    SALARY_AMOUNTS, SALARY_FLAGS, NO_DEDUCTIONS, below_zero
+from services.incomeTax.services import ParsedDocumentCacheService, ExtractedRecordsService, StatementPasswordService
+from services.incomeTax.totals import ReturnTotalsQuery
 from shared.libs.hashing import AlphaId
 from shared.rest.serializers import BaseModelSerializer, BaseSerializer
 
@@ -509,77 +516,46 @@ class DeductionsSerializer(BaseModelSerializer):
         return instance
 
 
+def statement_password(income_tax_return, pdf_file, document_type=None):
+    """
+    The password that opens the uploaded statement, see StatementPasswordService.
+    """
+    try:
+        return StatementPasswordService().unlock(income_tax_return.user.income_tax_profile, pdf_file, document_type)
+    except InvalidPdfPassword:
+        name = document_type.upper() if document_type else "uploaded"
+        raise serializers.ValidationError(f"Unable to open the {name} file with the PAN and date of birth on your "
+                                          f"profile.")
+
+
 class AISPdfUploadSerializer(BaseSerializer):
     ais_pdf = serializers.FileField()
 
-    def extract_text_from_pdf(self, pdf_file, password):
+    def extract_data_from_pdf(self, pdf_file, password, progress=None, processes=None, document_type="ais"):
+        """
+        Records of an AIS, or of a TIS with document_type "tis", which extracts the same categories.
+        """
+        parser = StatementParserRegistry.get(document_type)
+        return ParsedDocumentCacheService().extract(
+            parser, pdf_file, password,
+            lambda: self.parse_data_from_pdf(pdf_file, password, progress=progress, processes=processes,
+                                             document_type=document_type)
+        )
+
+    def parse_data_from_pdf(self, pdf_file, password, progress=None, processes=None, document_type="ais"):
         try:
-            pdf_file.seek(0)
-            doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-            if not doc.authenticate(password):
-                raise Exception("Invalid password for PDF document")
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text("text")
-            return text
+            return StatementParserRegistry.get(document_type).parse_pdf(pdf_file, password, progress=progress,
+                                                                        processes=processes)
         except Exception as e:
             print(f"Error extracting text from PDF: {e}")
             return None
 
-    def extract_data_from_text(self, text):
-        extracted_data = {
-            "salary": [],
-            "rent_received": [],
-            "dividends": [],
-            "business_receipts": [],
-            "interest_income": []
-        }
-
-        patterns = {
-            "salary": re.compile(
-                r"(\d+)\s+TDS-192\s+Salary received.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
-                re.S
-            ),
-            "rent_received": re.compile(
-                r"(\d+)\s+TDS-194I\(b\)\s+Rent received.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
-                re.S
-            ),
-            "dividends": re.compile(
-                r"(\d+)\s+TDS-194\[K\]?\s+Dividend received.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
-                re.S
-            ),
-            "business_receipts": re.compile(
-                r"(\d+)\s+TDS-194J\s+Receipt of fees.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
-                re.S
-            ),
-            "interest_income": re.compile(
-                r"(\d+)\s+SFT-016\(SB\)\s+Interest income.*?\s+([A-Z\s]+ \(.*?\))\s+(\d+)\s+([\d,]+)",
-                re.S
-            )
-        }
-
-        for key, pattern in patterns.items():
-            matches = pattern.findall(text)
-            for match in matches:
-                extracted_data[key].append({
-                    "sr_no": int(match[0]),
-                    "information_source": match[1],
-                    "amount": match[3].replace(',', '')
-                })
-
-        return extracted_data
-
     def save_extracted_data(self, extracted_data, income_tax_return):
-        income_tax_profile = income_tax_return.user.income_tax_profile
-        saved_data = {"salary": [], "rent_received": [], "business_receipts": [], "dividends": [], "interest_income": []}
-
-        for item in extracted_data["salary"]:
-            salary_income, _ = SalaryIncome.objects.update_or_create(
-                income_tax=income_tax_profile,
-                income_tax_return=income_tax_return,
-                employer_name=item["information_source"],
-                defaults={
+        service = ExtractedRecordsService()
+        with transaction.atomic():
+            saved_data = {
+                "salary": service.upsert(SalaryIncome, income_tax_return, ("employer_name",), [{
+                    "employer_name": item["information_source"],
                     "gross_salary": item["amount"],
                     "employer_category": SalaryIncome.Private,
                     "tan": "",
@@ -591,16 +567,9 @@ class AISPdfUploadSerializer(BaseSerializer):
                     "hra_component": 0.0,
                     "annual_rent_paid": 0.0,
                     "do_you_live_in_these_cities": False
-                }
-            )
-            saved_data["salary"].append(salary_income)
-
-        for item in extracted_data["rent_received"]:
-            rental_income, _ = RentalIncome.objects.update_or_create(
-                income_tax=income_tax_profile,
-                income_tax_return=income_tax_return,
-                tenant_name=item["information_source"],
-                defaults={
+                } for item in extracted_data["salary"]]),
+                "rent_received": service.upsert(RentalIncome, income_tax_return, ("tenant_name",), [{
+                    "tenant_name": item["information_source"],
                     "annual_rent": item["amount"],
                     "occupancy_status": RentalIncome.LetOut,
                     "tenant_aadhar": "",
@@ -615,16 +584,9 @@ class AISPdfUploadSerializer(BaseSerializer):
                     "interest_on_home_loan_dcp": 0.0,
                     "interest_on_home_loan_pc": 0.0,
                     "ownership_percent": 100
-                }
-            )
-            saved_data["rent_received"].append(rental_income)
-
-        for item in extracted_data["business_receipts"]:
-            business_income, _ = BusinessIncome.objects.update_or_create(
-                income_tax=income_tax_profile,
-                income_tax_return=income_tax_return,
-                business_name=item["information_source"],
-                defaults={
+                } for item in extracted_data["rent_received"]]),
+                "business_receipts": service.upsert(BusinessIncome, income_tax_return, ("business_name",), [{
+                    "business_name": item["information_source"],
                     "gross_receipt_cheq_neft_rtgs_turnover": item["amount"],
                     "business_income_type": "44AD",
                     "industry": BusinessIncome.ITServices,
@@ -647,47 +609,29 @@ class AISPdfUploadSerializer(BaseSerializer):
                     "unsecured_loans": 0.0,
                     "advances": 0.0,
                     "other_liabilities": 0.0
-                }
-            )
-            saved_data["business_receipts"].append(business_income)
-
-        for item in extracted_data["dividends"]:
-            dividend_income, _ = DividendIncome.objects.update_or_create(
-                income_tax=income_tax_profile,
-                income_tax_return=income_tax_return,
-                particular=item["information_source"],
-                defaults={
+                } for item in extracted_data["business_receipts"]]),
+                "dividends": service.upsert(DividendIncome, income_tax_return, ("particular",), [{
+                    "particular": item["information_source"],
                     "amount": item["amount"],
                     "description": ""
-                }
-            )
-            saved_data["dividends"].append(dividend_income)
-
-        for item in extracted_data["interest_income"]:
-            interest_income, _ = InterestIncome.objects.update_or_create(
-                income_tax=income_tax_profile,
-                income_tax_return=income_tax_return,
-                description=item["information_source"],
-                defaults={
+                } for item in extracted_data["dividends"]]),
+                "interest_income": service.upsert(InterestIncome, income_tax_return, ("description",), [{
+                    "description": item["information_source"],
                     "interest_amount": item["amount"],
                     "interest_income_type": InterestIncome.SavingsBankAccount
-                }
-            )
-            saved_data["interest_income"].append(interest_income)
-
+                } for item in extracted_data["interest_income"]]),
+            }
+            if any(saved_data.values()):
+                service.mark_changed(income_tax_return)
         return saved_data
 
     def save(self):
         ais_pdf = self.validated_data.get('ais_pdf')
         income_tax_return = self.context['income_tax_return']
-        pan_no = income_tax_return.user.income_tax_profile.pan_no
-        date_of_birth = income_tax_return.user.income_tax_profile.date_of_birth.strftime('%d%m%Y')
-        password = f"{pan_no.lower()}{date_of_birth}"
-        pdf_text = self.extract_text_from_pdf(ais_pdf, password)
-        if not pdf_text:
+        password = statement_password(income_tax_return, ais_pdf, "ais")
+        extracted_data = self.extract_data_from_pdf(ais_pdf, password)
+        if extracted_data is None:
             raise serializers.ValidationError("Unable to extract text from the uploaded AIS file.")
-
-        extracted_data = self.extract_data_from_text(pdf_text)
         return self.save_extracted_data(extracted_data, income_tax_return)
 
 
@@ -706,63 +650,34 @@ class TdsPdfSerializer(BaseSerializer):
     def create(self, validated_data):
         tds_pdf = validated_data.get('tds_pdf')
         income_tax_return = validated_data.get('income_tax_return')
-        income_tax_profile = income_tax_return.user.income_tax_profile
-        pan_number = income_tax_profile.pan_no.lower()
-        date_of_birth = income_tax_profile.date_of_birth.strftime("%d%m%Y")
-        pdf_password = f"{pan_number}{date_of_birth}"
+        pdf_password = statement_password(income_tax_return, tds_pdf, "26as")
         extracted_data = self.extract_tds_details_from_pdf(tds_pdf, pdf_password)
-        saved_records = []
-        for item in extracted_data:
-            tds_or_tcs, _ = TdsOrTcsDeduction.objects.update_or_create(
-                income_tax=income_tax_profile,
-                income_tax_return=income_tax_return,
-                name_of_deductor=item['name_of_deductor'],
-                tan=item['tan'],
-                defaults={
-                    "gross_receipts": item['gross_receipts'],
-                    "tds_or_tcs_amount": item['tds_or_tcs_amount'],
-                    "section": item['section']
-                }
-            )
-            saved_records.append(tds_or_tcs)
-        return saved_records
-
-    def extract_tds_details_from_pdf(self, pdf_file, password):
-        try:
-            pdf_file.seek(0)
-            doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-            if not doc.authenticate(password):
-                raise Exception("Invalid password for PDF document")
-            extracted_data = []
-            last_section = None
-            pattern_details = re.compile(
-                r"(\d+)\s+([A-Z\s]+)\s+([A-Z0-9]+)\s+([\d,.]+)\s+([\d,.]+)\s+([\d,.]+)",
-                re.S
-            )
-            pattern_section = re.compile(
-                r"Section\s+(\d+)"
-            )
-
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text = page.get_text("text")
-
-                matches_section = pattern_section.findall(text)
-                if matches_section:
-                    last_section = matches_section[0]
+        return self.save_extracted_data(extracted_data, income_tax_return)
 
-                matches_details = pattern_details.findall(text)
-                for match in matches_details:
-                    extracted_data.append({
-                        "name_of_deductor": match[1].strip(),
-                        "tan": match[2].strip(),
-                        "gross_receipts": match[3].replace(',', ''),
-                        "tds_or_tcs_amount": match[4].replace(',', ''),
-                        "section": last_section,
-                    })
+    def save_extracted_data(self, extracted_data, income_tax_return):
+        service = ExtractedRecordsService()
+        with transaction.atomic():
+            saved_records = service.upsert(TdsOrTcsDeduction, income_tax_return, ("name_of_deductor", "tan"), [{
+                "name_of_deductor": item['name_of_deductor'],
+                "tan": item['tan'],
+                "gross_receipts": item['gross_receipts'],
+                "tds_or_tcs_amount": item['tds_or_tcs_amount'],
+                "section": item['section']
+            } for item in extracted_data])
+            if saved_records:
+                service.mark_changed(income_tax_return)
+        return saved_records
 
-            return extracted_data
+    def extract_tds_details_from_pdf(self, pdf_file, password, progress=None, processes=None):
+        return ParsedDocumentCacheService().extract(
+            StatementParserRegistry.get("26as"), pdf_file, password,
+            lambda: self.parse_tds_details_from_pdf(pdf_file, password, progress=progress, processes=processes)
+        )
 
+    def parse_tds_details_from_pdf(self, pdf_file, password, progress=None, processes=None):
+        try:
+            return StatementParserRegistry.get("26as").parse_pdf(pdf_file, password, progress=progress,
+                                                                 processes=processes)
         except Exception as e:
             print(f"Error extracting data from PDF: {e}")
             return []
@@ -771,35 +686,12 @@ class TdsPdfSerializer(BaseSerializer):
 class ChallanPdfUploadSerializer(BaseSerializer):
     challan_pdf = serializers.FileField()
 
-    def extract_challan_details_from_pdf(self, pdf_file):
+    def extract_challan_details_from_pdf(self, pdf_file, progress=None):
         try:
-            pdf_file.seek(0)
-            doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
-            text = ""
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text += page.get_text("text")
-
-            pattern_bsr_code = re.compile(r"BSR code\s*:\s*(\d+)")
-            pattern_challan_no = re.compile(r"Challan No\s*:\s*(\d+)")
-            pattern_date_of_deposit = re.compile(r"Date of Deposit\s*:\s*(\d{2}-[A-Za-z]{3}-\d{4})")
-            pattern_amount = re.compile(r"Amount \(in Rs\.\)\s*:\s*₹\s*([\d,]+)")
-
-            bsr_code = pattern_bsr_code.search(text)
-            challan_no = pattern_challan_no.search(text)
-            date_of_deposit = pattern_date_of_deposit.search(text)
-            amount = pattern_amount.search(text)
-
-            if bsr_code and challan_no and date_of_deposit and amount:
-                extracted_data = {
-                    "bsr_code": bsr_code.group(1),
-                    "challan_no": challan_no.group(1),
-                    "date_of_deposit": datetime.strptime(date_of_deposit.group(1), "%d-%b-%Y").date(),
-                    "amount": amount.group(1).replace(',', '')
-                }
-                return extracted_data
-            else:
+            extracted_data = StatementParserRegistry.get("challan").parse_pdf(pdf_file, progress=progress)
+            if extracted_data is None:
                 raise serializers.ValidationError("Failed to extract all required data from the PDF.")
+            return extracted_data
         except Exception as e:
             print(f"Error extracting data from PDF: {e}")
             raise serializers.ValidationError("Failed to extract data from PDF.")
@@ -815,14 +707,7 @@ class ChallanPdfUploadSerializer(BaseSerializer):
             amount=extracted_data["amount"],
             challan_pdf=challan_pdf
         )
-        response_data = {
-            "id": AlphaId.encode(saved_record.id),
-            "bsr_code": saved_record.bsr_code,
-            "challan_no": saved_record.challan_no,
-            "date_of_deposit": saved_record.date.strftime("%d-%b-%Y"),
-            "amount": saved_record.amount,
-        }
-        return response_data
+        return self.response_data(saved_record)
 
     def update_extracted_data(self, instance, extracted_data, challan_pdf):
         instance.bsr_code = extracted_data["bsr_code"]
@@ -831,15 +716,17 @@ class ChallanPdfUploadSerializer(BaseSerializer):
         instance.amount = extracted_data["amount"]
         instance.challan_pdf = challan_pdf
         instance.save()
+        return self.response_data(instance)
 
-        response_data = {
-            "id": AlphaId.encode(instance.id),
-            "bsr_code": instance.bsr_code,
-            "challan_no": instance.challan_no,
-            "date_of_deposit": instance.date.strftime("%d-%b-%Y"),
-            "amount": instance.amount,
+    @staticmethod
+    def response_data(record):
+        return {
+            "id": AlphaId.encode(record.id),
+            "bsr_code": record.bsr_code,
+            "challan_no": record.challan_no,
+            "date_of_deposit": record.date.strftime("%d-%b-%Y"),
+            "amount": record.amount,
         }
-        return response_data
 
     def create(self, validated_data):
         challan_pdf = validated_data.get('challan_pdf')
@@ -853,6 +740,150 @@ class ChallanPdfUploadSerializer(BaseSerializer):
         return self.update_extracted_data(instance, extracted_data, challan_pdf)
 
 
+class ChallanBatchUploadSerializer(BaseSerializer):
+    MAX_CHALLANS = 50
+
+    challan_pdfs = serializers.ListField(child=serializers.FileField(), allow_empty=False, max_length=MAX_CHALLANS)
+
+    def create(self, validated_data):
+        """
+        Parse every challan, skip the ones already saved for the return or repeated in the batch, matched on
+        (bsr_code, challan_no, date), and save the rest with one bulk_create.
+        """
+        challan_pdfs = validated_data['challan_pdfs']
+        income_tax_return = self.context['income_tax_return']
+        income_tax_profile = income_tax_return.user.income_tax_profile
+
+        seen = set(SelfAssesmentAndAdvanceTaxPaid.objects.filter(income_tax_return=income_tax_return).values_list(
+            'bsr_code', 'challan_no', 'date'
+        ))
+        records, duplicates, failed = [], [], []
+        for challan_pdf, extracted_data in zip(challan_pdfs, parse_pdfs("challan", challan_pdfs)):
+            if extracted_data is None:
+                failed.append({"file": challan_pdf.name, "error": "Failed to extract data from PDF."})
+                continue
+            key = (extracted_data["bsr_code"], extracted_data["challan_no"], extracted_data["date_of_deposit"])
+            if key in seen:
+                duplicates.append({"file": challan_pdf.name, "bsr_code": key[0], "challan_no": key[1],
+                                   "date_of_deposit": key[2].strftime("%d-%b-%Y")})
+                continue
+            seen.add(key)
+            records.append(SelfAssesmentAndAdvanceTaxPaid(
+                income_tax=income_tax_profile,
+                income_tax_return=income_tax_return,
+                bsr_code=extracted_data["bsr_code"],
+                challan_no=extracted_data["challan_no"],
+                date=extracted_data["date_of_deposit"],
+                amount=extracted_data["amount"],
+                challan_pdf=challan_pdf
+            ))
+
+        with transaction.atomic():
+            SelfAssesmentAndAdvanceTaxPaid.objects.bulk_create(records)
+            if records:
+                ExtractedRecordsService().mark_changed(income_tax_return)
+        return {
+            "created": [ChallanPdfUploadSerializer.response_data(record) for record in records],
+            "duplicates": duplicates,
+            "failed": failed,
+        }
+
+
+class IngestionJobCreateSerializer(BaseSerializer):
+    # left out, the worker detects it from the document's first page.
+    document_type = serializers.ChoiceField(choices=[name for _, name in IngestionJob.DOCUMENT_TYPE_CHOICES],
+                                            required=False, default=None)
+    document = serializers.FileField()
+
+    def validate_document_type(self, value):
+        if value is None:
+            return None
+        return {name: document_type for document_type, name in IngestionJob.DOCUMENT_TYPE_CHOICES}[value]
+
+
+class IngestionJobSerializer(BaseModelSerializer):
+    document_type = serializers.CharField(source='get_document_type_display')
+    status = serializers.CharField(source='get_status_display')
+    stage = serializers.CharField(source='get_stage_display')
+    progress = serializers.SerializerMethodField()
+    error = serializers.CharField()
+
+    class Meta:
+        model = IngestionJob
+        fields = ['id', 'document_type', 'status', 'stage', 'progress', 'result', 'error', 'created_at',
+                  'started_at', 'finished_at']
+
+    def get_progress(self, obj):
+        return {'pages_done': obj.pages_done, 'pages_total': obj.pages_total}
+
+
+class WhatIfScenarioSerializer(BaseSerializer):
+    name = serializers.CharField(max_length=100)
+    deductions = serializers.DictField(required=False, default=dict)
+    salary = serializers.DictField(required=False, default=dict)
+    employer_name = serializers.CharField(required=False, default=None)
+
+    def changes(self, value, amounts, flags):
+        errors, changes = {}, {}
+        for field, change in value.items():
+            if field not in amounts and field not in flags:
+                errors[field] = ["Can't be changed."]
+                continue
+            if field in flags:
+                change_field = serializers.BooleanField()
+            else:
+                change_field = serializers.DecimalField(max_digits=30, decimal_places=2)
+            try:
+                changes[field] = change_field.run_validation(change)
+            except serializers.ValidationError as e:
+                errors[field] = e.detail
+        if errors:
+            raise serializers.ValidationError(errors)
+        return changes
+
+    def validate_deductions(self, value):
+        return self.changes(value, DEDUCTION_AMOUNTS, DEDUCTION_FLAGS)
+
+    def validate_salary(self, value):
+        return self.changes(value, SALARY_AMOUNTS, SALARY_FLAGS)
+
+    def validate(self, attrs):
+        snapshot = self.context['snapshot']
+        records = {"deductions": snapshot.deductions or NO_DEDUCTIONS}
+        if attrs['salary']:
+            employer_names = [salary_income.employer_name for salary_income in snapshot.salary_incomes]
+            if not employer_names:
+                raise serializers.ValidationError({"salary": "The return has no salary income to change."})
+            if attrs['employer_name'] is not None and attrs['employer_name'] not in employer_names:
+                raise serializers.ValidationError({"employer_name": "The return has no salary income from this "
+                                                                    "employer."})
+            index = WhatIfSimulator.salary_index(snapshot, attrs['employer_name'])
+            records["salary"] = snapshot.salary_incomes[index]
+        errors = {}
+        for name, record in records.items():
+            fields = below_zero(record, attrs[name])
+            if fields:
+                errors[name] = {field: ["Can't take the amount below 0."] for field in fields}
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+
+class WhatIfSimulationSerializer(BaseSerializer):
+    MAX_SCENARIOS = 50
+
+    scenarios = serializers.ListField(child=WhatIfScenarioSerializer(), allow_empty=False, max_length=MAX_SCENARIOS)
+
+    def validate_scenarios(self, value):
+        return [Scenario(**scenario) for scenario in value]
+
+
+class DeductionPlanSerializer(BaseSerializer):
+    # left out, a plan may use all the headroom left.
+    budget = serializers.DecimalField(max_digits=30, decimal_places=2, min_value=Decimal('0'), required=False,
+                                      default=None)
+
+
 class ReportsPageGraphDataSerializer(BaseModelSerializer):
     total_income_earned = serializers.SerializerMethodField()
     total_tax_paid = serializers.SerializerMethodField()
@@ -863,21 +894,10 @@ class ReportsPageGraphDataSerializer(BaseModelSerializer):
         fields = ['income_tax_return_year_name', 'total_income_earned', 'total_tax_paid']
 
     def get_total_income_earned(self, obj):
-        total_salary_income = SalaryIncome.objects.filter(income_tax_return=obj).aggregate(total=Sum('gross_salary'))['total'] or 0
-        total_rental_income = RentalIncome.objects.filter(income_tax_return=obj).aggregate(total=Sum('net_rental_income'))['total'] or 0
-        total_capital_gains = CapitalGains.objects.filter(income_tax_return=obj).aggregate(total=Sum('gain_or_loss'))['total'] or 0
-        total_business_income = BusinessIncome.objects.filter(income_tax_return=obj).aggregate(total=Sum('gross_receipt_cheq_neft_rtgs_profit') + Sum('gross_receipt_cash_upi_profit'))['total'] or 0
-        total_agriculture_income = AgricultureIncome.objects.filter(income_tax_return=obj).aggregate(total=Sum('gross_recipts'))['total'] or 0
-        total_exempt_income = ExemptIncome.objects.filter(income_tax_return=obj).aggregate(total=Sum('amount'))['total'] or 0
-        total_income = (total_salary_income + total_rental_income + total_capital_gains +
-                        total_business_income + total_agriculture_income + total_exempt_income)
-        return total_income
+        return ReturnTotalsQuery.for_instance(obj).income_earned
 
     def get_total_tax_paid(self, obj):
-        total_tds_or_tcs_amount = TdsOrTcsDeduction.objects.filter(income_tax_return=obj).aggregate(total=Sum('tds_or_tcs_amount'))['total'] or 0
-        total_self_assessment_amount = SelfAssesmentAndAdvanceTaxPaid.objects.filter(income_tax_return=obj).aggregate(total=Sum('amount'))['total'] or 0
-        total_taxes_paid = total_tds_or_tcs_amount + total_self_assessment_amount
-        return total_taxes_paid
+        return ReturnTotalsQuery.for_instance(obj).taxes_paid
 
 
 class ReportsPageSerializer(BaseModelSerializer):
@@ -899,10 +919,10 @@ class ReportsPageSerializer(BaseModelSerializer):
         ]
 
     def get_total_income_earned(self, obj):
-        return ReportsPageGraphDataSerializer().get_total_income_earned(obj)
+        return ReturnTotalsQuery.for_instance(obj).income_earned
 
     def get_total_tax_paid(self, obj):
-        return ReportsPageGraphDataSerializer().get_total_tax_paid(obj)
+        return ReturnTotalsQuery.for_instance(obj).taxes_paid
 
     def get_contribution_percentage(self, obj):
         total_income = self.get_total_income_earned(obj)
@@ -921,6 +941,10 @@ class TaxSummarySerializer(BaseModelSerializer):
         model = IncomeTaxReturn
         fields = ['old_regime', 'new_regime']
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.returns_with_totals = {}
+
     def get_old_regime(self, obj):
         old_income_tax_return = self.get_previous_year_return(obj)
         if old_income_tax_return:
@@ -929,15 +953,32 @@ class TaxSummarySerializer(BaseModelSerializer):
             return self.get_empty_old_regime_data()
 
     def get_new_regime(self, obj):
-        return self.calculate_tax_summary(obj)
+        current_income_tax_return, _ = self.get_returns_with_totals(obj)
+        return self.calculate_tax_summary(current_income_tax_return)
 
     def get_previous_year_return(self, current_income_tax_return):
         """Retrieve the previous year's income tax return."""
-        previous_year = current_income_tax_return.income_tax_return_year.start_date.year - 1
-        return IncomeTaxReturn.objects.filter(
-            user=current_income_tax_return.user,
-            income_tax_return_year__start_date__year=previous_year
-        ).first()
+        _, previous_income_tax_return = self.get_returns_with_totals(current_income_tax_return)
+        return previous_income_tax_return
+
+    def get_returns_with_totals(self, current_income_tax_return):
+        """
+        The return and the previous year's return of the same user, with their totals annotated, in one query.
+        """
+        if current_income_tax_return.id not in self.returns_with_totals:
+            previous_year = current_income_tax_return.income_tax_return_year.start_date.year - 1
+            income_tax_returns = ReturnTotalsQuery.annotate(IncomeTaxReturn.objects.filter(
+                Q(id=current_income_tax_return.id) | Q(income_tax_return_year__start_date__year=previous_year),
+                user_id=current_income_tax_return.user_id
+            ).order_by('id'))
+            current, previous = None, None
+            for income_tax_return in income_tax_returns:
+                if income_tax_return.id == current_income_tax_return.id:
+                    current = income_tax_return
+                elif previous is None:
+                    previous = income_tax_return
+            self.returns_with_totals[current_income_tax_return.id] = (current, previous)
+        return self.returns_with_totals[current_income_tax_return.id]
 
     def get_empty_old_regime_data(self):
         return {
@@ -959,59 +1000,27 @@ class TaxSummarySerializer(BaseModelSerializer):
         }
 
     def calculate_tax_summary(self, income_tax_return):
-        total_salary_income = SalaryIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('gross_salary'))['total'] or 0
-        total_rental_income = RentalIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('net_rental_income'))['total'] or 0
-        total_capital_gains = CapitalGains.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('gain_or_loss'))['total'] or 0
-        total_business_income = BusinessIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('gross_receipt_cheq_neft_rtgs_profit') + Sum('gross_receipt_cash_upi_profit'))['total'] or 0
-        total_agriculture_income = AgricultureIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('gross_recipts'))['total'] or 0
-        total_exempt_income = ExemptIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_interest_income = InterestIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('interest_amount'))['total'] or 0
-        total_it_refunds = InterestOnItRefunds.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_dividend_income = DividendIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_betting_income = IncomeFromBetting.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-
-        total_others_income = total_interest_income + total_it_refunds + total_dividend_income + total_betting_income
-
-        gross_total_income = (total_salary_income + total_rental_income + total_capital_gains +
-                              total_business_income + total_agriculture_income + total_exempt_income + total_others_income)
-
-        deductions = Deductions.objects.filter(income_tax_return=income_tax_return).first()
-        total_deductions = (
-            deductions.life_insurance + deductions.provident_fund + deductions.elss_mutual_fund +
-            deductions.home_loan_repayment + deductions.tution_fees + deductions.stamp_duty_paid +
-            deductions.others + deductions.contribution_by_self + deductions.contribution_by_employeer +
-            deductions.medical_insurance_self + deductions.medical_preventive_health_checkup_self +
-            deductions.medical_expenditure_self + deductions.medical_insurance_parents +
-            deductions.medical_preventive_health_checkup_parents + deductions.medical_expenditure_parents +
-            deductions.education_loan + deductions.electronic_vehicle_loan + deductions.home_loan_amount +
-            deductions.interest_income + deductions.royality_on_books + deductions.income_on_patients +
-            deductions.income_on_bio_degradable + deductions.rent_paid + deductions.contribution_to_agnipath +
-            deductions.donation_to_political_parties + deductions.donation_others
-        ) if deductions else 0
-
-        total_income = gross_total_income - total_deductions
-        total_tds_or_tcs_amount = TdsOrTcsDeduction.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('tds_or_tcs_amount'))['total'] or 0
-        total_self_assessment_amount = SelfAssesmentAndAdvanceTaxPaid.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_taxes_paid = total_tds_or_tcs_amount + total_self_assessment_amount
+        totals = ReturnTotalsQuery.record(income_tax_return)
+        total_income = totals.gross_total_income - totals.deductions
         tax_on_total_income = self.calculate_tax_on_total_income(total_income)
         interest_and_penalties = self.calculate_interest_and_penalties(total_income)
-        tax_payable_or_refund = total_income - tax_on_total_income - interest_and_penalties - total_taxes_paid
+        tax_payable_or_refund = total_income - tax_on_total_income - interest_and_penalties - totals.taxes_paid
 
         return {
             'income_sources': {
-                'salary_income': total_salary_income,
-                'rental_income': total_rental_income,
-                'capital_gains': total_capital_gains,
-                'business_income': total_business_income,
-                'agriculture_and_exempt_income': total_agriculture_income,
-                'other_income': total_others_income
+                'salary_income': totals.salary_income,
+                'rental_income': totals.rental_income,
+                'capital_gains': totals.capital_gains,
+                'business_income': totals.business_income,
+                'agriculture_and_exempt_income': totals.agriculture_income,
+                'other_income': totals.other_income
             },
-            'gross_total_income': gross_total_income,
-            'deductions': total_deductions,
+            'gross_total_income': totals.gross_total_income,
+            'deductions': totals.deductions,
             'total_income': total_income,
             'tax_on_total_income': tax_on_total_income,
             'interest_and_penalties': interest_and_penalties,
-            'taxes_paid': total_taxes_paid,
+            'taxes_paid': totals.taxes_paid,
             'tax_payable_or_refund': tax_payable_or_refund
         }
 
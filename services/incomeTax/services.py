@@ -1,8 +1,15 @@
+import hashlib
 import random
 from datetime import timedelta
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from accounts.models import OtpRecord
 from accounts.services import EmailService
+from services.incomeTax.models import Computations, IncomeTaxReturn, ReturnTotals, ParsedDocument
+from services.incomeTax.pdf_pages import unlock_document
+from services.incomeTax.totals import ReturnTotalsQuery, ReturnTotalsRecord
 from shared.libs.hashing import AlphaId
 
 
@@ -37,4 +44,220 @@ class PanVerificationService:
                 return True
         except OtpRecord.DoesNotExist:
             return False
-        return False
\ No newline at end of file
+        return False
+
+
+class ComputationCacheService:
+    """
+    Materialized computation results stored in Computations.regime_json_data.
+    An entry is only served while it matches the current IncomeTaxReturn.version and was computed on the
+    filing date, since interest u/s 234A and the 234F penalty depend on the day the computation runs. Entries are
+    the rows with a return_version, the rows posted by the client through ComputationsCreateApi have none and are
+    never read or written here.
+    """
+
+    def get(self, income_tax_return_id, user, regime_type, filing_date):
+        return Computations.objects.filter(
+            income_tax_return_id=income_tax_return_id, income_tax_return__user=user, regime_type=regime_type,
+            return_version=F('income_tax_return__version'), updated_at__date=filing_date
+        ).values_list('regime_json_data', flat=True).first()
+
+    def store(self, income_tax_return, regime_type, regime_json_data):
+        computation = Computations.objects.filter(income_tax_return=income_tax_return, regime_type=regime_type,
+                                                  return_version__isnull=False).first()
+        if computation is None:
+            Computations.objects.create(income_tax_return=income_tax_return, regime_type=regime_type,
+                                        regime_json_data=regime_json_data,
+                                        return_version=income_tax_return.version)
+            return
+        computation.regime_json_data = regime_json_data
+        computation.return_version = income_tax_return.version
+        computation.save(update_fields=['regime_json_data', 'return_version', 'updated_at'])
+
+    def bulk_store(self, regime_type, computations):
+        """
+        Store many results at once, computations is a list of (income tax return id, version, regime json data).
+        """
+        income_tax_return_ids = [income_tax_return_id for income_tax_return_id, _, _ in computations]
+        existing_ids = dict(Computations.objects.filter(
+            income_tax_return_id__in=income_tax_return_ids, regime_type=regime_type, return_version__isnull=False
+        ).values_list('income_tax_return_id', 'id'))
+        now = timezone.now()
+        to_update, to_create = [], []
+        for income_tax_return_id, version, regime_json_data in computations:
+            computation = Computations(income_tax_return_id=income_tax_return_id, regime_type=regime_type,
+                                       regime_json_data=regime_json_data, return_version=version)
+            if income_tax_return_id in existing_ids:
+                computation.id = existing_ids[income_tax_return_id]
+                # bulk_update skips auto_now, the timestamp is what marks the entry as computed today.
+                computation.updated_at = now
+                to_update.append(computation)
+            else:
+                to_create.append(computation)
+        Computations.objects.bulk_update(to_update, ['regime_json_data', 'return_version', 'updated_at'],
+                                         batch_size=500)
+        Computations.objects.bulk_create(to_create, batch_size=500)
+
+
+class ReturnTotalsService:
+    """
+    Keeps the denormalized ReturnTotals rows in step with the income, deductions and taxes paid tables.
+    """
+
+    def refresh(self, income_tax_return_ids, batch_size=500):
+        """
+        Recompute the totals of the given returns from their source tables and upsert their ReturnTotals rows,
+        one aggregate query and one upsert per batch.
+        """
+        income_tax_return_ids = list(income_tax_return_ids)
+        fields = list(ReturnTotalsRecord._fields)
+        for start in range(0, len(income_tax_return_ids), batch_size):
+            totals = ReturnTotalsQuery.aggregate(
+                IncomeTaxReturn.objects.filter(id__in=income_tax_return_ids[start:start + batch_size])
+            )
+            ReturnTotals.objects.bulk_create(
+                [ReturnTotals(income_tax_return_id=income_tax_return_id, **record._asdict())
+                 for income_tax_return_id, record in totals],
+                update_conflicts=True, unique_fields=['income_tax_return'], update_fields=fields + ['updated_at'],
+            )
+
+
+class ExtractedRecordsService:
+    """
+    Saves the records extracted from AIS and 26AS PDFs against a return in bulk. Each model's existing rows for the
+    return are loaded once and the records are matched to them in memory, then written with one bulk_update and
+    one bulk_create. Bulk writes skip save() and post_save, so derived fields are calculated here and
+    mark_changed() does what the signals would have done.
+    """
+
+    def upsert(self, model, income_tax_return, key_fields, records, batch_size=500):
+        """
+        Update or create a row of the return per record, a dict of field values matched to existing rows on
+        key_fields like update_or_create would. Returns the saved instances in the order of the records.
+        """
+        income_tax_profile = income_tax_return.user.income_tax_profile
+        existing = {}
+        for instance in model.objects.filter(income_tax=income_tax_profile,
+                                             income_tax_return=income_tax_return).order_by('-id'):
+            existing[tuple(getattr(instance, field) for field in key_fields)] = instance
+
+        now = timezone.now()
+        to_update, to_create, saved = {}, {}, []
+        for record in records:
+            key = tuple(record[field] for field in key_fields)
+            instance = existing.get(key) or to_create.get(key)
+            if instance is None:
+                instance = model(income_tax=income_tax_profile, income_tax_return=income_tax_return, **record)
+                to_create[key] = instance
+            else:
+                for field, value in record.items():
+                    setattr(instance, field, value)
+                if instance.pk:
+                    # bulk_update skips auto_now.
+                    instance.updated_at = now
+                    to_update[key] = instance
+            saved.append(instance)
+        # the fields a model's save() derives from the others.
+        for instance in list(to_update.values()) + list(to_create.values()):
+            if hasattr(instance, 'calculate_derived_fields'):
+                instance.calculate_derived_fields()
+
+        update_fields = list({field for record in records for field in record if field not in key_fields})
+        update_fields += list(getattr(model, 'DERIVED_FIELDS', ()))
+        if to_update:
+            model.objects.bulk_update(list(to_update.values()), update_fields + ['updated_at'], batch_size=batch_size)
+        model.objects.bulk_create(list(to_create.values()), batch_size=batch_size)
+        return saved
+
+    def mark_changed(self, income_tax_return):
+        IncomeTaxReturn.objects.filter(id=income_tax_return.id).update(version=F('version') + 1)
+        transaction.on_commit(lambda: ReturnTotalsService().refresh([income_tax_return.id]))
+
+
+class ParsedDocumentCacheService:
+    """
+    Records extracted from AIS, TIS and 26AS PDFs, reused when the same document is uploaded again. Entries are
+    kept per parser version, bumping a parser's version turns every entry it wrote before into a miss.
+    """
+    CHUNK_SIZE = 1024 * 1024
+    DOCUMENT_TYPES = {name: document_type for document_type, name in ParsedDocument.DOCUMENT_TYPE_CHOICES}
+
+    def digest(self, pdf_file, password):
+        # the password is part of the key, the same bytes opened with another user's password aren't a hit.
+        sha256 = hashlib.sha256(hashlib.sha256((password or '').encode()).digest())
+        pdf_file.seek(0)
+        for chunk in iter(lambda: pdf_file.read(self.CHUNK_SIZE), b''):
+            sha256.update(chunk)
+        pdf_file.seek(0)
+        return sha256.hexdigest()
+
+    def get(self, document_type, sha256, parser_version):
+        return ParsedDocument.objects.filter(
+            sha256=sha256, document_type=document_type, parser_version=parser_version
+        ).values_list('extracted_data', flat=True).first()
+
+    def store(self, document_type, sha256, parser_version, extracted_data):
+        ParsedDocument.objects.update_or_create(sha256=sha256, document_type=document_type,
+                                                parser_version=parser_version,
+                                                defaults={'extracted_data': extracted_data})
+
+    def extract(self, parser, pdf_file, password, parse):
+        """
+        The cached records the parser extracted from the PDF, or the records parse() extracts from it. Failed or
+        empty extractions aren't stored.
+        """
+        document_type = self.DOCUMENT_TYPES[parser.document_type]
+        sha256 = self.digest(pdf_file, password)
+        extracted_data = self.get(document_type, sha256, parser.version)
+        if extracted_data is None:
+            extracted_data = parse()
+            if extracted_data:
+                self.store(document_type, sha256, parser.version, extracted_data)
+        return extracted_data
+
+
+class StatementPasswordService:
+    """
+    The passwords a user's tax statements can be encrypted with, derived from the IncomeTaxProfile once per
+    upload. The AIS and TIS use the lower case PAN followed by the date of birth as DDMMYYYY, TRACES encrypts the
+    26AS with the date of birth alone. The index of the candidate that opened a profile's last statement of a type
+    is cached and tried first, so repeated uploads authenticate once.
+    """
+    CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+    def candidates(self, income_tax_profile, document_type=None):
+        """
+        Every candidate for the document type in the order they are tried, the candidates of every type when it
+        isn't known yet.
+        """
+        if not (income_tax_profile.pan_no and income_tax_profile.date_of_birth):
+            return []
+        date_of_birth = income_tax_profile.date_of_birth.strftime('%d%m%Y')
+        pan_and_date_of_birth = [f"{income_tax_profile.pan_no.lower()}{date_of_birth}",
+                                 f"{income_tax_profile.pan_no.upper()}{date_of_birth}"]
+        if document_type == "26as":
+            return [date_of_birth] + pan_and_date_of_birth
+        if document_type in ("ais", "tis"):
+            return pan_and_date_of_birth
+        if document_type is None:
+            return pan_and_date_of_birth + [date_of_birth]
+        return []
+
+    def cache_key(self, income_tax_profile, document_type):
+        return f"statement-password:{income_tax_profile.id}:{document_type or 'any'}"
+
+    def unlock(self, income_tax_profile, pdf_file, document_type=None):
+        """
+        The password that opens the PDF, None when it isn't encrypted. Raises InvalidPdfPassword when no candidate
+        opens it.
+        """
+        candidates = self.candidates(income_tax_profile, document_type)
+        cache_key = self.cache_key(income_tax_profile, document_type)
+        known_good = cache.get(cache_key)
+        order = list(range(len(candidates)))
+        if known_good in order:
+            order.insert(0, order.pop(known_good))
+        password = unlock_document(pdf_file, [candidates[index] for index in order])
+        if password is not None and candidates.index(password) != known_good:
+            cache.set(cache_key, candidates.index(password), self.CACHE_TIMEOUT)
+        return password
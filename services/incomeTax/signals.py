@@ -0,0 +1,71 @@
+import threading
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+
+from services.incomeTax.models import IncomeTaxReturn, IncomeTaxReturnYears, SalaryIncome, RentalIncome, CapitalGains, BusinessIncome, \
+    AgricultureIncome, ExemptIncome, InterestIncome, InterestOnItRefunds, DividendIncome, IncomeFromBetting, \
+    Deductions, TdsOrTcsDeduction, SelfAssesmentAndAdvanceTaxPaid
+from services.incomeTax.services import ReturnTotalsService
+from services.incomeTax.totals import ReturnTotalsQuery
+
+# every model the tax computation reads, a change to any of them invalidates the stored Computations.
+COMPUTATION_INPUT_MODELS = (
+    SalaryIncome, RentalIncome, CapitalGains, BusinessIncome, AgricultureIncome, ExemptIncome, InterestIncome,
+    InterestOnItRefunds, DividendIncome, IncomeFromBetting, Deductions, TdsOrTcsDeduction,
+    SelfAssesmentAndAdvanceTaxPaid,
+)
+
+
+def bump_income_tax_return_version(sender, instance, **kwargs):
+    if instance.income_tax_return_id:
+        IncomeTaxReturn.objects.filter(id=instance.income_tax_return_id).update(version=F('version') + 1)
+
+
+for model in COMPUTATION_INPUT_MODELS:
+    post_save.connect(bump_income_tax_return_version, sender=model,
+                      dispatch_uid=f'bump_income_tax_return_version_save_{model.__name__}')
+    post_delete.connect(bump_income_tax_return_version, sender=model,
+                        dispatch_uid=f'bump_income_tax_return_version_delete_{model.__name__}')
+
+
+def bump_income_tax_return_year_versions(sender, instance, **kwargs):
+    # slab changes on a year invalidate every return filed for it.
+    IncomeTaxReturn.objects.filter(income_tax_return_year=instance).update(version=F('version') + 1)
+
+
+post_save.connect(bump_income_tax_return_year_versions, sender=IncomeTaxReturnYears,
+                  dispatch_uid='bump_income_tax_return_year_versions')
+
+
+# ids of the returns written on this thread whose ReturnTotals haven't been refreshed yet.
+pending_return_totals = threading.local()
+
+
+def flush_return_totals():
+    income_tax_return_ids = getattr(pending_return_totals, 'income_tax_return_ids', None)
+    if not income_tax_return_ids:
+        return
+    pending_return_totals.income_tax_return_ids = set()
+    ReturnTotalsService().refresh(sorted(income_tax_return_ids))
+
+
+def refresh_return_totals(sender, instance, **kwargs):
+    income_tax_return_id = instance.income_tax_return_id
+    if not income_tax_return_id:
+        return
+    # after commit, so a return deleted with its rows isn't given a new ReturnTotals row mid-cascade. The first
+    # flush to run after a commit refreshes every return written in the transaction at once, the others find nothing
+    # left. Ids of rolled back writes wait for the next commit, refreshing them again is harmless.
+    if not hasattr(pending_return_totals, 'income_tax_return_ids'):
+        pending_return_totals.income_tax_return_ids = set()
+    pending_return_totals.income_tax_return_ids.add(income_tax_return_id)
+    transaction.on_commit(flush_return_totals)
+
+
+for model in ReturnTotalsQuery.SOURCE_MODELS:
+    post_save.connect(refresh_return_totals, sender=model,
+                      dispatch_uid=f'refresh_return_totals_save_{model.__name__}')
+    post_delete.connect(refresh_return_totals, sender=model,
+                        dispatch_uid=f'refresh_return_totals_delete_{model.__name__}')
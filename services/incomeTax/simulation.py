@@ -0,0 +1,199 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from services.incomeTax.slabs import SlabTable
+from services.incomeTax.snapshot import DeductionsRecord
+from services.incomeTax.utils import IncomeTaxCalculations
+
+
+# deductions and salary map fields of DeductionsRecord and SalaryIncomeRecord to the amount they change by,
+# booleans are set. The salary changes apply to the salary income of employer_name, the first one when it is None.
+Scenario = namedtuple('Scenario', ['name', 'deductions', 'salary', 'employer_name'])
+
+DEDUCTION_FLAGS = ('senior_citizen_parents',)
+DEDUCTION_AMOUNTS = tuple(field for field in DeductionsRecord._fields if field not in DEDUCTION_FLAGS)
+SALARY_FLAGS = ('do_you_live_in_these_cities',)
+SALARY_AMOUNTS = ('gross_salary', 'basic_salary_component', 'hra_component', 'annual_rent_paid')
+NO_DEDUCTIONS = DeductionsRecord(**{field: Decimal('0') for field in DEDUCTION_AMOUNTS},
+                                 **{field: False for field in DEDUCTION_FLAGS})
+
+
+def below_zero(record, changes):
+    """
+    The amount fields the changes would take below 0.
+    """
+    return [field for field, value in changes.items()
+            if not isinstance(value, bool) and (getattr(record, field) or Decimal('0')) + value < 0]
+
+
+def changed(record, changes):
+    if below_zero(record, changes):
+        raise ValueError(f"Changes take {', '.join(below_zero(record, changes))} below 0")
+    return record._replace(**{
+        field: value if isinstance(value, bool) else (getattr(record, field) or Decimal('0')) + value
+        for field, value in changes.items()
+    })
+
+
+class WhatIfSimulator:
+    """
+    Computes both regimes for hypothetical changes to a return without saving them. Every scenario is applied to
+    the one ReturnSnapshot loaded for the request, so a request costs the snapshot's two queries however many
+    scenarios it has.
+    """
+    BASELINE = "current"
+
+    def __init__(self):
+        self.calc = IncomeTaxCalculations()
+
+    def apply(self, snapshot, scenario):
+        changes = {}
+        if scenario.deductions:
+            changes['deductions'] = changed(snapshot.deductions or NO_DEDUCTIONS, scenario.deductions)
+        if scenario.salary:
+            index = self.salary_index(snapshot, scenario.employer_name)
+            if index is None:
+                raise ValueError(f"No salary income to change in scenario '{scenario.name}'")
+            salary_incomes = list(snapshot.salary_incomes)
+            salary_incomes[index] = changed(salary_incomes[index], scenario.salary)
+            changes['salary_incomes'] = salary_incomes
+        return snapshot.replace(**changes) if changes else snapshot
+
+    @staticmethod
+    def salary_index(snapshot, employer_name):
+        for index, salary_income in enumerate(snapshot.salary_incomes):
+            if employer_name is None or salary_income.employer_name == employer_name:
+                return index
+        return None
+
+    def compute(self, snapshot, filing_date):
+        return self.calc.calculate_dual_regime(snapshot, Decimal('50000'), filing_date)
+
+    def regime_row(self, result, baseline_result):
+        return {
+            "gross_total_income": self.calc.round_off_decimal(result.gross_total_income),
+            "total_income": self.calc.round_off_decimal(result.total_income),
+            "net_tax_payable": self.calc.round_off_decimal(result.net_tax_payable),
+            "tax_payable": self.calc.round_off_decimal(result.tax_payable),
+            "savings": self.calc.round_off_decimal(baseline_result.net_tax_payable - result.net_tax_payable),
+        }
+
+    def row(self, name, computation, baseline):
+        old, new = computation.old, computation.new
+        return {
+            "name": name,
+            "total_deduction_amount": self.calc.round_off_decimal(computation.total_deduction_amount),
+            "old_regime": self.regime_row(old, baseline.old),
+            "new_regime": self.regime_row(new, baseline.new),
+            "recommended_regime": "new" if new.net_tax_payable < old.net_tax_payable else "old",
+            "best_net_tax_payable": self.calc.round_off_decimal(min(old.net_tax_payable, new.net_tax_payable)),
+        }
+
+    def simulate(self, snapshot, scenarios, filing_date):
+        """
+        The comparison grid, the return as it is first and then every scenario in order. Savings are against the
+        same regime of the return as it is. Raises ValueError when a scenario changes a salary income the return
+        doesn't have or takes an amount below 0.
+        """
+        baseline = self.compute(snapshot, filing_date)
+        grid = [self.row(self.BASELINE, baseline, baseline)]
+        for scenario in scenarios:
+            grid.append(self.row(scenario.name, self.compute(self.apply(snapshot, scenario), filing_date), baseline))
+        return self.calc.convert_to_json_serializable({"scenarios": grid})
+
+
+class DeductionOptimizer:
+    """
+    The cheapest investment of the headroom left under 80C and 80D that brings each regime's tax to its minimum.
+    Deductions lower total income rupee for rupee whichever section they are claimed under, so the search runs
+    over the amount invested: tax is linear in it between the amounts that take total income across a slab, rebate
+    or surcharge breakpoint of the SlabTable, so only those amounts and the two ends are evaluated. Every amount is
+    computed through WhatIfSimulator, so a plan claims exactly what calculate_dual_regime lets each regime claim.
+    """
+    # sections the plan invests in, in the order they are filled, with the DeductionsRecord field they are
+    # booked on.
+    SECTIONS = (("80c", "others"), ("80d", "medical_insurance_self"))
+
+    def __init__(self):
+        self.calc = IncomeTaxCalculations()
+        self.simulator = WhatIfSimulator()
+
+    def headroom(self, computation, deductions):
+        """
+        What each section can still be claimed for. 80TTA is only reported, savings interest claimed under it is
+        also income, so it can't lower the tax.
+        """
+        deductions = deductions or NO_DEDUCTIONS
+        if deductions.senior_citizen_parents:
+            medical_premium_limit = self.calc.MEDICAL_PREMIUM_LIMIT_SENIOR_CITIZEN_PARENTS
+        else:
+            medical_premium_limit = self.calc.MEDICAL_PREMIUM_LIMIT
+        return {
+            "80c": self.calc.DEDUCTION_80C_LIMIT - computation.deduction_80c_sum,
+            "80d": medical_premium_limit - computation.medical_premium_sum,
+            "80tta": self.calc.INTEREST_ON_SAVINGS_LIMIT - computation.interest_on_savings_sum,
+        }
+
+    def candidates(self, slab_table, total_income, limit):
+        """
+        The amounts up to limit the tax of a regime with this slab table and total income can be lowest at.
+        """
+        breakpoints = slab_table.boundaries + [slab_table.rebate_income_limit] + slab_table.surcharge_thresholds
+        return {Decimal('0'), limit} | {total_income - breakpoint for breakpoint in breakpoints
+                                        if 0 < total_income - breakpoint < limit}
+
+    def allocate(self, amount, headroom):
+        allocation = {}
+        for section, _ in self.SECTIONS:
+            allocation[section] = min(amount, headroom[section])
+            amount -= allocation[section]
+        return allocation
+
+    def scenario(self, amount, headroom):
+        allocation = self.allocate(amount, headroom)
+        return allocation, Scenario("plan", {field: allocation[section] for section, field in self.SECTIONS
+                                             if allocation[section]}, {}, None)
+
+    def plan(self, snapshot, filing_date, budget=None):
+        """
+        The current tax, headroom and cheapest plan of both regimes, with the regime whose plan leaves less tax
+        recommended. budget caps what a plan invests.
+        """
+        computation = self.simulator.compute(snapshot, filing_date)
+        headroom = self.headroom(computation, snapshot.deductions)
+        limit = sum(headroom[section] for section, _ in self.SECTIONS)
+        if budget is not None:
+            limit = min(limit, budget)
+
+        amounts = set()
+        for regime in ("old", "new"):
+            amounts |= self.candidates(SlabTable.for_year(snapshot.income_tax_return_year, regime),
+                                       getattr(computation, regime).total_income, limit)
+        results = {Decimal('0'): computation}
+        for amount in amounts - {Decimal('0')}:
+            _, scenario = self.scenario(amount, headroom)
+            results[amount] = self.simulator.compute(self.simulator.apply(snapshot, scenario), filing_date)
+
+        plans = {}
+        for regime in ("old", "new"):
+            current = getattr(computation, regime)
+            amount = min(results, key=lambda candidate: (getattr(results[candidate], regime).net_tax_payable,
+                                                         candidate))
+            allocation, _ = self.scenario(amount, headroom)
+            result = getattr(results[amount], regime)
+            plans[regime] = {
+                "current_net_tax_payable": self.calc.round_off_decimal(current.net_tax_payable),
+                "investment": self.calc.round_off_decimal(amount),
+                "allocation": {section: self.calc.round_off_decimal(value) for section, value in allocation.items()},
+                "total_income": self.calc.round_off_decimal(result.total_income),
+                "net_tax_payable": self.calc.round_off_decimal(result.net_tax_payable),
+                "tax_payable": self.calc.round_off_decimal(result.tax_payable),
+                "savings": self.calc.round_off_decimal(current.net_tax_payable - result.net_tax_payable),
+            }
+        return self.calc.convert_to_json_serializable({
+            "headroom": {section: self.calc.round_off_decimal(value) for section, value in headroom.items()},
+            "old_regime": plans["old"],
+            "new_regime": plans["new"],
+            "recommended_regime": "new" if plans["new"]["net_tax_payable"] < plans["old"]["net_tax_payable"]
+            else "old",
+        })
@@ -0,0 +1,96 @@
+from bisect import bisect_right
+from decimal import Decimal
+
+
+# slabs are (lower limit, rate) pairs, income up to the first lower limit is not taxed.
+# surcharge slabs are (income threshold, rate on tax) pairs.
+DEFAULT_TAX_SLABS = {
+    "old": {
+        "slabs": [["250000", "0.05"], ["500000", "0.20"], ["1000000", "0.30"]],
+        "rebate": {"income_limit": "500000", "max_rebate": "12500"},
+        "surcharge": [["5000000", "0.10"], ["10000000", "0.15"], ["20000000", "0.25"], ["50000000", "0.37"]],
+    },
+    "new": {
+        "slabs": [["300000", "0.05"], ["600000", "0.10"], ["900000", "0.15"], ["1200000", "0.20"],
+                  ["1500000", "0.30"]],
+        "rebate": {"income_limit": "700000", "max_rebate": "25000"},
+        "surcharge": [["5000000", "0.10"], ["10000000", "0.15"], ["20000000", "0.25"]],
+    },
+}
+
+
+class SlabTable:
+    """
+    Income tax slabs of one regime for one IncomeTaxReturnYears row.
+
+    Cumulative tax at every slab boundary is precomputed, so the tax on an income is a bisect to find its slab
+    plus one multiply. Tables are built from IncomeTaxReturnYears.tax_slabs (falling back to DEFAULT_TAX_SLABS)
+    and cached per year, so a new assessment year only needs its slabs configured on the year row.
+    """
+    _cache = {}
+
+    def __init__(self, slabs, rebate_income_limit, max_rebate, surcharge_slabs):
+        self.boundaries = [Decimal(lower_limit) for lower_limit, _ in slabs]
+        self.rates = [Decimal(rate) for _, rate in slabs]
+        self.cumulative_tax = [Decimal(0)]
+        for i in range(1, len(self.boundaries)):
+            self.cumulative_tax.append(
+                self.cumulative_tax[-1] + (self.boundaries[i] - self.boundaries[i - 1]) * self.rates[i - 1])
+        self.rebate_income_limit = Decimal(rebate_income_limit)
+        self.max_rebate = Decimal(max_rebate)
+        self.surcharge_thresholds = [Decimal(threshold) for threshold, _ in surcharge_slabs]
+        self.surcharge_rates = [Decimal(rate) for _, rate in surcharge_slabs]
+        # tax plus surcharge payable exactly at each threshold, used for marginal relief.
+        self.tax_with_surcharge_at_threshold = []
+        for i, threshold in enumerate(self.surcharge_thresholds):
+            previous_rate = self.surcharge_rates[i - 1] if i else Decimal(0)
+            self.tax_with_surcharge_at_threshold.append(self.tax(threshold) * (1 + previous_rate))
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["slabs"], config["rebate"]["income_limit"], config["rebate"]["max_rebate"],
+                   config["surcharge"])
+
+    @classmethod
+    def default(cls, regime):
+        key = (None, None, regime)
+        if key not in cls._cache:
+            cls._cache[key] = cls.from_config(DEFAULT_TAX_SLABS[regime])
+        return cls._cache[key]
+
+    @classmethod
+    def for_year(cls, income_tax_return_year, regime):
+        """
+        Table for a ReturnYearRecord or IncomeTaxReturnYears, rebuilt only when the year row is updated.
+        """
+        tax_slabs = income_tax_return_year.tax_slabs or {}
+        if regime not in tax_slabs:
+            return cls.default(regime)
+        key = (income_tax_return_year.id, income_tax_return_year.updated_at, regime)
+        if key not in cls._cache:
+            cls._cache[key] = cls.from_config(tax_slabs[regime])
+        return cls._cache[key]
+
+    def tax(self, total_income):
+        i = bisect_right(self.boundaries, total_income) - 1
+        if i < 0:
+            return Decimal(0)
+        return self.cumulative_tax[i] + (total_income - self.boundaries[i]) * self.rates[i]
+
+    def rebate(self, total_income, tax_liability):
+        if total_income <= self.rebate_income_limit:
+            return min(self.max_rebate, tax_liability)
+        return Decimal(0)
+
+    def surcharge(self, total_income, tax_liability):
+        i = bisect_right(self.surcharge_thresholds, total_income) - 1
+        # surcharge applies above the threshold, income exactly at it pays the lower rate.
+        if i >= 0 and total_income == self.surcharge_thresholds[i]:
+            i -= 1
+        if i < 0:
+            return Decimal(0)
+        surcharge = tax_liability * self.surcharge_rates[i]
+        # marginal relief: income over the threshold can't cost more in tax and surcharge than the excess itself.
+        max_surcharge = (self.tax_with_surcharge_at_threshold[i] + (total_income - self.surcharge_thresholds[i])
+                         - tax_liability)
+        return max(Decimal(0), min(surcharge, max_surcharge))
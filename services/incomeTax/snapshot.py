@@ -0,0 +1,206 @@
+from collections import namedtuple
+
+from django.db.models import BooleanField, CharField, DateField, DecimalField, F, IntegerField, Value
+from django.db.models.functions import Cast
+
+from services.incomeTax.models import IncomeTaxReturn, SalaryIncome, RentalIncome, CapitalGains, BusinessIncome, \
+    InterestIncome, DividendIncome, IncomeFromBetting, ExemptIncome, AgricultureIncome, TdsOrTcsDeduction, \
+    SelfAssesmentAndAdvanceTaxPaid, Deductions
+
+
+ReturnYearRecord = namedtuple('ReturnYearRecord', [
+    'id', 'name', 'start_date', 'end_date', 'due_date', 'tax_slabs', 'updated_at'
+])
+SalaryIncomeRecord = namedtuple('SalaryIncomeRecord', [
+    'employer_name', 'gross_salary', 'basic_salary_component', 'hra_component', 'annual_rent_paid',
+    'do_you_live_in_these_cities'
+])
+RentalIncomeRecord = namedtuple('RentalIncomeRecord', [
+    'occupancy_status', 'annual_rent', 'property_tax_paid', 'standard_deduction', 'interest_on_home_loan_dcp',
+    'interest_on_home_loan_pc'
+])
+CapitalGainRecord = namedtuple('CapitalGainRecord', ['asset_type', 'term_type', 'gain_or_loss'])
+BusinessIncomeRecord = namedtuple('BusinessIncomeRecord', [
+    'business_income_type', 'gross_receipt_cheq_neft_rtgs_profit', 'gross_receipt_cash_upi_profit'
+])
+InterestIncomeRecord = namedtuple('InterestIncomeRecord', ['interest_income_type', 'interest_amount'])
+AmountRecord = namedtuple('AmountRecord', ['amount'])
+AgricultureIncomeRecord = namedtuple('AgricultureIncomeRecord', ['net_income'])
+TdsOrTcsRecord = namedtuple('TdsOrTcsRecord', ['tds_or_tcs_amount'])
+TaxPaidRecord = namedtuple('TaxPaidRecord', ['date', 'amount'])
+DeductionsRecord = namedtuple('DeductionsRecord', [
+    'life_insurance', 'provident_fund', 'elss_mutual_fund', 'home_loan_repayment', 'tution_fees', 'stamp_duty_paid',
+    'others', 'contribution_by_self', 'contribution_by_employeer', 'medical_insurance_self',
+    'medical_preventive_health_checkup_self', 'medical_expenditure_self', 'medical_insurance_parents',
+    'medical_preventive_health_checkup_parents', 'medical_expenditure_parents', 'senior_citizen_parents'
+])
+
+
+class ReturnSnapshot:
+    """
+    Immutable, fully loaded view of everything IncomeTaxCalculations needs for one IncomeTaxReturn.
+
+    The return row (with its year and deductions) is fetched with one query and every income and tax paid row
+    is fetched with a single UNION ALL "ledger" query, so building a snapshot costs two round-trips no matter
+    how many income tables the return touches.
+    """
+    SALARY, RENTAL, CAPITAL_GAINS, BUSINESS, INTEREST, DIVIDEND, BETTING, EXEMPT, AGRICULTURE, TDS, TAX_PAID = \
+        1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11
+
+    # ledger column -> output field, every table below is projected onto these columns.
+    LEDGER_COLUMNS = (
+        ('ledger_source', IntegerField()),
+        ('ledger_pk', IntegerField()),
+        ('ledger_kind', IntegerField()),
+        ('ledger_term', IntegerField()),
+        ('ledger_label', CharField()),
+        ('ledger_date', DateField()),
+        ('ledger_flag', BooleanField()),
+        ('ledger_amount_1', DecimalField(max_digits=30, decimal_places=2)),
+        ('ledger_amount_2', DecimalField(max_digits=30, decimal_places=2)),
+        ('ledger_amount_3', DecimalField(max_digits=30, decimal_places=2)),
+        ('ledger_amount_4', DecimalField(max_digits=30, decimal_places=2)),
+        ('ledger_amount_5', DecimalField(max_digits=30, decimal_places=2)),
+    )
+    LEDGER_TABLES = (
+        (SALARY, SalaryIncome, {
+            'ledger_label': 'employer_name', 'ledger_flag': 'do_you_live_in_these_cities',
+            'ledger_amount_1': 'gross_salary', 'ledger_amount_2': 'basic_salary_component',
+            'ledger_amount_3': 'hra_component', 'ledger_amount_4': 'annual_rent_paid',
+        }),
+        (RENTAL, RentalIncome, {
+            'ledger_kind': 'occupancy_status', 'ledger_amount_1': 'annual_rent',
+            'ledger_amount_2': 'property_tax_paid', 'ledger_amount_3': 'standard_deduction',
+            'ledger_amount_4': 'interest_on_home_loan_dcp', 'ledger_amount_5': 'interest_on_home_loan_pc',
+        }),
+        (CAPITAL_GAINS, CapitalGains, {
+            'ledger_kind': 'asset_type', 'ledger_term': 'term_type', 'ledger_amount_1': 'gain_or_loss',
+        }),
+        (BUSINESS, BusinessIncome, {
+            'ledger_label': 'business_income_type', 'ledger_amount_1': 'gross_receipt_cheq_neft_rtgs_profit',
+            'ledger_amount_2': 'gross_receipt_cash_upi_profit',
+        }),
+        (INTEREST, InterestIncome, {'ledger_kind': 'interest_income_type', 'ledger_amount_1': 'interest_amount'}),
+        (DIVIDEND, DividendIncome, {'ledger_amount_1': 'amount'}),
+        (BETTING, IncomeFromBetting, {'ledger_amount_1': 'amount'}),
+        (EXEMPT, ExemptIncome, {'ledger_amount_1': 'amount'}),
+        (AGRICULTURE, AgricultureIncome, {'ledger_amount_1': 'net_income'}),
+        (TDS, TdsOrTcsDeduction, {'ledger_amount_1': 'tds_or_tcs_amount'}),
+        (TAX_PAID, SelfAssesmentAndAdvanceTaxPaid, {'ledger_date': 'date', 'ledger_amount_1': 'amount'}),
+    )
+
+    # source -> attribute its records are kept in.
+    RECORD_ATTRIBUTES = {
+        SALARY: 'salary_incomes', RENTAL: 'rental_incomes', CAPITAL_GAINS: 'capital_gains',
+        BUSINESS: 'business_incomes', INTEREST: 'interest_incomes', DIVIDEND: 'dividend_incomes',
+        BETTING: 'income_from_bettings', EXEMPT: 'exempt_incomes', AGRICULTURE: 'agriculture_incomes',
+        TDS: 'tds_deductions', TAX_PAID: 'self_assessment_advance_tax',
+    }
+
+    def __init__(self, income_tax_return, deductions, records):
+        self.income_tax_return = income_tax_return
+        return_year = income_tax_return.income_tax_return_year
+        self.income_tax_return_year = ReturnYearRecord(
+            return_year.id, return_year.name, return_year.start_date, return_year.end_date, return_year.due_date,
+            return_year.tax_slabs, return_year.updated_at
+        )
+        self.deductions = deductions
+        self.salary_incomes = records[self.SALARY]
+        self.rental_incomes = records[self.RENTAL]
+        self.capital_gains = records[self.CAPITAL_GAINS]
+        self.business_incomes = records[self.BUSINESS]
+        self.interest_incomes = records[self.INTEREST]
+        self.dividend_incomes = records[self.DIVIDEND]
+        self.income_from_bettings = records[self.BETTING]
+        self.exempt_incomes = records[self.EXEMPT]
+        self.agriculture_incomes = records[self.AGRICULTURE]
+        self.tds_deductions = records[self.TDS]
+        self.self_assessment_advance_tax = records[self.TAX_PAID]
+
+    def __setattr__(self, name, value):
+        if name in self.__dict__:
+            raise AttributeError(f"ReturnSnapshot is immutable, cannot reassign '{name}'")
+        super().__setattr__(name, value)
+
+    def replace(self, **changes):
+        """
+        A snapshot of the same return with deductions or any of the RECORD_ATTRIBUTES replaced, for computing
+        changes to a return without saving them.
+        """
+        deductions = changes.pop('deductions', self.deductions)
+        records = {source: tuple(changes.pop(attribute, getattr(self, attribute)))
+                   for source, attribute in self.RECORD_ATTRIBUTES.items()}
+        if changes:
+            raise TypeError(f"ReturnSnapshot has no '{', '.join(changes)}' to replace")
+        return type(self)(self.income_tax_return, deductions, records)
+
+    @classmethod
+    def load(cls, income_tax_return_id, user):
+        """
+        Build the snapshot for the given return of the given user.
+        Raises IncomeTaxReturn.DoesNotExist when the return does not belong to the user.
+        """
+        income_tax_return = IncomeTaxReturn.objects.select_related(
+            'user', 'income_tax_return_year', 'deductions'
+        ).get(id=income_tax_return_id, user=user)
+        return cls.from_income_tax_return(income_tax_return)
+
+    @classmethod
+    def from_income_tax_return(cls, income_tax_return):
+        try:
+            deductions = cls.build_deductions_record(income_tax_return.deductions)
+        except Deductions.DoesNotExist:
+            deductions = None
+        records = {source: [] for source, _, _ in cls.LEDGER_TABLES}
+        for row in cls.ledger_queryset(income_tax_return.id):
+            source = row[0]
+            records[source].append(cls.build_record(source, row))
+        return cls(income_tax_return, deductions, {source: tuple(rows) for source, rows in records.items()})
+
+    @classmethod
+    def ledger_queryset(cls, income_tax_return_id):
+        querysets = []
+        for source, model, columns in cls.LEDGER_TABLES:
+            annotations = {}
+            for column, output_field in cls.LEDGER_COLUMNS:
+                if column == 'ledger_source':
+                    annotations[column] = Value(source, output_field=output_field)
+                elif column == 'ledger_pk':
+                    annotations[column] = F('id')
+                elif column in columns:
+                    annotations[column] = Cast(F(columns[column]), output_field=output_field)
+                else:
+                    # untyped NULLs make postgres guess text for the whole union column.
+                    annotations[column] = Cast(Value(None), output_field=output_field)
+            querysets.append(
+                model.objects.filter(income_tax_return_id=income_tax_return_id).order_by().annotate(
+                    **annotations
+                ).values_list(*[column for column, _ in cls.LEDGER_COLUMNS])
+            )
+        first, *rest = querysets
+        return first.union(*rest, all=True).order_by('ledger_source', 'ledger_pk')
+
+    @classmethod
+    def build_record(cls, source, row):
+        _, _, kind, term, label, on, flag, amount_1, amount_2, amount_3, amount_4, amount_5 = row
+        if source == cls.SALARY:
+            return SalaryIncomeRecord(label, amount_1, amount_2, amount_3, amount_4, flag)
+        if source == cls.RENTAL:
+            return RentalIncomeRecord(kind, amount_1, amount_2, amount_3, amount_4, amount_5)
+        if source == cls.CAPITAL_GAINS:
+            return CapitalGainRecord(kind, term, amount_1)
+        if source == cls.BUSINESS:
+            return BusinessIncomeRecord(label, amount_1, amount_2)
+        if source == cls.INTEREST:
+            return InterestIncomeRecord(kind, amount_1)
+        if source == cls.AGRICULTURE:
+            return AgricultureIncomeRecord(amount_1)
+        if source == cls.TDS:
+            return TdsOrTcsRecord(amount_1)
+        if source == cls.TAX_PAID:
+            return TaxPaidRecord(on, amount_1)
+        return AmountRecord(amount_1)
+
+    @staticmethod
+    def build_deductions_record(deductions):
+        return DeductionsRecord(*[getattr(deductions, field) for field in DeductionsRecord._fields])
@@ -1,3 +1,319 @@
-from django.test import TestCase
+import io
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase
+
+from accounts.models import User
+from services.incomeTax.batch import BatchTaxCalculations
+from services.incomeTax.models import (
+    IncomeTaxProfile, IncomeTaxReturnYears, IncomeTaxReturn, SalaryIncome, RentalIncome, CapitalGains, BusinessIncome,
+    AgricultureIncome, ExemptIncome, InterestIncome, DividendIncome, IncomeFromBetting, Deductions, TdsOrTcsDeduction,
+    SelfAssesmentAndAdvanceTaxPaid
+)
+from services.incomeTax.parsers import StatementParserRegistry, parse_pdfs
+from services.incomeTax.pdf_corpus import PASSWORD, corpus, synthetic_ais
+from services.incomeTax.pdf_pages import InvalidPdfPassword, unlock_document
+from services.incomeTax.serializers import WhatIfSimulationSerializer
+from services.incomeTax.simulation import WhatIfSimulator, DeductionOptimizer, Scenario, NO_DEDUCTIONS
+from services.incomeTax.slabs import SlabTable
+from services.incomeTax.snapshot import ReturnSnapshot, SalaryIncomeRecord, TdsOrTcsRecord, TaxPaidRecord
+from services.incomeTax.utils import IncomeTaxCalculations
+from shared.libs.hashing import AlphaId
+
+FILING_DATE = date(2025, 7, 1)
+
+
+def return_year():
+    return SimpleNamespace(id=1, name="2024-2025", start_date=date(2024, 4, 1), end_date=date(2025, 3, 31),
+                           due_date=date(2025, 7, 31), tax_slabs=None, updated_at=None)
+
+
+def return_snapshot(gross_salary, deductions=None):
+    """
+    A ReturnSnapshot of one salary income, built without the database.
+    """
+    records = {source: () for source in ReturnSnapshot.RECORD_ATTRIBUTES}
+    records[ReturnSnapshot.SALARY] = (
+        SalaryIncomeRecord("EMPLOYER", Decimal(gross_salary), Decimal(gross_salary) / 2, Decimal('0'), Decimal('0'),
+                           False),
+    )
+    return ReturnSnapshot(SimpleNamespace(income_tax_return_year=return_year()), deductions, records)
+
+
+class AlphaIdTests(SimpleTestCase):
+
+    def test_ids_decode_to_themselves(self):
+        ids = list(range(1, 5000)) + [99999, 10 ** 6 + 1, 10 ** 9 + 7]
+        self.assertEqual(AlphaId.decode_list(AlphaId.encode_list(ids)), ids)
+        for income_tax_return_id in ids[:100]:
+            self.assertEqual(AlphaId.decode(AlphaId.encode(income_tax_return_id)), income_tax_return_id)
+        self.assertEqual(AlphaId.decode("!"), -1)
+
+
+class StatementParserTests(SimpleTestCase):
+    """
+    Every parser against the synthetic corpus, whose documents carry the data they are expected to yield.
+    """
+    SIZES = (1, 3)
+
+    def parse(self, document, processes=1):
+        if document.document_type == "challan":
+            return parse_pdfs("challan", [io.BytesIO(document.content)], document.password, processes=processes)[0]
+        return StatementParserRegistry.get(document.document_type).parse_pdf(
+            io.BytesIO(document.content), document.password, processes=processes)
+
+    def test_parsers_extract_the_corpus(self):
+        for document in corpus(sizes=self.SIZES):
+            with self.subTest(document_type=document.document_type, pages=document.pages):
+                self.assertEqual(self.parse(document), document.expected)
+
+    def test_statements_are_detected(self):
+        for document in corpus(sizes=(1,)):
+            with self.subTest(document_type=document.document_type):
+                detected = StatementParserRegistry.detect_pdf(io.BytesIO(document.content), document.password)
+                self.assertEqual(detected.document_type, document.document_type)
+
+    def test_incomplete_ais_records_are_skipped(self):
+        document = synthetic_ais(2, incomplete_every=5)
+        self.assertEqual(self.parse(document), document.expected)
+
+    def test_unreadable_pdf_is_logged(self):
+        with self.assertLogs("services.incomeTax.parsers", level="ERROR"):
+            self.assertEqual(parse_pdfs("challan", [io.BytesIO(b"not a pdf")], processes=1), [None])
+
+    def test_wrong_password_is_rejected(self):
+        content = io.BytesIO(synthetic_ais(1).content)
+        self.assertEqual(unlock_document(content, ["wrong", PASSWORD]), PASSWORD)
+        with self.assertRaises(InvalidPdfPassword):
+            unlock_document(io.BytesIO(synthetic_ais(1).content), ["wrong"])
+
+
+class BatchTaxCalculationsTests(SimpleTestCase):
+    """
+    BatchTaxCalculations against the scalar IncomeTaxCalculations path, on frames built from scalar computations.
+    """
+    INCOMES = (0, 250000, 499999, 500000, 500001, 700000, 700001, 1000000, 1500000, 5000000, 5000001, 5100000,
+               10000000, 10050000, 20000000, 50000000, 52000000)
+
+    def setUp(self):
+        self.calc = IncomeTaxCalculations()
+        self.batch = BatchTaxCalculations(return_year())
+
+    def test_slab_tax_and_surcharge_match_slab_table(self):
+        incomes = np.array(self.INCOMES, dtype=float)
+        for regime in ("old", "new"):
+            slab_table = SlabTable.for_year(return_year(), regime)
+            tax = self.batch.slab_tax(slab_table, incomes)
+            surcharge = self.batch.surcharge(slab_table, incomes, tax)
+            for position, income in enumerate(self.INCOMES):
+                expected_tax = slab_table.tax(Decimal(income))
+                self.assertAlmostEqual(tax[position], float(expected_tax), places=2)
+                self.assertAlmostEqual(surcharge[position],
+                                       float(slab_table.surcharge(Decimal(income), expected_tax)), places=2)
+
+    def snapshots(self):
+        deductions = NO_DEDUCTIONS._replace(provident_fund=Decimal('200000'), contribution_by_self=Decimal('80000'),
+                                            medical_insurance_parents=Decimal('40000'))
+        for gross_salary in (600000, 760000, 1400000, 5400000, 12000000):
+            yield return_snapshot(gross_salary)
+            yield return_snapshot(gross_salary, deductions).replace(
+                tds_deductions=(TdsOrTcsRecord(Decimal(gross_salary) / 10),),
+                self_assessment_advance_tax=(TaxPaidRecord(date(2024, 12, 15), Decimal('20000')),
+                                             TaxPaidRecord(date(2025, 5, 1), Decimal('5000'))),
+            )
+
+    def frame(self, computations):
+        return pd.DataFrame.from_records([{
+            'salary_old': computation.old.total_income_from_salaries,
+            'salary_new': computation.new.total_income_from_salaries,
+            'rental': computation.total_rental_income,
+            'annual_rent': computation.total_annual_rent,
+            'capital_gains': computation.total_capital_gains_income,
+            'business': computation.total_income_from_business,
+            'interest': computation.total_interest_income,
+            'dividend': computation.total_dividend_income,
+            'winnings': computation.total_winnings_income,
+            'exempt': computation.total_exempt_income,
+            'agriculture': computation.total_net_income_from_agriculture,
+            'total_deduction': computation.total_deduction_amount,
+            'tds_or_tcs': computation.total_tds_or_tcs,
+            'advance_tax': computation.total_advance_tax,
+            'self_assessment_tax': computation.total_self_assessment_tax,
+        } for computation in computations], index=range(1, len(computations) + 1)).astype(float)
+
+    def test_summary_matches_scalar_computation(self):
+        snapshots = list(self.snapshots())
+        for filing_date in (FILING_DATE, date(2025, 9, 15), date(2026, 1, 15)):
+            computations = [self.calc.calculate_dual_regime(snapshot, Decimal('50000'), filing_date)
+                            for snapshot in snapshots]
+            summaries = self.batch.summary_data(self.frame(computations), filing_date)
+            for income_tax_return_id, computation in enumerate(computations, start=1):
+                for regime, values in self.calc.regime_summary_data(computation).items():
+                    for key, value in values.items():
+                        actual = summaries[income_tax_return_id][regime][key]
+                        self.assertLessEqual(abs(actual - value), 1,
+                                             f"{income_tax_return_id} {filing_date} {regime}.{key}")
+
+
+class BatchLoadFrameTests(TestCase):
+    """
+    load_frame and the batch summary against calculate_dual_regime on the same returns in the database.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.income_tax_return_year = IncomeTaxReturnYears.objects.create(
+            name="2024-2025", start_date=date(2024, 4, 1), end_date=date(2025, 3, 31), due_date=date(2025, 7, 31),
+            status=1)
+        cls.income_tax_returns = [cls.income_tax_return(mobile_number, rows)
+                                  for mobile_number, rows in (("9000000001", True), ("9000000002", False))]
+
+    @classmethod
+    def income_tax_return(cls, mobile_number, rows):
+        user = User.objects.create_user(mobile_number, "password", first_name="Test", last_name="User",
+                                        email=f"{mobile_number}@example.com")
+        income_tax_profile = IncomeTaxProfile.objects.create(user=user, pan_no="ABCDE1234F",
+                                                             date_of_birth=date(1990, 1, 1))
+        income_tax_return = IncomeTaxReturn.objects.create(user=user,
+                                                           income_tax_return_year=cls.income_tax_return_year)
+        kwargs = dict(income_tax=income_tax_profile, income_tax_return=income_tax_return)
+        for do_you_live_in_these_cities in (False, True):
+            SalaryIncome.objects.create(
+                **kwargs, employer_name="EMPLOYER", tan="T", employer_category=1, tds_deduction=1000,
+                income_reported=0, upload_form_type=1, upload_form_file="salary_income_document_files/form.pdf",
+                gross_salary=900000, basic_salary_component=400000, hra_component=150000, annual_rent_paid=200000,
+                do_you_live_in_these_cities=do_you_live_in_these_cities)
+        if not rows:
+            return income_tax_return
+        RentalIncome.objects.create(
+            **kwargs, occupancy_status=1, tenant_name="TENANT", property_door_no="1", property_area="a",
+            property_city="c", property_pincode="1", property_state="s", property_country="in", annual_rent=300000,
+            property_tax_paid=10000, interest_on_home_loan_dcp=1000, interest_on_home_loan_pc=2000, ownership_percent=100)
+        for asset_type, term_type, gain_or_loss in ((CapitalGains.ListedSharesOrMutualFunds, CapitalGains.LongTerm,
+                                                     150000),
+                                                    (CapitalGains.HouseProperty, CapitalGains.LongTerm, 80000),
+                                                    (CapitalGains.ListedSharesOrMutualFunds, CapitalGains.ShortTerm,
+                                                     50000)):
+            CapitalGains.objects.create(**kwargs, asset_type=asset_type, term_type=term_type, gain_or_loss=gain_or_loss,
+                                        purchase_date=date(2020, 1, 1), sale_date=date(2024, 6, 1),
+                                        held_for_no_of_days=1000, transfer_expense=0)
+        BusinessIncome.objects.create(
+            **kwargs, business_income_type="44AD", business_name="B", industry=10, nature_of_business="n",
+            description="d", gross_receipt_cheq_neft_rtgs_profit=70000, gross_receipt_cash_upi_profit=5000,
+            **{field.name: 0 for field in BusinessIncome._meta.fields if field.get_internal_type() == "DecimalField"
+               and not field.name.endswith("_profit")})
+        AgricultureIncome.objects.create(**kwargs, expences=1000, gross_recipts=9000, net_income=8000,
+                                         previous_unabsorbed_losses=500)
+        ExemptIncome.objects.create(**kwargs, amount=4000)
+        InterestIncome.objects.create(**kwargs, interest_income_type=InterestIncome.SavingsBankAccount,
+                                      description="SB", interest_amount=12000)
+        InterestIncome.objects.create(**kwargs, interest_income_type=2, description="FD", interest_amount=30000)
+        DividendIncome.objects.create(**kwargs, particular="p", description="d", amount=8000)
+        IncomeFromBetting.objects.create(**kwargs, particular="p", description="d", amount=3000)
+        # every 80C, NPS and 80D amount over its limit.
+        Deductions.objects.create(
+            **kwargs, **{field.name: 60000 for field in Deductions._meta.fields
+                         if field.get_internal_type() == "DecimalField"},
+            senior_citizen_self=False, senior_citizen_parents=True, home_loan_taken_year="2019")
+        TdsOrTcsDeduction.objects.create(**kwargs, name_of_deductor="X", tan="T", tds_or_tcs_amount=90000,
+                                         gross_receipts=1, section="192")
+        for challan_no, paid_on in (("1", date(2024, 9, 1)), ("2", date(2025, 5, 1))):
+            SelfAssesmentAndAdvanceTaxPaid.objects.create(
+                **kwargs, bsr_code="1", challan_no=challan_no, date=paid_on, amount=20000,
+                challan_pdf="tax_paid_challan_document_files/challan.pdf")
+        return income_tax_return
+
+    def test_summary_matches_scalar_computation(self):
+        calc = IncomeTaxCalculations()
+        batch = BatchTaxCalculations(self.income_tax_return_year)
+        summaries = batch.summary_data(
+            batch.load_frame([income_tax_return.id for income_tax_return in self.income_tax_returns]), FILING_DATE)
+        for income_tax_return in IncomeTaxReturn.objects.select_related(
+                "user", "income_tax_return_year", "deductions").filter(id__in=list(summaries)):
+            computation = calc.calculate_dual_regime(ReturnSnapshot.from_income_tax_return(income_tax_return),
+                                                     Decimal('50000'), FILING_DATE)
+            for regime, values in calc.regime_summary_data(computation).items():
+                for key, value in values.items():
+                    actual = summaries[income_tax_return.id][regime][key]
+                    self.assertLessEqual(abs(actual - value), 1, f"{income_tax_return.id} {regime}.{key}")
+
+
+class WhatIfSimulatorTests(SimpleTestCase):
+
+    def setUp(self):
+        self.simulator = WhatIfSimulator()
+        self.snapshot = return_snapshot(1200000, NO_DEDUCTIONS._replace(provident_fund=Decimal('50000')))
+
+    def test_deduction_is_computed_like_the_calculator(self):
+        scenario = Scenario("more 80C", {"elss_mutual_fund": Decimal('50000')}, {}, None)
+        baseline = self.simulator.compute(self.snapshot, FILING_DATE)
+        changed = self.simulator.compute(self.simulator.apply(self.snapshot, scenario), FILING_DATE)
+        self.assertEqual(changed.old.total_income, baseline.old.total_income - 50000)
+
+        grid = self.simulator.simulate(self.snapshot, [scenario], FILING_DATE)["scenarios"]
+        self.assertEqual(grid[0]["name"], WhatIfSimulator.BASELINE)
+        for regime in ("old", "new"):
+            row = grid[1][f"{regime}_regime"]
+            self.assertEqual(row["net_tax_payable"],
+                             self.simulator.calc.round_off_decimal(getattr(changed, regime).net_tax_payable))
+            self.assertEqual(row["savings"], grid[0][f"{regime}_regime"]["net_tax_payable"] - row["net_tax_payable"])
+
+    def test_salary_change_is_applied_to_the_employer(self):
+        scenario = Scenario("raise", {}, {"gross_salary": Decimal('100000')}, "EMPLOYER")
+        self.assertEqual(self.simulator.apply(self.snapshot, scenario).salary_incomes[0].gross_salary,
+                         Decimal('1300000'))
+
+    def test_change_below_zero_is_rejected(self):
+        scenario = Scenario("less 80C", {"provident_fund": Decimal('-60000')}, {}, None)
+        with self.assertRaises(ValueError):
+            self.simulator.apply(self.snapshot, scenario)
+
+        serializer = WhatIfSimulationSerializer(data={"scenarios": [
+            {"name": scenario.name, "deductions": {"provident_fund": "-60000"}},
+            {"name": "no rent", "salary": {"annual_rent_paid": "-1"}},
+        ]}, context={"snapshot": self.snapshot})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn("provident_fund", serializer.errors["scenarios"][0]["deductions"])
+        self.assertIn("annual_rent_paid", serializer.errors["scenarios"][1]["salary"])
+
+
+class DeductionOptimizerTests(SimpleTestCase):
+
+    def setUp(self):
+        self.optimizer = DeductionOptimizer()
+
+    def brute_force(self, snapshot, headroom, regime, step=500):
+        """
+        (amount, net tax payable) of the cheapest plan of a regime, trying every step.
+        """
+        best = None
+        limit = int(sum(headroom[section] for section, _ in self.optimizer.SECTIONS))
+        for amount in range(0, limit + 1, step):
+            _, scenario = self.optimizer.scenario(Decimal(amount), headroom)
+            net_tax_payable = getattr(self.optimizer.simulator.compute(
+                self.optimizer.simulator.apply(snapshot, scenario), FILING_DATE), regime).net_tax_payable
+            if best is None or net_tax_payable < best[1]:
+                best = (amount, net_tax_payable)
+        return best
+
+    def test_plans_match_brute_force(self):
+        for gross_salary in (600000, 760000, 900000, 1400000, 5400000):
+            snapshot = return_snapshot(gross_salary)
+            computation = self.optimizer.simulator.compute(snapshot, FILING_DATE)
+            plans = self.optimizer.plan(snapshot, FILING_DATE)
+            for regime in ("old", "new"):
+                amount, net_tax_payable = self.brute_force(snapshot, self.optimizer.headroom(computation, None), regime)
+                plan = plans[f"{regime}_regime"]
+                self.assertEqual(plan["investment"], amount, (gross_salary, regime))
+                self.assertEqual(plan["net_tax_payable"], self.optimizer.calc.round_off_decimal(net_tax_payable),
+                                 (gross_salary, regime))
+                self.assertEqual(plan["savings"], plan["current_net_tax_payable"] - plan["net_tax_payable"])
+
+    def test_budget_caps_the_investment(self):
+        plans = self.optimizer.plan(return_snapshot(1400000), FILING_DATE, budget=Decimal('20000'))
+        for regime in ("old_regime", "new_regime"):
+            self.assertLessEqual(plans[regime]["investment"], 20000)
@@ -0,0 +1,140 @@
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from services.incomeTax.models import SalaryIncome, RentalIncome, CapitalGains, BusinessIncome, AgricultureIncome, \
+    ExemptIncome, InterestIncome, InterestOnItRefunds, DividendIncome, IncomeFromBetting, TdsOrTcsDeduction, \
+    SelfAssesmentAndAdvanceTaxPaid, Deductions, ReturnTotals
+
+
+class ReturnTotalsRecord(namedtuple('ReturnTotalsRecord', [
+    'salary_income', 'rental_income', 'capital_gains', 'business_income', 'agriculture_income', 'exempt_income',
+    'interest_income', 'interest_on_it_refunds', 'dividend_income', 'betting_income', 'tds_or_tcs_amount',
+    'self_assessment_amount', 'deductions'
+])):
+    __slots__ = ()
+
+    @property
+    def other_income(self):
+        return self.interest_income + self.interest_on_it_refunds + self.dividend_income + self.betting_income
+
+    @property
+    def income_earned(self):
+        """Income shown on the reports page, which leaves out the other sources."""
+        return (self.salary_income + self.rental_income + self.capital_gains + self.business_income +
+                self.agriculture_income + self.exempt_income)
+
+    @property
+    def gross_total_income(self):
+        return (self.salary_income + self.rental_income + self.capital_gains + self.business_income +
+                self.agriculture_income + self.exempt_income + self.other_income)
+
+    @property
+    def taxes_paid(self):
+        return self.tds_or_tcs_amount + self.self_assessment_amount
+
+
+class ReturnTotalsQuery:
+    """
+    Per-return totals of every income table, the deductions and the taxes paid.
+
+    Reads join the denormalized ReturnTotals row, so any IncomeTaxReturn queryset gets all of its totals from
+    one row per return. The row itself is computed by the database: each total is a correlated SUM subquery
+    annotated on IncomeTaxReturn and the deductions are summed over the joined Deductions row.
+    """
+    PREFIX = 'totals_'
+    # aggregate annotations can't share names like capital_gains or deductions with IncomeTaxReturn relations.
+    SUM_PREFIX = 'summed_'
+    AMOUNT_FIELD = DecimalField(max_digits=30, decimal_places=2)
+
+    # record field -> (model, summed expression)
+    SUMS = (
+        ('salary_income', SalaryIncome, F('gross_salary')),
+        ('rental_income', RentalIncome, F('net_rental_income')),
+        ('capital_gains', CapitalGains, F('gain_or_loss')),
+        ('business_income', BusinessIncome, F('gross_receipt_cheq_neft_rtgs_profit') + F('gross_receipt_cash_upi_profit')),
+        ('agriculture_income', AgricultureIncome, F('gross_recipts')),
+        ('exempt_income', ExemptIncome, F('amount')),
+        ('interest_income', InterestIncome, F('interest_amount')),
+        ('interest_on_it_refunds', InterestOnItRefunds, F('amount')),
+        ('dividend_income', DividendIncome, F('amount')),
+        ('betting_income', IncomeFromBetting, F('amount')),
+        ('tds_or_tcs_amount', TdsOrTcsDeduction, F('tds_or_tcs_amount')),
+        ('self_assessment_amount', SelfAssesmentAndAdvanceTaxPaid, F('amount')),
+    )
+    DEDUCTION_FIELDS = (
+        'life_insurance', 'provident_fund', 'elss_mutual_fund', 'home_loan_repayment', 'tution_fees',
+        'stamp_duty_paid', 'others', 'contribution_by_self', 'contribution_by_employeer', 'medical_insurance_self',
+        'medical_preventive_health_checkup_self', 'medical_expenditure_self', 'medical_insurance_parents',
+        'medical_preventive_health_checkup_parents', 'medical_expenditure_parents', 'education_loan',
+        'electronic_vehicle_loan', 'home_loan_amount', 'interest_income', 'royality_on_books', 'income_on_patients',
+        'income_on_bio_degradable', 'rent_paid', 'contribution_to_agnipath', 'donation_to_political_parties',
+        'donation_others',
+    )
+    # every model a total is summed from, a change to any of them refreshes the return's ReturnTotals row.
+    SOURCE_MODELS = tuple(model for _, model, _ in SUMS) + (Deductions,)
+
+    @classmethod
+    def aggregate_annotations(cls):
+        annotations = {}
+        for field, model, expression in cls.SUMS:
+            total = model.objects.filter(income_tax_return=OuterRef('pk')).order_by().values(
+                'income_tax_return'
+            ).annotate(total=Sum(expression, output_field=cls.AMOUNT_FIELD)).values('total')
+            annotations[cls.SUM_PREFIX + field] = Coalesce(Subquery(total, output_field=cls.AMOUNT_FIELD),
+                                                           Value(Decimal(0)), output_field=cls.AMOUNT_FIELD)
+        deductions = F(f'deductions__{cls.DEDUCTION_FIELDS[0]}')
+        for field in cls.DEDUCTION_FIELDS[1:]:
+            deductions = deductions + F(f'deductions__{field}')
+        # returns without a Deductions row get NULL from the outer join.
+        annotations[cls.SUM_PREFIX + 'deductions'] = Coalesce(deductions, Value(Decimal(0)),
+                                                              output_field=cls.AMOUNT_FIELD)
+        return annotations
+
+    @classmethod
+    def aggregate(cls, queryset):
+        """
+        (income tax return id, ReturnTotalsRecord) pairs summed from the source tables, in one query.
+        """
+        annotations = cls.aggregate_annotations()
+        for row in queryset.order_by().annotate(**annotations).values_list('id', *annotations):
+            yield row[0], ReturnTotalsRecord(*row[1:])
+
+    @classmethod
+    def annotations(cls):
+        # returns without a ReturnTotals row have nothing to sum.
+        return {
+            cls.PREFIX + field: Coalesce(F(f'totals__{field}'), Value(Decimal(0)), output_field=cls.AMOUNT_FIELD)
+            for field in ReturnTotalsRecord._fields
+        }
+
+    @classmethod
+    def annotate(cls, queryset):
+        return queryset.annotate(**cls.annotations())
+
+    @classmethod
+    def record(cls, income_tax_return):
+        """
+        Totals of an IncomeTaxReturn fetched through annotate().
+        """
+        return ReturnTotalsRecord(*[getattr(income_tax_return, cls.PREFIX + field)
+                                    for field in ReturnTotalsRecord._fields])
+
+    @classmethod
+    def for_instance(cls, income_tax_return):
+        """
+        Totals of any IncomeTaxReturn, read from its annotations when it was fetched through annotate() and
+        from its ReturnTotals row otherwise.
+        """
+        if hasattr(income_tax_return, cls.PREFIX + ReturnTotalsRecord._fields[0]):
+            return cls.record(income_tax_return)
+        totals = ReturnTotals.objects.filter(income_tax_return_id=income_tax_return.pk).first()
+        if totals is None:
+            return ReturnTotalsRecord(*[Decimal(0)] * len(ReturnTotalsRecord._fields))
+        return cls.from_row(totals)
+
+    @staticmethod
+    def from_row(totals):
+        return ReturnTotalsRecord(*[getattr(totals, field) for field in ReturnTotalsRecord._fields])
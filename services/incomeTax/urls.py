@@ -8,7 +8,9 @@ from .views import ListIncomeTaxReturnsView, ResidentialStatusQuestionsListView,
     AISPdfUploadApi, IncomeTaxReturnYearListAPIView, Download26ASAPIView, \
     DownloadAISAPIView, ReportsPageAPIView, DownloadTISAPIView, TaxRefundAPIView, ComputationsOldRegimeApi, \
     ComputationsNewRegimeApi, SummaryPageApi, ComputationsCreateApi, IncomeTaxPdfView, \
-    IncometaxComputationsOldPdfView, IncometaxComputationsNewPdfView, IncomeTaxProfileApi
+    IncometaxComputationsOldPdfView, IncometaxComputationsNewPdfView, IncomeTaxProfileApi, IngestionJobCreateApi, \
+    IngestionJobDetailApi, ChallanBatchUploadApi, DownloadReportsArchiveApi, WhatIfSimulationApi, \
+    DeductionPlanApi
 
 urlpatterns = [
     path('create-incometax-profile/', IncomeTaxProfileApi.as_view(), name='create-incometax-profile'),
@@ -46,16 +48,23 @@ urlpatterns = [
     path('upload-26as-pdf/<str:income_tax_return_id>/', TdsPdfUploadApi.as_view(), name='upload-26as-pdf'),
     path('upload-challan-pdf/<str:income_tax_return_id>/', ChallanUploadApi.as_view(), name='upload-challan-pdf'),
     path('update-challan-pdf/<str:income_tax_return_id>/', ChallanUploadApi.as_view(), name='update-challan-pdf'),
+    path('upload-challan-pdfs/<str:income_tax_return_id>/', ChallanBatchUploadApi.as_view(),
+         name='upload-challan-pdfs'),
+    path('ingestion-jobs/<str:income_tax_return_id>/', IngestionJobCreateApi.as_view(), name='ingestion-job-create'),
+    path('ingestion-job/<str:job_id>/', IngestionJobDetailApi.as_view(), name='ingestion-job-detail'),
     path('reports-page/', ReportsPageAPIView.as_view(), name='reports-page'),
     path('reports-page/<str:income_tax_return_year_name>/', ReportsPageAPIView.as_view(), name='reports-specific-year'),
     path('income-tax-return-years/', IncomeTaxReturnYearListAPIView.as_view(), name='income-tax-return-years'),
     path('download-26as/<str:income_tax_return_year_name>/', Download26ASAPIView.as_view(), name='download-26as'),
     path('download-ais/<str:income_tax_return_year_name>/', DownloadAISAPIView.as_view(), name='download-ais'),
     path('download-tis/<str:income_tax_return_year_name>/', DownloadTISAPIView.as_view(), name='download-tis'),
+    path('download-reports/', DownloadReportsArchiveApi.as_view(), name='download-reports'),
     path('tax-refund/<str:income_tax_return_id>/', TaxRefundAPIView.as_view(), name='tax-refund'),
     path('computations-old-regime/<str:income_tax_return_id>/', ComputationsOldRegimeApi.as_view(), name='computations-old-regime'),
     path('computations-new-regime/<str:income_tax_return_id>/', ComputationsNewRegimeApi.as_view(), name='computations-new-regime'),
     path('tax-summary/<str:income_tax_return_id>/', SummaryPageApi.as_view(), name='tax-summary'),
+    path('what-if/<str:income_tax_return_id>/', WhatIfSimulationApi.as_view(), name='what-if'),
+    path('deduction-plan/<str:income_tax_return_id>/', DeductionPlanApi.as_view(), name='deduction-plan'),
     path('computations/<str:income_tax_return_id>/', ComputationsCreateApi.as_view(), name='create_computation'),
     path('itr-summary-pdf/<str:income_tax_return_id>/', IncomeTaxPdfView.as_view(), name='itr-summary-pdf'),
     path('itr-computations-old-pdf/<str:income_tax_return_id>/', IncometaxComputationsOldPdfView.as_view(), name='itr-computations-old-pdf'),
@@ -1,7 +1,25 @@
+from collections import namedtuple
 from datetime import date, datetime
 from decimal import Decimal, ROUND_HALF_UP
 
-from services.incomeTax.models import IncomeTaxReturnYears, InterestIncome, CapitalGains, RentalIncome
+from services.incomeTax.models import IncomeTaxReturnYears, InterestIncome, CapitalGains, RentalIncome, \
+    BusinessIncome
+from services.incomeTax.slabs import SlabTable
+
+
+RegimeComputation = namedtuple('RegimeComputation', [
+    'salary_incomes', 'total_income_from_salaries', 'gross_total_income', 'total_income', 'tax_liability',
+    'surcharge', 'tax_rebate', 'cess', 'net_tax_payable', 'balance_tax_to_be_paid', 'total_interest_234',
+    'penalty_us_234F', 'tax_payable'
+])
+DualRegimeComputation = namedtuple('DualRegimeComputation', [
+    'rental_incomes', 'total_rental_income', 'total_annual_rent', 'total_capital_gains_income',
+    'long_term_capital_gains_112A', 'long_term_capital_gains_others', 'short_term_capital_gains', 'business_incomes',
+    'total_income_from_business', 'total_interest_income', 'total_dividend_income', 'total_winnings_income',
+    'total_exempt_income', 'total_net_income_from_agriculture', 'total_combined_exempt_income', 'deduction_80c_sum',
+    'nps_contribution_sum', 'medical_premium_sum', 'interest_on_savings_sum', 'total_deduction_amount',
+    'total_tds_or_tcs', 'total_self_assessment_tax', 'total_advance_tax', 'tax_paid', 'old', 'new'
+])
 
 
 class IncomeTaxCurrentYear:
@@ -16,6 +34,10 @@ class IncomeTaxCurrentYear:
 
 
 class IncomeTaxCalculations:
+    DEDUCTION_80C_LIMIT = Decimal('150000')
+    MEDICAL_PREMIUM_LIMIT = Decimal('100000')
+    MEDICAL_PREMIUM_LIMIT_SENIOR_CITIZEN_PARENTS = Decimal('125000')
+    INTEREST_ON_SAVINGS_LIMIT = Decimal('10000')
 
     def round_off_decimal(self, value):
         if isinstance(value, Decimal):
@@ -135,10 +157,12 @@ class IncomeTaxCalculations:
         total_income_from_business = Decimal('0')
 
         for business_income in business_incomes:
+            business_income_type_text = dict(BusinessIncome.BUSINESS_INCOME_TYPE_CHOICES).get(
+                business_income.business_income_type, business_income.business_income_type)
             profit_from_business = business_income.gross_receipt_cheq_neft_rtgs_profit + business_income.gross_receipt_cash_upi_profit
             total_income_from_business += profit_from_business
             business_incomes_data.append({
-                "business_income_type": business_income.get_business_income_type_display(),
+                "business_income_type": business_income_type_text,
                 "Profit from Business": profit_from_business
             })
 
@@ -154,8 +178,8 @@ class IncomeTaxCalculations:
             deductions.stamp_duty_paid,
             deductions.others
         ]) if deductions else 0
-        if deduction_80c_sum > Decimal('150000'):
-            deduction_80c_sum = Decimal('150000')
+        if deduction_80c_sum > self.DEDUCTION_80C_LIMIT:
+            deduction_80c_sum = self.DEDUCTION_80C_LIMIT
 
         nps_contribution_sum = (
                     deductions.contribution_by_self + deductions.contribution_by_employeer) if deductions else 0
@@ -169,18 +193,18 @@ class IncomeTaxCalculations:
             deductions.medical_expenditure_parents
         ]) if deductions else 0
         if deductions and deductions.senior_citizen_parents:
-            if medical_premium_sum > Decimal('125000'):
-                medical_premium_sum = Decimal('125000')
+            if medical_premium_sum > self.MEDICAL_PREMIUM_LIMIT_SENIOR_CITIZEN_PARENTS:
+                medical_premium_sum = self.MEDICAL_PREMIUM_LIMIT_SENIOR_CITIZEN_PARENTS
         else:
-            if medical_premium_sum > Decimal('100000'):
-                medical_premium_sum = Decimal('100000')
+            if medical_premium_sum > self.MEDICAL_PREMIUM_LIMIT:
+                medical_premium_sum = self.MEDICAL_PREMIUM_LIMIT
 
         interest_on_savings_sum = sum(
             [income.interest_amount for income in interest_incomes if
              income.interest_income_type == InterestIncome.SavingsBankAccount]
         )
-        if interest_on_savings_sum > Decimal('10000'):
-            interest_on_savings_sum = Decimal('10000')
+        if interest_on_savings_sum > self.INTEREST_ON_SAVINGS_LIMIT:
+            interest_on_savings_sum = self.INTEREST_ON_SAVINGS_LIMIT
 
         return deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum
 
@@ -207,78 +231,19 @@ class IncomeTaxCalculations:
         )
 
     def calculate_tax_liability_old_regime(self, total_income):
-        tax = Decimal(0)
-        if total_income <= 250000:
-            return tax
-        elif total_income <= 500000:
-            tax += (Decimal(total_income) - Decimal(250000)) * Decimal('0.05')
-        elif total_income <= 1000000:
-            tax += (Decimal(500000) - Decimal(250000)) * Decimal('0.05')
-            tax += (Decimal(total_income) - Decimal(500000)) * Decimal('0.20')
-        else:
-            tax += (Decimal(500000) - Decimal(250000)) * Decimal('0.05')
-            tax += (Decimal(1000000) - Decimal(500000)) * Decimal('0.20')
-            tax += (Decimal(total_income) - Decimal(1000000)) * Decimal('0.30')
-
-        return tax
+        return SlabTable.default("old").tax(total_income)
 
     def calculate_tax_liability_new_regime(self, total_income):
-        tax = Decimal(0)
-        if total_income <= 300000:
-            return tax
-        elif total_income <= 600000:
-            tax += (Decimal(total_income) - Decimal(300000)) * Decimal('0.05')
-        elif total_income <= 900000:
-            tax += (Decimal(600000) - Decimal(300000)) * Decimal('0.05')
-            tax += (Decimal(total_income) - Decimal(600000)) * Decimal('0.10')
-        elif total_income <= 1200000:
-            tax += (Decimal(600000) - Decimal(300000)) * Decimal('0.05')
-            tax += (Decimal(900000) - Decimal(600000)) * Decimal('0.10')
-            tax += (Decimal(total_income) - Decimal(900000)) * Decimal('0.15')
-        elif total_income <= 1500000:
-            tax += (Decimal(600000) - Decimal(300000)) * Decimal('0.05')
-            tax += (Decimal(900000) - Decimal(600000)) * Decimal('0.10')
-            tax += (Decimal(1200000) - Decimal(900000)) * Decimal('0.15')
-            tax += (Decimal(total_income) - Decimal(1200000)) * Decimal('0.20')
-        else:
-            tax += (Decimal(600000) - Decimal(300000)) * Decimal('0.05')
-            tax += (Decimal(900000) - Decimal(600000)) * Decimal('0.10')
-            tax += (Decimal(1200000) - Decimal(900000)) * Decimal('0.15')
-            tax += (Decimal(1500000) - Decimal(1200000)) * Decimal('0.20')
-            tax += (Decimal(total_income) - Decimal(1500000)) * Decimal('0.30')
-
-        return tax
+        return SlabTable.default("new").tax(total_income)
 
     def calculate_tax_rebate_old_regime(self, total_income, tax_liability):
-        if total_income <= 500000:
-            max_rebate = Decimal(12500)
-            return min(max_rebate, tax_liability)
-        return Decimal(0)
+        return SlabTable.default("old").rebate(total_income, tax_liability)
 
     def calculate_tax_rebate_new_regime(self, total_income, tax_liability):
-        if total_income <= 700000:
-            max_rebate = Decimal(25000)
-            return min(max_rebate, tax_liability)
-        return Decimal(0)
+        return SlabTable.default("new").rebate(total_income, tax_liability)
 
     def calculate_surcharge(self, total_income, tax_liability, regime):
-        surcharge = Decimal(0)
-
-        if total_income <= 5000000:
-            return surcharge
-        elif total_income <= 10000000:
-            surcharge = (total_income - Decimal(5000000)) * Decimal('0.10')
-        elif total_income <= 20000000:
-            surcharge = (total_income - Decimal(10000000)) * Decimal('0.15')
-        elif total_income <= 50000000:
-            surcharge = (total_income - Decimal(20000000)) * Decimal('0.25')
-        else:
-            if regime == "old":
-                surcharge = (total_income - Decimal(50000000)) * Decimal('0.37')
-            elif regime == "new":
-                surcharge = (total_income - Decimal(50000000)) * Decimal('0.25')
-
-        return surcharge
+        return SlabTable.default(regime).surcharge(total_income, tax_liability)
 
     def calculate_cess(self, tax_liability, surcharge, tax_rebate):
         return (tax_liability + surcharge - tax_rebate) * Decimal('0.04')
@@ -342,4 +307,161 @@ class IncomeTaxCalculations:
             else:
                 penalty = 10000
 
-        return penalty
\ No newline at end of file
+        return penalty
+
+    def calculate_regime(self, slab_table, salary_incomes_data, total_income_from_salaries, heads, filing_date,
+                         due_date):
+        gross_total_income = self.calculate_gross_total_income(
+            total_income_from_salaries, heads['total_rental_income'], heads['total_income_from_business'],
+            heads['total_capital_gains_income'], heads['total_interest_income'], heads['total_dividend_income'],
+            heads['total_winnings_income'], heads['total_combined_exempt_income'])
+        total_income = gross_total_income - heads['total_deduction_amount']
+        tax_liability = slab_table.tax(gross_total_income)
+        tax_rebate = slab_table.rebate(gross_total_income, tax_liability)
+        surcharge = slab_table.surcharge(gross_total_income, tax_liability)
+        cess = self.calculate_cess(tax_liability, surcharge, tax_rebate)
+        net_tax_payable = tax_liability + surcharge - tax_rebate + cess
+        total_advance_tax = heads['total_advance_tax']
+        balance_tax_to_be_paid = net_tax_payable - total_advance_tax - heads['total_tds_or_tcs']
+        total_interest_234 = (
+            self.calculate_interest_234A(balance_tax_to_be_paid, filing_date, due_date) +
+            self.calculate_interest_234B(balance_tax_to_be_paid, total_advance_tax, net_tax_payable) +
+            self.calculate_interest_234C(balance_tax_to_be_paid, total_advance_tax, net_tax_payable)
+        )
+        penalty_us_234F = self.calculate_penalty_us_234F(total_income, filing_date, due_date)
+        tax_payable = balance_tax_to_be_paid + total_interest_234 + penalty_us_234F
+
+        return RegimeComputation(
+            salary_incomes_data, total_income_from_salaries, gross_total_income, total_income, tax_liability,
+            surcharge, tax_rebate, cess, net_tax_payable, balance_tax_to_be_paid, total_interest_234,
+            penalty_us_234F, tax_payable
+        )
+
+    def calculate_dual_regime(self, snapshot, base_standard_deduction, filing_date):
+        """
+        Compute both regimes for a ReturnSnapshot in one pass. Income heads, deductions and taxes paid are
+        shared; only salary, slabs, rebate and surcharge differ between the two RegimeComputation results.
+        """
+        return_year = snapshot.income_tax_return_year
+        salary_incomes_data_old, salary_incomes_data_new, total_income_from_salaries_old, \
+            total_income_from_salaries_new = self.calculate_salary_income(snapshot.salary_incomes,
+                                                                          base_standard_deduction)
+        rental_incomes_data, total_rental_income, _ = self.calculate_rental_income(snapshot.rental_incomes)
+        total_capital_gains_income, long_term_capital_gains_112A, long_term_capital_gains_others, \
+            short_term_capital_gains = self.calculate_capital_gains(snapshot.capital_gains)
+        business_incomes_data, total_income_from_business = self.calculate_business_income(snapshot.business_incomes)
+        total_exempt_income = sum([e.amount for e in snapshot.exempt_incomes])
+        total_net_income_from_agriculture = sum([a.net_income for a in snapshot.agriculture_incomes])
+        deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum = \
+            self.calculate_deductions(snapshot.deductions, snapshot.interest_incomes)
+        total_tds_or_tcs, total_self_assessment_tax, total_advance_tax = self.calculate_tds_advance_tax(
+            snapshot.tds_deductions, snapshot.self_assessment_advance_tax, return_year.start_date,
+            return_year.end_date)
+
+        heads = {
+            'rental_incomes': rental_incomes_data,
+            'total_rental_income': total_rental_income,
+            'total_annual_rent': sum([r.annual_rent for r in snapshot.rental_incomes]),
+            'total_capital_gains_income': total_capital_gains_income,
+            'long_term_capital_gains_112A': long_term_capital_gains_112A,
+            'long_term_capital_gains_others': long_term_capital_gains_others,
+            'short_term_capital_gains': short_term_capital_gains,
+            'business_incomes': business_incomes_data,
+            'total_income_from_business': total_income_from_business,
+            'total_interest_income': sum([i.interest_amount for i in snapshot.interest_incomes]),
+            'total_dividend_income': sum([d.amount for d in snapshot.dividend_incomes]),
+            'total_winnings_income': sum([w.amount for w in snapshot.income_from_bettings]),
+            'total_exempt_income': total_exempt_income,
+            'total_net_income_from_agriculture': total_net_income_from_agriculture,
+            'total_combined_exempt_income': total_exempt_income + total_net_income_from_agriculture,
+            'deduction_80c_sum': deduction_80c_sum,
+            'nps_contribution_sum': nps_contribution_sum,
+            'medical_premium_sum': medical_premium_sum,
+            'interest_on_savings_sum': interest_on_savings_sum,
+            'total_deduction_amount': (
+                deduction_80c_sum + nps_contribution_sum + medical_premium_sum + interest_on_savings_sum),
+            'total_tds_or_tcs': total_tds_or_tcs,
+            'total_self_assessment_tax': total_self_assessment_tax,
+            'total_advance_tax': total_advance_tax,
+            'tax_paid': total_tds_or_tcs + total_self_assessment_tax + total_advance_tax,
+        }
+        old = self.calculate_regime(SlabTable.for_year(return_year, "old"), salary_incomes_data_old,
+                                    total_income_from_salaries_old, heads, filing_date, return_year.due_date)
+        new = self.calculate_regime(SlabTable.for_year(return_year, "new"), salary_incomes_data_new,
+                                    total_income_from_salaries_new, heads, filing_date, return_year.due_date)
+        return DualRegimeComputation(old=old, new=new, **heads)
+
+    def regime_computation_data(self, computation, regime):
+        """
+        Detailed computation of one regime, as shown by the computation APIs and computation PDFs.
+        """
+        result = computation.old if regime == "old" else computation.new
+        return {
+            "salary_incomes": result.salary_incomes,
+            "total_income_from_salaries": self.round_off_decimal(result.total_income_from_salaries),
+            "rental_incomes": computation.rental_incomes,
+            "long_term_capital_gain_u_s_112a": self.round_off_decimal(computation.long_term_capital_gains_112A),
+            "long_term_capital_gain_others": self.round_off_decimal(computation.long_term_capital_gains_others),
+            "short_term_capital_gain": self.round_off_decimal(computation.short_term_capital_gains),
+            "total_capital_gains_income": self.round_off_decimal(computation.total_capital_gains_income),
+            "business_incomes": computation.business_incomes,
+            "total_income_from_business": self.round_off_decimal(computation.total_income_from_business),
+            "interest_income": self.round_off_decimal(computation.total_interest_income),
+            "dividend_income": self.round_off_decimal(computation.total_dividend_income),
+            "winnings_lotteries_games_bettings": self.round_off_decimal(computation.total_winnings_income),
+            "total_of_other_incomes": self.round_off_decimal(
+                computation.total_interest_income + computation.total_dividend_income +
+                computation.total_winnings_income),
+            "exempt_income": self.round_off_decimal(computation.total_exempt_income),
+            "net_income_from_agriculture": self.round_off_decimal(computation.total_net_income_from_agriculture),
+            "total_exempt_income": self.round_off_decimal(computation.total_combined_exempt_income),
+            "deduction_u_s_80c": self.round_off_decimal(computation.deduction_80c_sum),
+            "nps_contribution_u_s_ccd": self.round_off_decimal(computation.nps_contribution_sum),
+            "80d_medical_insurance_premium": self.round_off_decimal(computation.medical_premium_sum),
+            "80tta_interest_on_savings_acc": self.round_off_decimal(computation.interest_on_savings_sum),
+            "total_deduction_amount": self.round_off_decimal(computation.total_deduction_amount),
+            "tds_or_tcs": self.round_off_decimal(computation.total_tds_or_tcs),
+            "self_assessment_tax": self.round_off_decimal(computation.total_self_assessment_tax),
+            "advance_tax": self.round_off_decimal(computation.total_advance_tax),
+            "tax_paid": computation.tax_paid,
+            "gross_total_income": self.round_off_decimal(result.gross_total_income),
+            "total_income": self.round_off_decimal(result.total_income),
+            "tax_liability_at_normal_rates": self.round_off_decimal(result.tax_liability),
+            "tax_rebate": self.round_off_decimal(result.tax_rebate),
+            "surcharge": self.round_off_decimal(result.surcharge),
+            "cess": self.round_off_decimal(result.cess),
+            "net_tax_payable": self.round_off_decimal(result.net_tax_payable),
+            "balance_tax_to_be_paid": self.round_off_decimal(result.balance_tax_to_be_paid),
+            "interest_u_s_234a_b_c": self.round_off_decimal(result.total_interest_234),
+            "penalt_u_s_234f": self.round_off_decimal(result.penalty_us_234F),
+            "tax_payable": self.round_off_decimal(result.tax_payable),
+        }
+
+    def regime_summary_data(self, computation):
+        """
+        Side by side totals of both regimes, as shown by the summary page.
+        """
+        summary_data = {}
+        for regime, result in (("old_regime", computation.old), ("new_regime", computation.new)):
+            summary_data[regime] = {
+                "total_income_from_salaries": self.round_off_decimal(result.total_income_from_salaries),
+                "total_rental_income": self.round_off_decimal(computation.total_annual_rent),
+                "total_capital_gains_income": self.round_off_decimal(computation.total_capital_gains_income),
+                "total_income_from_business": self.round_off_decimal(computation.total_income_from_business),
+                "total_of_other_incomes": self.round_off_decimal(
+                    computation.total_interest_income + computation.total_dividend_income +
+                    computation.total_winnings_income),
+                "total_exempt_income": self.round_off_decimal(computation.total_combined_exempt_income),
+                "total_deduction_amount": self.round_off_decimal(computation.total_deduction_amount),
+                "tds_or_tcs": self.round_off_decimal(computation.total_tds_or_tcs),
+                "self_assessment_tax": self.round_off_decimal(computation.total_self_assessment_tax),
+                "advance_tax": self.round_off_decimal(computation.total_advance_tax),
+                "gross_total_income": self.round_off_decimal(result.gross_total_income),
+                "total_income": self.round_off_decimal(result.total_income),
+                "tax_liability_at_normal_rates": self.round_off_decimal(result.tax_liability),
+                "net_tax_payable": self.round_off_decimal(result.net_tax_payable),
+                "balance_tax_to_be_paid": self.round_off_decimal(result.balance_tax_to_be_paid),
+                "interest_and_penalty": self.round_off_decimal(result.total_interest_234 + result.penalty_us_234F),
+                "tax_payable": self.round_off_decimal(result.tax_payable),
+            }
+        return summary_data
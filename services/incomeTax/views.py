@@ -1,23 +1,24 @@
 import json
-from io import BytesIO
 from decimal import Decimal
 from urllib.parse import unquote
+from django.db import transaction
 from django.db.models import Sum
-from django.http import Http404, HttpResponse
+from django.http import Http404, HttpResponse, FileResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.template.defaultfilters import slugify
-from django.template.loader import get_template
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated
-from xhtml2pdf import pisa
 
 from services.incomeTax.models import IncomeTaxProfile, IncomeTaxReturn, IncomeTaxReturnYears, \
     ResidentialStatusQuestions, IncomeTaxBankDetails, IncomeTaxAddress, SalaryIncome, RentalIncome, BuyerDetails, \
     CapitalGains, BusinessIncome, AgricultureIncome, LandDetails, InterestIncome, InterestOnItRefunds, DividendIncome, \
-    IncomeFromBetting, TdsOrTcsDeduction, SelfAssesmentAndAdvanceTaxPaid, Deductions, ExemptIncome, Computations
+    IncomeFromBetting, TdsOrTcsDeduction, SelfAssesmentAndAdvanceTaxPaid, Deductions, ExemptIncome, Computations, \
+    IngestionJob, ReportArtifact
 from services.incomeTax.serializers import IncomeTaxReturnSerializer, ResidentialStatusQuestionsSerializer, \
     SalaryIncomeSerializer, RentalIncomeSerializer, \
     CapitalGainsSerializer, BusinessIncomeSerializer, AgricultureIncomeSerializer, InterestIncomeSerializer, \
@@ -26,8 +27,14 @@ from services.incomeTax.serializers import IncomeTaxReturnSerializer, Residentia
     LandDetailsSerializer, AgricultureAndExemptIncomeSerializer, OtherIncomesSerializer, TaxPaidSerializer, \
     TdsPdfSerializer, ChallanPdfUploadSerializer, AISPdfUploadSerializer, IncomeTaxReturnYearSerializer, \
     ReportsPageSerializer, ReportsPageGraphDataSerializer, TaxSummarySerializer, ComputationsSerializer, \
-    IncomeTaxProfileSerializer
-from services.incomeTax.services import PanVerificationService
+    IncomeTaxProfileSerializer, IngestionJobCreateSerializer, IngestionJobSerializer, \
+    ChallanBatchUploadSerializer, WhatIfSimulationSerializer, DeductionPlanSerializer
+from services.incomeTax.ingestion import IngestionJobService
+from services.incomeTax.reports import ReportArtifactService, REPORTS
+from services.incomeTax.services import PanVerificationService, ComputationCacheService
+from services.incomeTax.simulation import WhatIfSimulator, DeductionOptimizer
+from services.incomeTax.snapshot import ReturnSnapshot
+from services.incomeTax.totals import ReturnTotalsQuery
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
 from services.incomeTax.utils import IncomeTaxCurrentYear, IncomeTaxCalculations
 from shared.libs.hashing import AlphaId
@@ -268,6 +275,7 @@ class SalaryIncomeListCreateApi(generics.ListCreateAPIView):
         return SalaryIncome.objects.filter(income_tax__user=user,
                                                income_tax_return_id=income_tax_return_id)
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -300,6 +308,7 @@ class SalaryIncomeUpdateApi(generics.GenericAPIView):
     serializer_class = SalaryIncomeSerializer
     parser_classes = (MultiPartParser, FormParser)
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -353,6 +362,7 @@ class RentalIncomeListCreateApi(generics.ListCreateAPIView):
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
         return RentalIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -379,6 +389,7 @@ class RentalIncomeUpdateApi(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = RentalIncomeSerializer
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -416,6 +427,7 @@ class CapitalGainsListCreateApi(generics.ListCreateAPIView):
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
         return CapitalGains.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -464,6 +476,7 @@ class CapitalGainsUpdateApi(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = CapitalGainsSerializer
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -522,6 +535,7 @@ class BusinessIncomeListCreateApi(generics.ListCreateAPIView):
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
         return BusinessIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -544,6 +558,7 @@ class BusinessIncomeUpdateApi(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class = BusinessIncomeSerializer
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -594,6 +609,7 @@ class AgricultureAndExemptIncomeApi(generics.GenericAPIView):
         }
         return Response({'status': 'success', 'data': data}, status=status.HTTP_200_OK)
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -639,6 +655,7 @@ class AgricultureAndExemptIncomeApi(generics.GenericAPIView):
         created_records['exempt_incomes'] = exempt_incomes_created
         return Response({'status': 'success', 'message': 'Agriculture And Exempt Incomes created successfully', 'data': created_records}, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -709,6 +726,7 @@ class OtherIncomesApi(generics.GenericAPIView):
         }
         return Response({'status': 'success', 'data': data}, status=status.HTTP_200_OK)
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -773,6 +791,7 @@ class OtherIncomesApi(generics.GenericAPIView):
 
         return Response({'status': 'success', 'message': 'Incomes created successfully', 'data': created_records}, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -881,6 +900,7 @@ class TaxPaidApi(generics.GenericAPIView):
 
         return Response({'status': 'success', 'data': data}, status=status.HTTP_200_OK)
 
+    @transaction.atomic
     def post(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -920,6 +940,7 @@ class TaxPaidApi(generics.GenericAPIView):
             'self_assessment_and_advance_tax_paid': created_self_assessment_records
         }, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def patch(self, request, *args, **kwargs):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
@@ -1031,53 +1052,30 @@ class TotalIncomeGetAPIView(generics.GenericAPIView):
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
 
         income_tax_profile = get_object_or_404(IncomeTaxProfile, user=user)
-        income_tax_return = get_object_or_404(IncomeTaxReturn, id=income_tax_return_id, user=user)
+        income_tax_return = get_object_or_404(ReturnTotalsQuery.annotate(IncomeTaxReturn.objects.all()),
+                                              id=income_tax_return_id, user=user)
+        totals = ReturnTotalsQuery.record(income_tax_return)
 
         salary_incomes = SalaryIncome.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_salary_income = salary_incomes.aggregate(total=Sum('gross_salary'))['total'] or 0
+        total_salary_income = totals.salary_income
         salary_data = [{'employer_name': item.employer_name, 'gross_salary': item.gross_salary} for item in salary_incomes]
         is_salary_income_edited = total_salary_income > 0
 
         rental_incomes = RentalIncome.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_rental_income = rental_incomes.aggregate(total=Sum('net_rental_income'))['total'] or 0
+        total_rental_income = totals.rental_income
         rental_data = [{'tenant_name': 'Self-occupied' if item.occupancy_status == RentalIncome.SelfOccupied else item.tenant_name, 'net_rental_income': item.net_rental_income} for item in rental_incomes]
         is_rental_income_edited = total_rental_income > 0
 
-        capital_gains = CapitalGains.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_capital_gains = capital_gains.aggregate(total=Sum('gain_or_loss'))['total'] or 0
+        total_capital_gains = totals.capital_gains
         is_capital_gains_edited = total_capital_gains > 0
 
-        business_incomes = BusinessIncome.objects.filter(income_tax=income_tax_profile,income_tax_return=income_tax_return)
-        total_business_income = business_incomes.aggregate(
-            total=Sum('gross_receipt_cheq_neft_rtgs_profit') + Sum('gross_receipt_cash_upi_profit'))['total'] or 0
-        # business_data = [{'business_name': item.business_name,
-        #                   'gross_receipt_cheq_neft_rtgs_profit': item.gross_receipt_cheq_neft_rtgs_profit,
-        #                   'gross_receipt_cash_upi_profit': item.gross_receipt_cash_upi_profit} for item in
-        #                  business_incomes]
+        total_business_income = totals.business_income
         is_business_income_edited = total_business_income > 0
 
-        agriculture_incomes = AgricultureIncome.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_agriculture_income = agriculture_incomes.aggregate(total=Sum('gross_recipts'))['total'] or 0
-
-        exempt_incomes = ExemptIncome.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_exempt_income = exempt_incomes.aggregate(total=Sum('amount'))['total'] or 0
-
-        total_agriculture_and_exempt_income = total_agriculture_income + total_exempt_income
+        total_agriculture_and_exempt_income = totals.agriculture_income + totals.exempt_income
         is_agriculture_and_exempt_income_edited = total_agriculture_and_exempt_income > 0
 
-        interest_incomes = InterestIncome.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_interest_income = interest_incomes.aggregate(total=Sum('interest_amount'))['total'] or 0
-
-        it_refunds = InterestOnItRefunds.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_it_refunds = it_refunds.aggregate(total=Sum('amount'))['total'] or 0
-
-        dividend_incomes = DividendIncome.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_dividend_income = dividend_incomes.aggregate(total=Sum('amount'))['total'] or 0
-
-        betting_incomes = IncomeFromBetting.objects.filter(income_tax=income_tax_profile, income_tax_return=income_tax_return)
-        total_betting_income = betting_incomes.aggregate(total=Sum('amount'))['total'] or 0
-
-        total_others_income = total_interest_income + total_it_refunds + total_dividend_income + total_betting_income
+        total_others_income = totals.other_income
         is_others_income_edited = total_others_income > 0
 
         return Response({
@@ -1090,7 +1088,6 @@ class TotalIncomeGetAPIView(generics.GenericAPIView):
             'total_capital_gains': total_capital_gains,
             'is_capital_gains_edited': is_capital_gains_edited,
             'total_business_income': total_business_income,
-            # 'business_details': business_data,
             'is_business_income_edited': is_business_income_edited,
             'total_agriculture_and_exempt_income': total_agriculture_and_exempt_income,
             'is_agriculture_and_exempt_income_edited': is_agriculture_and_exempt_income_edited,
@@ -1106,56 +1103,26 @@ class TotalSummaryGetAPI(generics.GenericAPIView):
         user = self.request.user
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
-        income_tax_return = get_object_or_404(IncomeTaxReturn, id=income_tax_return_id, user=user)
-        income_tax_profile = income_tax_return.user.income_tax_profile
-
-        total_salary_income = SalaryIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('gross_salary'))['total'] or 0
-        total_rental_income = RentalIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('net_rental_income'))['total'] or 0
-        total_capital_gains = CapitalGains.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('gain_or_loss'))['total'] or 0
-        total_agriculture_income = AgricultureIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('gross_recipts'))['total'] or 0
-        total_exempt_income = ExemptIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_interest_income = InterestIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('interest_amount'))['total'] or 0
-        total_it_refunds = InterestOnItRefunds.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_dividend_income = DividendIncome.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_betting_income = IncomeFromBetting.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_business_income = BusinessIncome.objects.filter(income_tax_return=income_tax_return).aggregate(
-            total=Sum('gross_receipt_cheq_neft_rtgs_profit') + Sum('gross_receipt_cash_upi_profit'))['total'] or 0
-
-        total_income = (
-            total_salary_income + total_rental_income + total_capital_gains +
-            total_agriculture_income + total_exempt_income + total_interest_income +
-            total_it_refunds + total_dividend_income + total_betting_income +
-            total_business_income
+        income_tax_return = get_object_or_404(
+            ReturnTotalsQuery.annotate(IncomeTaxReturn.objects.select_related('income_tax_return_year')),
+            id=income_tax_return_id, user=user
         )
-
-        deductions = Deductions.objects.filter(income_tax_return=income_tax_return).first()
-        total_deductions = (
-            deductions.life_insurance + deductions.provident_fund + deductions.elss_mutual_fund +
-            deductions.home_loan_repayment + deductions.tution_fees + deductions.stamp_duty_paid +
-            deductions.others + deductions.contribution_by_self + deductions.contribution_by_employeer +
-            deductions.medical_insurance_self + deductions.medical_preventive_health_checkup_self +
-            deductions.medical_expenditure_self + deductions.medical_insurance_parents +
-            deductions.medical_preventive_health_checkup_parents + deductions.medical_expenditure_parents +
-            deductions.education_loan + deductions.electronic_vehicle_loan + deductions.home_loan_amount +
-            deductions.interest_income + deductions.royality_on_books + deductions.income_on_patients +
-            deductions.income_on_bio_degradable + deductions.rent_paid + deductions.contribution_to_agnipath +
-            deductions.donation_to_political_parties + deductions.donation_others
-        ) if deductions else 0
-
-        total_tds_or_tcs_amount = TdsOrTcsDeduction.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('tds_or_tcs_amount'))['total'] or 0
-        total_self_assessment_amount = SelfAssesmentAndAdvanceTaxPaid.objects.filter(income_tax_return=income_tax_return).aggregate(total=Sum('amount'))['total'] or 0
-        total_taxes_paid = total_tds_or_tcs_amount + total_self_assessment_amount
+        totals = ReturnTotalsQuery.record(income_tax_return)
 
         return Response({
             'income_tax_return_year': income_tax_return.income_tax_return_year.name,
-            'total_income': total_income,
-            'total_deductions': total_deductions,
-            'total_taxes_paid': total_taxes_paid,
+            'total_income': totals.gross_total_income,
+            'total_deductions': totals.deductions,
+            'total_taxes_paid': totals.taxes_paid,
             'total_tax_refund': 0,
         }, status=status.HTTP_200_OK)
 
 
 class AISPdfUploadApi(generics.CreateAPIView):
+    """
+    Deprecated, parses the AIS or TIS PDF in the web worker. Uploads are queued through IngestionJobCreateApi
+    and parsed by run_ingestion_worker, this stays until clients have moved to it.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = AISPdfUploadSerializer
 
@@ -1185,6 +1152,10 @@ class AISPdfUploadApi(generics.CreateAPIView):
 
 
 class TdsPdfUploadApi(generics.CreateAPIView):
+    """
+    Deprecated, parses the 26AS PDF in the web worker. Uploads are queued through IngestionJobCreateApi
+    and parsed by run_ingestion_worker, this stays until clients have moved to it.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = TdsPdfSerializer
 
@@ -1202,6 +1173,10 @@ class TdsPdfUploadApi(generics.CreateAPIView):
 
 
 class ChallanUploadApi(generics.CreateAPIView):
+    """
+    Deprecated, post parses the challan PDF in the web worker. Uploads are queued through IngestionJobCreateApi
+    and parsed by run_ingestion_worker, this stays until clients have moved to it.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class = ChallanPdfUploadSerializer
 
@@ -1246,6 +1221,62 @@ class ChallanUploadApi(generics.CreateAPIView):
         return Response({"message": "Data updated successfully", "data": updated_data}, status=status.HTTP_200_OK)
 
 
+class ChallanBatchUploadApi(generics.CreateAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = ChallanBatchUploadSerializer
+    parser_classes = (MultiPartParser, FormParser)
+
+    def post(self, request, *args, **kwargs):
+        encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
+        income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
+
+        try:
+            income_tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=request.user)
+        except IncomeTaxReturn.DoesNotExist:
+            return Response({"error": "IncomeTaxReturn not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.context['income_tax_return'] = income_tax_return
+        saved_data = serializer.save()
+
+        return Response({"message": "Data processed successfully", "data": saved_data}, status=status.HTTP_200_OK)
+
+
+class IngestionJobCreateApi(generics.CreateAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = IngestionJobCreateSerializer
+    parser_classes = (MultiPartParser, FormParser)
+    ingestion_service = IngestionJobService()
+
+    def post(self, request, *args, **kwargs):
+        encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
+        income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
+
+        try:
+            income_tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=request.user)
+        except IncomeTaxReturn.DoesNotExist:
+            return Response({"error": "IncomeTaxReturn not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job = self.ingestion_service.enqueue(income_tax_return, serializer.validated_data['document_type'],
+                                             serializer.validated_data['document'])
+        return Response({"message": "File queued for processing", "data": IngestionJobSerializer(job).data},
+                        status=status.HTTP_202_ACCEPTED)
+
+
+class IngestionJobDetailApi(generics.RetrieveAPIView):
+    permission_classes = [IsAuthenticated]
+    serializer_class = IngestionJobSerializer
+
+    def get(self, request, *args, **kwargs):
+        encoded_job_id = self.kwargs['job_id']
+        job_id = AlphaId.decode(encoded_job_id)
+        job = get_object_or_404(IngestionJob, id=job_id, income_tax_return__user=request.user)
+        return Response(self.get_serializer(job).data, status=status.HTTP_200_OK)
+
+
 class ReportsPageAPIView(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
 
@@ -1256,7 +1287,9 @@ class ReportsPageAPIView(generics.GenericAPIView):
         if income_tax_return_year_name:
             income_tax_return_year = get_object_or_404(IncomeTaxReturnYears, name=income_tax_return_year_name)
             income_tax_return = get_object_or_404(
-                IncomeTaxReturn,
+                ReturnTotalsQuery.annotate(
+                    IncomeTaxReturn.objects.select_related('income_tax_return_year', 'user__income_tax_profile')
+                ),
                 user=user,
                 income_tax_return_year=income_tax_return_year
             )
@@ -1267,10 +1300,15 @@ class ReportsPageAPIView(generics.GenericAPIView):
             current_year_obj = IncomeTaxCurrentYear().get_current_income_tax_return_year()
             if not current_year_obj:
                 return Response({"error": "No current year found"}, status=status.HTTP_404_NOT_FOUND)
-            current_income_tax_return = IncomeTaxReturn.objects.filter(
-                user=user, income_tax_return_year=current_year_obj).first()
-            graph_income_tax_returns = IncomeTaxReturn.objects.filter(user=user).select_related(
-                'income_tax_return_year', 'user__income_tax_profile')
+            # every year of the user with its totals in one query, the current year's return is taken from it.
+            graph_income_tax_returns = list(ReturnTotalsQuery.annotate(
+                IncomeTaxReturn.objects.filter(user=user).select_related(
+                    'income_tax_return_year', 'user__income_tax_profile').order_by('id')
+            ))
+            current_income_tax_return = next((
+                income_tax_return for income_tax_return in graph_income_tax_returns
+                if income_tax_return.income_tax_return_year_id == current_year_obj.id
+            ), None)
 
             graph_data = ReportsPageGraphDataSerializer(graph_income_tax_returns, many=True).data
 
@@ -1353,7 +1391,9 @@ class TaxRefundAPIView(generics.GenericAPIView):
     def get(self, request, *args, **kwargs):
         encoded_income_tax_return_id = self.kwargs.get('income_tax_return_id')
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
-        current_income_tax_return = get_object_or_404(IncomeTaxReturn, id=income_tax_return_id, user=request.user)
+        current_income_tax_return = get_object_or_404(
+            IncomeTaxReturn.objects.select_related('income_tax_return_year'), id=income_tax_return_id, user=request.user
+        )
         serializer = self.get_serializer(current_income_tax_return)
         return Response(serializer.data, status=200)
 
@@ -1361,146 +1401,30 @@ class TaxRefundAPIView(generics.GenericAPIView):
 class ComputationsOldRegimeApi(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     tax_calculator = IncomeTaxCalculations()
+    computation_cache = ComputationCacheService()
 
     def get(self, request, *args, **kwargs):
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
 
         user = request.user
+        filing_date = timezone.now().date()
+
+        cached_data = self.computation_cache.get(income_tax_return_id, user, Computations.Old, filing_date)
+        if cached_data is not None:
+            return Response({"old_regime": cached_data}, status=200)
 
         try:
-            tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=user)
+            snapshot = ReturnSnapshot.load(income_tax_return_id, user)
         except IncomeTaxReturn.DoesNotExist:
             return Response({"detail": "Income tax return not found."}, status=404)
 
-        salary_incomes = SalaryIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        rental_incomes = RentalIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        capital_gains = CapitalGains.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        business_incomes = BusinessIncome.objects.filter(income_tax__user=user,
-                                                         income_tax_return_id=income_tax_return_id)
-        interest_incomes = InterestIncome.objects.filter(income_tax__user=user,
-                                                         income_tax_return_id=income_tax_return_id)
-        dividend_incomes = DividendIncome.objects.filter(income_tax__user=user,
-                                                         income_tax_return_id=income_tax_return_id)
-        income_from_bettings = IncomeFromBetting.objects.filter(income_tax__user=user,
-                                                                income_tax_return_id=income_tax_return_id)
-        exempt_incomes = ExemptIncome.objects.filter(income_tax_return_id=income_tax_return_id)
-        agriculture_incomes = AgricultureIncome.objects.filter(income_tax_return_id=income_tax_return_id)
-        deductions = Deductions.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id).first()
-        tds_deductions = TdsOrTcsDeduction.objects.filter(income_tax_return_id=income_tax_return_id,
-                                                          income_tax__user=user)
-        self_assessment_advance_tax = SelfAssesmentAndAdvanceTaxPaid.objects.filter(
-            income_tax_return_id=income_tax_return_id, income_tax__user=user)
-
-        tax_return_year = tax_return.income_tax_return_year
-        filing_date = timezone.now().date()
-        due_date = tax_return_year.due_date
-        start_date = tax_return_year.start_date if tax_return_year else None
-        end_date = tax_return_year.end_date if tax_return_year else None
-
-        base_standard_deduction = Decimal('50000')
-
-        salary_incomes_data_old, _, total_income_from_salaries_old, _ = self.tax_calculator.calculate_salary_income(
-            salary_incomes, base_standard_deduction)
-
-        rental_incomes_data, total_rental_income_old, _ = self.tax_calculator.calculate_rental_income(rental_incomes)
-
-        total_capital_gains_income, long_term_capital_gains_112A, long_term_capital_gains_others, short_term_capital_gains = self.tax_calculator.calculate_capital_gains(
-            capital_gains)
-
-        business_incomes_data, total_income_from_business = self.tax_calculator.calculate_business_income(
-            business_incomes)
-
-        total_interest_income = sum([i.interest_amount for i in interest_incomes])
-        total_dividend_income = sum([d.amount for d in dividend_incomes])
-        total_winnings_income = sum([w.amount for w in income_from_bettings])
-
-        total_exempt_income = sum([e.amount for e in exempt_incomes])
-        total_net_income_from_agriculture = sum([agri_income.net_income for agri_income in agriculture_incomes])
-        total_combined_exempt_income = total_exempt_income + total_net_income_from_agriculture
-
-        deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum = self.tax_calculator.calculate_deductions(
-            deductions, interest_incomes)
-
-        total_deduction_amount = deduction_80c_sum + nps_contribution_sum + medical_premium_sum + interest_on_savings_sum
-
-        total_tds_or_tcs, total_self_assessment_tax, total_advance_tax = self.tax_calculator.calculate_tds_advance_tax(
-            tds_deductions, self_assessment_advance_tax, start_date, end_date)
-        tax_paid_old = total_tds_or_tcs + total_self_assessment_tax + total_advance_tax
-
-        gross_total_income_old = self.tax_calculator.calculate_gross_total_income(
-            total_income_from_salaries_old, total_rental_income_old, total_income_from_business,
-            total_capital_gains_income,
-            total_interest_income, total_dividend_income, total_winnings_income, total_combined_exempt_income)
-
-        total_income_old = gross_total_income_old - total_deduction_amount
-
-        tax_liability_old = self.tax_calculator.calculate_tax_liability_old_regime(gross_total_income_old)
-
-        surcharge_old = self.tax_calculator.calculate_surcharge(gross_total_income_old, tax_liability_old, regime="old")
-
-        tax_rebate_old = self.tax_calculator.calculate_tax_rebate_old_regime(gross_total_income_old, tax_liability_old)
-
-        cess_old = self.tax_calculator.calculate_cess(tax_liability_old, surcharge_old, tax_rebate_old)
-
-        net_tax_payable_old = tax_liability_old + surcharge_old - tax_rebate_old + cess_old
-
-        balance_tax_to_be_paid_old = net_tax_payable_old - total_advance_tax - total_tds_or_tcs
-
-        interest_234A_old = self.tax_calculator.calculate_interest_234A(balance_tax_to_be_paid_old, filing_date,
-                                                                        due_date)
-        interest_234B_old = self.tax_calculator.calculate_interest_234B(balance_tax_to_be_paid_old, total_advance_tax,
-                                                                        net_tax_payable_old)
-        interest_234C_old = self.tax_calculator.calculate_interest_234C(balance_tax_to_be_paid_old, total_advance_tax,
-                                                                        net_tax_payable_old)
-        total_interest_234_old = interest_234A_old + interest_234B_old + interest_234C_old
-
-        penalty_us_234F_old = self.tax_calculator.calculate_penalty_us_234F(total_income_old, filing_date, due_date)
-
-        tax_payable_old = balance_tax_to_be_paid_old + total_interest_234_old + penalty_us_234F_old
-
-        old_regime_data = {
-            "salary_incomes": salary_incomes_data_old,
-            "total_income_from_salaries": self.tax_calculator.round_off_decimal(total_income_from_salaries_old),
-            "rental_incomes": rental_incomes_data,
-            "long_term_capital_gain_u_s_112a": self.tax_calculator.round_off_decimal(long_term_capital_gains_112A),
-            "long_term_capital_gain_others": self.tax_calculator.round_off_decimal(long_term_capital_gains_others),
-            "short_term_capital_gain": self.tax_calculator.round_off_decimal(short_term_capital_gains),
-            "total_capital_gains_income": self.tax_calculator.round_off_decimal(total_capital_gains_income),
-            "business_incomes": business_incomes_data,
-            "total_income_from_business": self.tax_calculator.round_off_decimal(total_income_from_business),
-            "interest_income": self.tax_calculator.round_off_decimal(total_interest_income),
-            "dividend_income": self.tax_calculator.round_off_decimal(total_dividend_income),
-            "winnings_lotteries_games_bettings": self.tax_calculator.round_off_decimal(total_winnings_income),
-            "total_of_other_incomes": self.tax_calculator.round_off_decimal(
-                total_interest_income + total_dividend_income + total_winnings_income),
-            "exempt_income": self.tax_calculator.round_off_decimal(total_exempt_income),
-            "net_income_from_agriculture": self.tax_calculator.round_off_decimal(total_net_income_from_agriculture),
-            "total_exempt_income": self.tax_calculator.round_off_decimal(total_combined_exempt_income),
-            "deduction_u_s_80c": self.tax_calculator.round_off_decimal(deduction_80c_sum),
-            "nps_contribution_u_s_ccd": self.tax_calculator.round_off_decimal(nps_contribution_sum),
-            "80d_medical_insurance_premium": self.tax_calculator.round_off_decimal(medical_premium_sum),
-            "80tta_interest_on_savings_acc": self.tax_calculator.round_off_decimal(interest_on_savings_sum),
-            "total_deduction_amount": self.tax_calculator.round_off_decimal(total_deduction_amount),
-            "tds_or_tcs": self.tax_calculator.round_off_decimal(total_tds_or_tcs),
-            "self_assessment_tax": self.tax_calculator.round_off_decimal(total_self_assessment_tax),
-            "advance_tax": self.tax_calculator.round_off_decimal(total_advance_tax),
-            "tax_paid": tax_paid_old,
-            "gross_total_income": self.tax_calculator.round_off_decimal(gross_total_income_old),
-            "total_income": self.tax_calculator.round_off_decimal(total_income_old),
-            "tax_liability_at_normal_rates": self.tax_calculator.round_off_decimal(tax_liability_old),
-            "tax_rebate": self.tax_calculator.round_off_decimal(tax_rebate_old),
-            "surcharge": self.tax_calculator.round_off_decimal(surcharge_old),
-            "cess": self.tax_calculator.round_off_decimal(cess_old),
-            "net_tax_payable": self.tax_calculator.round_off_decimal(net_tax_payable_old),
-            "balance_tax_to_be_paid": self.tax_calculator.round_off_decimal(balance_tax_to_be_paid_old),
-            "interest_u_s_234a_b_c": self.tax_calculator.round_off_decimal(total_interest_234_old),
-            "penalt_u_s_234f": self.tax_calculator.round_off_decimal(penalty_us_234F_old),
-            "tax_payable": self.tax_calculator.round_off_decimal(tax_payable_old)
-        }
+        computation = self.tax_calculator.calculate_dual_regime(snapshot, Decimal('50000'), filing_date)
+        old_regime_data = self.tax_calculator.regime_computation_data(computation, "old")
 
         # Prepare the final response for old regime
         old_regime_data_serializable = self.tax_calculator.convert_to_json_serializable(old_regime_data)
+        self.computation_cache.store(snapshot.income_tax_return, Computations.Old, old_regime_data_serializable)
 
         return Response({"old_regime": old_regime_data_serializable}, status=200)
 
@@ -1508,289 +1432,117 @@ class ComputationsOldRegimeApi(generics.GenericAPIView):
 class ComputationsNewRegimeApi(generics.GenericAPIView):
     permission_classes = [IsAuthenticated]
     tax_calculator = IncomeTaxCalculations()
+    computation_cache = ComputationCacheService()
+    # the new regime response has always spelled these keys differently from the old regime one.
+    response_keys = {
+        "long_term_capital_gain_u_s_112a": "long_term_capital_gain_u_s_112A",
+        "winnings_lotteries_games_bettings": "winnings_Lotteries_games_bettings",
+        "deduction_u_s_80c": "deduction_u_s_80C",
+        "balance_tax_to_be_paid": "balance_tax_to_be_Paid",
+        "penalt_u_s_234f": "penalty_u_s_234f",
+    }
 
     def get(self, request, *args, **kwargs):
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
         user = request.user
-        try:
-            tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=user)
-        except IncomeTaxReturn.DoesNotExist:
-            return Response({"detail": "Income tax return not found."}, status=404)
-
-        salary_incomes = SalaryIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        rental_incomes = RentalIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        capital_gains = CapitalGains.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        business_incomes = BusinessIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        interest_incomes = InterestIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        dividend_incomes = DividendIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        income_from_bettings = IncomeFromBetting.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        exempt_incomes = ExemptIncome.objects.filter(income_tax_return_id=income_tax_return_id)
-        agriculture_incomes = AgricultureIncome.objects.filter(income_tax_return_id=income_tax_return_id)
-        deductions = Deductions.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id).first()
-        tds_deductions = TdsOrTcsDeduction.objects.filter(income_tax_return_id=income_tax_return_id, income_tax__user=user)
-        self_assessment_advance_tax = SelfAssesmentAndAdvanceTaxPaid.objects.filter(income_tax_return_id=income_tax_return_id, income_tax__user=user)
-
-        tax_return_year = tax_return.income_tax_return_year
         filing_date = timezone.now().date()
-        due_date = tax_return_year.due_date
-        start_date = tax_return_year.start_date if tax_return_year else None
-        end_date = tax_return_year.end_date if tax_return_year else None
-
-        base_standard_deduction = Decimal('50000')
-
-        _, salary_incomes_data_new, _, total_income_from_salaries_new = self.tax_calculator.calculate_salary_income(
-            salary_incomes, base_standard_deduction)
-
-        rental_incomes_data, _, total_rental_income_new = self.tax_calculator.calculate_rental_income(rental_incomes)
-
-        total_capital_gains_income, long_term_capital_gains_112A, long_term_capital_gains_others, short_term_capital_gains = self.tax_calculator.calculate_capital_gains(
-            capital_gains)
-
-        business_incomes_data, total_income_from_business = self.tax_calculator.calculate_business_income(business_incomes)
 
-        total_interest_income = sum([i.interest_amount for i in interest_incomes])
-        total_dividend_income = sum([d.amount for d in dividend_incomes])
-        total_winnings_income = sum([w.amount for w in income_from_bettings])
+        cached_data = self.computation_cache.get(income_tax_return_id, user, Computations.New, filing_date)
+        if cached_data is not None:
+            return Response({"new_regime": cached_data}, status=200)
 
-        total_exempt_income = sum([e.amount for e in exempt_incomes])
-        total_net_income_from_agriculture = sum([agri_income.net_income for agri_income in agriculture_incomes])
-        total_combined_exempt_income = total_exempt_income + total_net_income_from_agriculture
+        try:
+            snapshot = ReturnSnapshot.load(income_tax_return_id, user)
+        except IncomeTaxReturn.DoesNotExist:
+            return Response({"detail": "Income tax return not found."}, status=404)
 
-        deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum = self.tax_calculator.calculate_deductions(
-            deductions, interest_incomes)
+        computation = self.tax_calculator.calculate_dual_regime(snapshot, Decimal('50000'), filing_date)
+        new_regime_data = {
+            self.response_keys.get(key, key): value
+            for key, value in self.tax_calculator.regime_computation_data(computation, "new").items()
+        }
+        new_regime_data_serializable = self.tax_calculator.convert_to_json_serializable(new_regime_data)
+        self.computation_cache.store(snapshot.income_tax_return, Computations.New, new_regime_data_serializable)
 
-        total_deduction_amount = deduction_80c_sum + nps_contribution_sum + medical_premium_sum + interest_on_savings_sum
+        return Response({"new_regime": new_regime_data_serializable}, status=200)
 
-        total_tds_or_tcs, total_self_assessment_tax, total_advance_tax = self.tax_calculator.calculate_tds_advance_tax(
-            tds_deductions, self_assessment_advance_tax, start_date, end_date)
-        tax_paid_new = total_tds_or_tcs + total_self_assessment_tax + total_advance_tax
 
-        gross_total_income_new = self.tax_calculator.calculate_gross_total_income(
-            total_income_from_salaries_new, total_rental_income_new, total_income_from_business, total_capital_gains_income,
-            total_interest_income, total_dividend_income, total_winnings_income, total_combined_exempt_income)
+class SummaryPageApi(generics.GenericAPIView):
+    permission_classes = [IsAuthenticated]
+    computation_cache = ComputationCacheService()
 
-        total_income_new = gross_total_income_new - total_deduction_amount
+    def get(self, request, *args, **kwargs):
+        encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
+        income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
 
-        tax_liability_new = self.tax_calculator.calculate_tax_liability_new_regime(gross_total_income_new)
+        user = request.user
+        filing_date = timezone.now().date()
 
-        surcharge_new = self.tax_calculator.calculate_surcharge(gross_total_income_new, tax_liability_new, regime="new")
+        cached_data = self.computation_cache.get(income_tax_return_id, user, Computations.Summary, filing_date)
+        if cached_data is not None:
+            return Response(cached_data, status=200)
 
-        tax_rebate_new = self.tax_calculator.calculate_tax_rebate_new_regime(gross_total_income_new, tax_liability_new)
+        try:
+            snapshot = ReturnSnapshot.load(income_tax_return_id, user)
+        except IncomeTaxReturn.DoesNotExist:
+            return Response({"detail": "Income tax return not found."}, status=404)
 
-        cess_new = self.tax_calculator.calculate_cess(tax_liability_new, surcharge_new, tax_rebate_new)
+        calc = IncomeTaxCalculations()
+        computation = calc.calculate_dual_regime(snapshot, Decimal('50000'), filing_date)
 
-        net_tax_payable_new = tax_liability_new + surcharge_new - tax_rebate_new + cess_new
+        response_data = calc.regime_summary_data(computation)
+        self.computation_cache.store(snapshot.income_tax_return, Computations.Summary, response_data)
 
-        balance_tax_to_be_paid_new = net_tax_payable_new - total_advance_tax - total_tds_or_tcs
+        return Response(response_data, status=200)
 
-        interest_234A_new = self.tax_calculator.calculate_interest_234A(balance_tax_to_be_paid_new, filing_date, due_date)
-        interest_234B_new = self.tax_calculator.calculate_interest_234B(balance_tax_to_be_paid_new, total_advance_tax, net_tax_payable_new)
-        interest_234C_new = self.tax_calculator.calculate_interest_234C(balance_tax_to_be_paid_new, total_advance_tax, net_tax_payable_new)
-        total_interest_234_new = interest_234A_new + interest_234B_new + interest_234C_new
 
-        penalty_us_234F_new = self.tax_calculator.calculate_penalty_us_234F(total_income_new, filing_date, due_date)
+class WhatIfSimulationApi(generics.GenericAPIView):
+    """
+    Both regimes of the return for every posted scenario of changes to its deductions and salary, nothing is
+    saved.
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = WhatIfSimulationSerializer
+    simulator = WhatIfSimulator()
 
-        tax_payable_new = balance_tax_to_be_paid_new + total_interest_234_new + penalty_us_234F_new
+    def post(self, request, *args, **kwargs):
+        encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
+        income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
 
-        new_regime_data = {
-            "salary_incomes": salary_incomes_data_new,
-            "total_income_from_salaries": self.tax_calculator.round_off_decimal(total_income_from_salaries_new),
-            "rental_incomes": rental_incomes_data,
-            "long_term_capital_gain_u_s_112A": self.tax_calculator.round_off_decimal(long_term_capital_gains_112A),
-            "long_term_capital_gain_others": self.tax_calculator.round_off_decimal(long_term_capital_gains_others),
-            "short_term_capital_gain": self.tax_calculator.round_off_decimal(short_term_capital_gains),
-            "total_capital_gains_income": self.tax_calculator.round_off_decimal(total_capital_gains_income),
-            "business_incomes": business_incomes_data,
-            "total_income_from_business": self.tax_calculator.round_off_decimal(total_income_from_business),
-            "interest_income": self.tax_calculator.round_off_decimal(total_interest_income),
-            "dividend_income": self.tax_calculator.round_off_decimal(total_dividend_income),
-            "winnings_Lotteries_games_bettings": self.tax_calculator.round_off_decimal(total_winnings_income),
-            "total_of_other_incomes": self.tax_calculator.round_off_decimal(total_interest_income + total_dividend_income + total_winnings_income),
-            "exempt_income": self.tax_calculator.round_off_decimal(total_exempt_income),
-            "net_income_from_agriculture": self.tax_calculator.round_off_decimal(total_net_income_from_agriculture),
-            "total_exempt_income": self.tax_calculator.round_off_decimal(total_combined_exempt_income),
-            "deduction_u_s_80C": self.tax_calculator.round_off_decimal(deduction_80c_sum),
-            "nps_contribution_u_s_ccd": self.tax_calculator.round_off_decimal(nps_contribution_sum),
-            "80d_medical_insurance_premium": self.tax_calculator.round_off_decimal(medical_premium_sum),
-            "80tta_interest_on_savings_acc": self.tax_calculator.round_off_decimal(interest_on_savings_sum),
-            "total_deduction_amount": self.tax_calculator.round_off_decimal(total_deduction_amount),
-            "tds_or_tcs": self.tax_calculator.round_off_decimal(total_tds_or_tcs),
-            "self_assessment_tax": self.tax_calculator.round_off_decimal(total_self_assessment_tax),
-            "advance_tax": self.tax_calculator.round_off_decimal(total_advance_tax),
-            "tax_paid": tax_paid_new,
-            "gross_total_income": self.tax_calculator.round_off_decimal(gross_total_income_new),
-            "total_income": self.tax_calculator.round_off_decimal(total_income_new),
-            "tax_liability_at_normal_rates": self.tax_calculator.round_off_decimal(tax_liability_new),
-            "tax_rebate": self.tax_calculator.round_off_decimal(tax_rebate_new),
-            "surcharge": self.tax_calculator.round_off_decimal(surcharge_new),
-            "cess": self.tax_calculator.round_off_decimal(cess_new),
-            "net_tax_payable": self.tax_calculator.round_off_decimal(net_tax_payable_new),
-            "balance_tax_to_be_Paid": self.tax_calculator.round_off_decimal(balance_tax_to_be_paid_new),
-            "interest_u_s_234a_b_c": self.tax_calculator.round_off_decimal(total_interest_234_new),
-            "penalty_u_s_234f": self.tax_calculator.round_off_decimal(penalty_us_234F_new),
-            "tax_payable": self.tax_calculator.round_off_decimal(tax_payable_new)
-        }
-        new_regime_data_serializable = self.tax_calculator.convert_to_json_serializable(new_regime_data)
+        try:
+            snapshot = ReturnSnapshot.load(income_tax_return_id, request.user)
+        except IncomeTaxReturn.DoesNotExist:
+            return Response({"detail": "Income tax return not found."}, status=404)
 
-        return Response({"new_regime": new_regime_data_serializable}, status=200)
+        serializer = self.get_serializer(data=request.data, context={**self.get_serializer_context(), 'snapshot': snapshot})
+        serializer.is_valid(raise_exception=True)
+        response_data = self.simulator.simulate(snapshot, serializer.validated_data['scenarios'],
+                                                timezone.now().date())
+        return Response(response_data, status=200)
 
 
-class SummaryPageApi(generics.GenericAPIView):
+class DeductionPlanApi(generics.GenericAPIView):
+    """
+    The cheapest investment under 80C and 80D that brings each regime's tax to its minimum, optionally within
+    a budget, and the regime that leaves less tax.
+    """
     permission_classes = [IsAuthenticated]
+    serializer_class = DeductionPlanSerializer
+    optimizer = DeductionOptimizer()
 
     def get(self, request, *args, **kwargs):
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
 
-        user = request.user
-
+        serializer = self.get_serializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
         try:
-            tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=user)
+            snapshot = ReturnSnapshot.load(income_tax_return_id, request.user)
         except IncomeTaxReturn.DoesNotExist:
             return Response({"detail": "Income tax return not found."}, status=404)
 
-        salary_incomes = SalaryIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        rental_incomes = RentalIncome.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        capital_gains = CapitalGains.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id)
-        business_incomes = BusinessIncome.objects.filter(income_tax__user=user,
-                                                         income_tax_return_id=income_tax_return_id)
-        interest_incomes = InterestIncome.objects.filter(income_tax__user=user,
-                                                         income_tax_return_id=income_tax_return_id)
-        dividend_incomes = DividendIncome.objects.filter(income_tax__user=user,
-                                                         income_tax_return_id=income_tax_return_id)
-        income_from_bettings = IncomeFromBetting.objects.filter(income_tax__user=user,
-                                                                income_tax_return_id=income_tax_return_id)
-        exempt_incomes = ExemptIncome.objects.filter(income_tax_return_id=income_tax_return_id)
-        agriculture_incomes = AgricultureIncome.objects.filter(income_tax_return_id=income_tax_return_id)
-        deductions = Deductions.objects.filter(income_tax__user=user, income_tax_return_id=income_tax_return_id).first()
-        tds_deductions = TdsOrTcsDeduction.objects.filter(income_tax_return_id=income_tax_return_id,
-                                                          income_tax__user=user)
-        self_assessment_advance_tax = SelfAssesmentAndAdvanceTaxPaid.objects.filter(
-            income_tax_return_id=income_tax_return_id, income_tax__user=user)
-
-        tax_return_year = tax_return.income_tax_return_year
-        filing_date = timezone.now().date()
-        due_date = tax_return_year.due_date
-        start_date = tax_return_year.start_date if tax_return_year else None
-        end_date = tax_return_year.end_date if tax_return_year else None
-
-        calc = IncomeTaxCalculations()
-
-        base_standard_deduction = Decimal('50000')
-        salary_incomes_data_old, _, total_income_from_salaries_old, _ = calc.calculate_salary_income(salary_incomes,
-                                                                                                     base_standard_deduction)
-        rental_incomes_data, total_rental_income_old, _ = calc.calculate_rental_income(rental_incomes)
-        total_capital_gains_income, long_term_capital_gains_112A, long_term_capital_gains_others, short_term_capital_gains = calc.calculate_capital_gains(
-            capital_gains)
-        business_incomes_data, total_income_from_business = calc.calculate_business_income(business_incomes)
-        total_interest_income = sum([i.interest_amount for i in interest_incomes])
-        total_dividend_income = sum([d.amount for d in dividend_incomes])
-        total_winnings_income = sum([w.amount for w in income_from_bettings])
-        total_exempt_income = sum([e.amount for e in exempt_incomes])
-        total_net_income_from_agriculture = sum([agri_income.net_income for agri_income in agriculture_incomes])
-        total_combined_exempt_income = total_exempt_income + total_net_income_from_agriculture
-        deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum = calc.calculate_deductions(
-            deductions, interest_incomes)
-        total_deduction_amount = deduction_80c_sum + nps_contribution_sum + medical_premium_sum + interest_on_savings_sum
-        total_tds_or_tcs, total_self_assessment_tax, total_advance_tax = calc.calculate_tds_advance_tax(tds_deductions,
-                                                                                                        self_assessment_advance_tax,
-                                                                                                        start_date,
-                                                                                                        end_date)
-        gross_total_income_old = calc.calculate_gross_total_income(total_income_from_salaries_old,
-                                                                   total_rental_income_old, total_income_from_business,
-                                                                   total_capital_gains_income, total_interest_income,
-                                                                   total_dividend_income, total_winnings_income,
-                                                                   total_combined_exempt_income)
-        total_income_old = gross_total_income_old - total_deduction_amount
-        tax_liability_old = calc.calculate_tax_liability_old_regime(gross_total_income_old)
-        surcharge_old = calc.calculate_surcharge(gross_total_income_old, tax_liability_old, regime="old")
-        tax_rebate_old = calc.calculate_tax_rebate_old_regime(gross_total_income_old, tax_liability_old)
-        cess_old = calc.calculate_cess(tax_liability_old, surcharge_old, tax_rebate_old)
-        net_tax_payable_old = tax_liability_old + surcharge_old - tax_rebate_old + cess_old
-        balance_tax_to_be_paid_old = net_tax_payable_old - total_advance_tax - total_tds_or_tcs
-        interest_234A_old = calc.calculate_interest_234A(balance_tax_to_be_paid_old, filing_date, due_date)
-        interest_234B_old = calc.calculate_interest_234B(balance_tax_to_be_paid_old, total_advance_tax,
-                                                         net_tax_payable_old)
-        interest_234C_old = calc.calculate_interest_234C(balance_tax_to_be_paid_old, total_advance_tax,
-                                                         net_tax_payable_old)
-        total_interest_234_old = interest_234A_old + interest_234B_old + interest_234C_old
-        penalty_us_234F_old = calc.calculate_penalty_us_234F(total_income_old, filing_date, due_date)
-        tax_payable_old = balance_tax_to_be_paid_old + total_interest_234_old + penalty_us_234F_old
-
-        _, salary_incomes_data_new, _, total_income_from_salaries_new = calc.calculate_salary_income(salary_incomes,
-                                                                                                     base_standard_deduction)
-        gross_total_income_new = calc.calculate_gross_total_income(total_income_from_salaries_new,
-                                                                   total_rental_income_old, total_income_from_business,
-                                                                   total_capital_gains_income, total_interest_income,
-                                                                   total_dividend_income, total_winnings_income,
-                                                                   total_combined_exempt_income)
-        total_income_new = gross_total_income_new - total_deduction_amount
-        tax_liability_new = calc.calculate_tax_liability_new_regime(gross_total_income_new)
-        surcharge_new = calc.calculate_surcharge(gross_total_income_new, tax_liability_new, regime="new")
-        tax_rebate_new = calc.calculate_tax_rebate_new_regime(gross_total_income_new, tax_liability_new)
-        cess_new = calc.calculate_cess(tax_liability_new, surcharge_new, tax_rebate_new)
-        net_tax_payable_new = tax_liability_new + surcharge_new - tax_rebate_new + cess_new
-        balance_tax_to_be_paid_new = net_tax_payable_new - total_advance_tax - total_tds_or_tcs
-        interest_234A_new = calc.calculate_interest_234A(balance_tax_to_be_paid_new, filing_date, due_date)
-        interest_234B_new = calc.calculate_interest_234B(balance_tax_to_be_paid_new, total_advance_tax,
-                                                         net_tax_payable_new)
-        interest_234C_new = calc.calculate_interest_234C(balance_tax_to_be_paid_new, total_advance_tax,
-                                                         net_tax_payable_new)
-        total_interest_234_new = interest_234A_new + interest_234B_new + interest_234C_new
-        penalty_us_234F_new = calc.calculate_penalty_us_234F(total_income_new, filing_date, due_date)
-        tax_payable_new = balance_tax_to_be_paid_new + total_interest_234_new + penalty_us_234F_new
-
-        total_rental_income_sum = sum([rental_income.annual_rent for rental_income in rental_incomes])
-
-        interest_and_penalty_old = total_interest_234_old + penalty_us_234F_old
-        interest_and_penalty_new = total_interest_234_new + penalty_us_234F_new
-
-        response_data = {
-            "old_regime": {
-                "total_income_from_salaries": calc.round_off_decimal(total_income_from_salaries_old),
-                "total_rental_income": calc.round_off_decimal(total_rental_income_sum),
-                "total_capital_gains_income": calc.round_off_decimal(total_capital_gains_income),
-                "total_income_from_business": calc.round_off_decimal(total_income_from_business),
-                "total_of_other_incomes": calc.round_off_decimal(
-                    total_interest_income + total_dividend_income + total_winnings_income),
-                "total_exempt_income": calc.round_off_decimal(total_combined_exempt_income),
-                "total_deduction_amount": calc.round_off_decimal(total_deduction_amount),
-                "tds_or_tcs": calc.round_off_decimal(total_tds_or_tcs),
-                "self_assessment_tax": calc.round_off_decimal(total_self_assessment_tax),
-                "advance_tax": calc.round_off_decimal(total_advance_tax),
-                "gross_total_income": calc.round_off_decimal(gross_total_income_old),
-                "total_income": calc.round_off_decimal(total_income_old),
-                "tax_liability_at_normal_rates": calc.round_off_decimal(tax_liability_old),
-                "net_tax_payable": calc.round_off_decimal(net_tax_payable_old),
-                "balance_tax_to_be_paid": calc.round_off_decimal(balance_tax_to_be_paid_old),
-                "interest_and_penalty": calc.round_off_decimal(interest_and_penalty_old),
-                "tax_payable": calc.round_off_decimal(tax_payable_old),
-
-            },
-            "new_regime": {
-                "total_income_from_salaries": calc.round_off_decimal(total_income_from_salaries_new),
-                "total_rental_income": calc.round_off_decimal(total_rental_income_sum),
-                "total_capital_gains_income": calc.round_off_decimal(total_capital_gains_income),
-                "total_income_from_business": calc.round_off_decimal(total_income_from_business),
-                "total_of_other_incomes": calc.round_off_decimal(
-                    total_interest_income + total_dividend_income + total_winnings_income),
-                "total_exempt_income": calc.round_off_decimal(total_combined_exempt_income),
-                "total_deduction_amount": calc.round_off_decimal(total_deduction_amount),
-                "tds_or_tcs": calc.round_off_decimal(total_tds_or_tcs),
-                "self_assessment_tax": calc.round_off_decimal(total_self_assessment_tax),
-                "advance_tax": calc.round_off_decimal(total_advance_tax),
-                "gross_total_income": calc.round_off_decimal(gross_total_income_new),
-                "total_income": calc.round_off_decimal(total_income_new),
-                "tax_liability_at_normal_rates": calc.round_off_decimal(tax_liability_new),
-                "net_tax_payable": calc.round_off_decimal(net_tax_payable_new),
-                "balance_tax_to_be_paid": calc.round_off_decimal(balance_tax_to_be_paid_new),
-                "interest_and_penalty": calc.round_off_decimal(interest_and_penalty_new),
-                "tax_payable": calc.round_off_decimal(tax_payable_new),
-
-            }
-        }
-
+        response_data = self.optimizer.plan(snapshot, timezone.now().date(), serializer.validated_data['budget'])
         return Response(response_data, status=200)
 
 
@@ -1812,7 +1564,8 @@ class ComputationsCreateApi(generics.CreateAPIView):
         else:
             return Response({'error': 'Invalid regime type. Use "new" or "old".'}, status=status.HTTP_400_BAD_REQUEST)
 
-        computation = Computations.objects.filter(income_tax_return=income_tax_return, regime_type=regime_type).first()
+        computation = Computations.objects.filter(income_tax_return=income_tax_return, regime_type=regime_type,
+                                                  return_version__isnull=True).first()
 
         if computation:
             serializer = self.get_serializer(computation, data=data, partial=True)
@@ -1822,364 +1575,69 @@ class ComputationsCreateApi(generics.CreateAPIView):
             status_code = status.HTTP_201_CREATED
 
         serializer.is_valid(raise_exception=True)
-        serializer.save(income_tax_return=income_tax_return)
+        # client posted data is never served as a cached server computation.
+        serializer.save(income_tax_return=income_tax_return, return_version=None)
 
         return Response(serializer.data, status=status_code)
 
 
-class GeneratePdfMixin:
-
-    def render_to_pdf(self, template_src, context_dict):
-        template = get_template(template_src)
-        html = template.render(context_dict)
-        result = BytesIO()
-
-        pdf = pisa.pisaDocument(BytesIO(html.encode('UTF-8')), result)
-
-        if not pdf.err:
-            return HttpResponse(result.getvalue(), content_type='application/pdf')
-        return None
-
-
-class IncomeTaxPdfView(generics.GenericAPIView, GeneratePdfMixin):
-
+class ReportPdfView(generics.GenericAPIView):
+    """
+    Serves the stored copy of a report with its ETag and Last-Modified, so a client that already has it gets a 304.
+    """
     permission_classes = [IsAuthenticated]
+    report_service = ReportArtifactService()
+    report_type = None
 
     def get(self, request, *args, **kwargs):
         encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
         income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
 
         try:
-            tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=request.user)
-            profile = tax_return.user.income_tax_profile
+            artifact = self.report_service.get_or_render(income_tax_return_id, request.user, self.report_type)
         except IncomeTaxReturn.DoesNotExist:
             return HttpResponse("Invalid Income Tax Return ID or Unauthorized access.", status=404)
-
-        salary_incomes = tax_return.salary_incomes.all()
-        rental_incomes = tax_return.rental_incomes.all()
-        capital_gains = tax_return.capital_gains.all()
-        business_incomes = tax_return.business_income.all()
-        interest_incomes = tax_return.exempt_incomes.all()
-        dividend_incomes = tax_return.dividend_income.all()
-        income_from_bettings = tax_return.income_from_betting.all()
-        exempt_incomes = tax_return.exempt_incomes_agriculture.all()
-        agriculture_incomes = tax_return.agriculture_income.all()
-
-        deductions = None
-        try:
-            deductions = tax_return.deductions
-        except Deductions.DoesNotExist:
-            deductions = None
-        tds_deductions = tax_return.tds_or_tcs_deduction.all()
-        self_assessment_advance_tax = tax_return.self_assesment_and_advance_tax_paid.all()
-
-        calc = IncomeTaxCalculations()
-        base_standard_deduction = Decimal('50000')
-
-        salary_incomes_data_old, _, total_income_from_salaries_old, _ = calc.calculate_salary_income(salary_incomes, base_standard_deduction)
-        rental_incomes_data, total_rental_income_old, _ = calc.calculate_rental_income(rental_incomes)
-        total_capital_gains_income, _, _, _ = calc.calculate_capital_gains(capital_gains)
-        _, total_income_from_business = calc.calculate_business_income(business_incomes)
-        total_interest_income = sum([i.interest_amount for i in interest_incomes])
-        total_dividend_income = sum([d.amount for d in dividend_incomes])
-        total_winnings_income = sum([w.amount for w in income_from_bettings])
-        total_exempt_income = sum([e.amount for e in exempt_incomes])
-        total_net_income_from_agriculture = sum([agri_income.net_income for agri_income in agriculture_incomes])
-        total_combined_exempt_income = total_exempt_income + total_net_income_from_agriculture
-        if deductions:
-            deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum = calc.calculate_deductions(
-                deductions, interest_incomes)
-            total_deduction_amount = deduction_80c_sum + nps_contribution_sum + medical_premium_sum + interest_on_savings_sum
-        else:
-            total_deduction_amount = Decimal('0')
-
-        total_tds_or_tcs, total_self_assessment_tax, total_advance_tax = calc.calculate_tds_advance_tax(tds_deductions, self_assessment_advance_tax, tax_return.income_tax_return_year.start_date, tax_return.income_tax_return_year.end_date)
-        gross_total_income_old = calc.calculate_gross_total_income(total_income_from_salaries_old, total_rental_income_old, total_income_from_business, total_capital_gains_income, total_interest_income, total_dividend_income, total_winnings_income, total_combined_exempt_income)
-        total_income_old = gross_total_income_old - total_deduction_amount
-        tax_liability_old = calc.calculate_tax_liability_old_regime(gross_total_income_old)
-        surcharge_old = calc.calculate_surcharge(gross_total_income_old, tax_liability_old, regime="old")
-        tax_rebate_old = calc.calculate_tax_rebate_old_regime(gross_total_income_old, tax_liability_old)
-        cess_old = calc.calculate_cess(tax_liability_old, surcharge_old, tax_rebate_old)
-        net_tax_payable_old = tax_liability_old + surcharge_old - tax_rebate_old + cess_old
-        balance_tax_to_be_paid_old = net_tax_payable_old - total_advance_tax - total_tds_or_tcs
-        total_interest_234_old = calc.calculate_interest_234A(balance_tax_to_be_paid_old, timezone.now().date(), tax_return.income_tax_return_year.due_date) + \
-                                 calc.calculate_interest_234B(balance_tax_to_be_paid_old, total_advance_tax, net_tax_payable_old) + \
-                                 calc.calculate_interest_234C(balance_tax_to_be_paid_old, total_advance_tax, net_tax_payable_old)
-        penalty_us_234F_old = calc.calculate_penalty_us_234F(total_income_old, timezone.now().date(), tax_return.income_tax_return_year.due_date)
-        tax_payable_old = balance_tax_to_be_paid_old + total_interest_234_old + penalty_us_234F_old
-
-        _, salary_incomes_data_new, _, total_income_from_salaries_new = calc.calculate_salary_income(salary_incomes, base_standard_deduction)
-        gross_total_income_new = calc.calculate_gross_total_income(total_income_from_salaries_new, total_rental_income_old, total_income_from_business, total_capital_gains_income, total_interest_income, total_dividend_income, total_winnings_income, total_combined_exempt_income)
-        total_income_new = gross_total_income_new - total_deduction_amount
-        tax_liability_new = calc.calculate_tax_liability_new_regime(gross_total_income_new)
-        surcharge_new = calc.calculate_surcharge(gross_total_income_new, tax_liability_new, regime="new")
-        tax_rebate_new = calc.calculate_tax_rebate_new_regime(gross_total_income_new, tax_liability_new)
-        cess_new = calc.calculate_cess(tax_liability_new, surcharge_new, tax_rebate_new)
-        net_tax_payable_new = tax_liability_new + surcharge_new - tax_rebate_new + cess_new
-        balance_tax_to_be_paid_new = net_tax_payable_new - total_advance_tax - total_tds_or_tcs
-        total_interest_234_new = calc.calculate_interest_234A(balance_tax_to_be_paid_new, timezone.now().date(), tax_return.income_tax_return_year.due_date) + \
-                                 calc.calculate_interest_234B(balance_tax_to_be_paid_new, total_advance_tax, net_tax_payable_new) + \
-                                 calc.calculate_interest_234C(balance_tax_to_be_paid_new, total_advance_tax, net_tax_payable_new)
-        penalty_us_234F_new = calc.calculate_penalty_us_234F(total_income_new, timezone.now().date(), tax_return.income_tax_return_year.due_date)
-        tax_payable_new = balance_tax_to_be_paid_new + total_interest_234_new + penalty_us_234F_new
-
-        total_rental_income_sum = sum([rental_income.annual_rent for rental_income in rental_incomes])
-
-        interest_and_penalty_old = total_interest_234_old + penalty_us_234F_old
-        interest_and_penalty_new = total_interest_234_new + penalty_us_234F_new
-
-        context = {
-            "old_regime": {
-                "salary_income": calc.round_off_decimal(total_income_from_salaries_old),
-                "rental_income": calc.round_off_decimal(total_rental_income_sum),
-                "capital_gains_income": calc.round_off_decimal(total_capital_gains_income),
-                "business_income": calc.round_off_decimal(total_income_from_business),
-                "exempt_income": calc.round_off_decimal(total_combined_exempt_income),
-                "gross_total_income": calc.round_off_decimal(gross_total_income_old),
-                "deductions": calc.round_off_decimal(total_deduction_amount),
-                "total_income": calc.round_off_decimal(total_income_old),
-                "tax_on_total_income": calc.round_off_decimal(tax_liability_old),
-                "taxes_paid": calc.round_off_decimal(total_tds_or_tcs),
-                "interest_and_penalties": calc.round_off_decimal(interest_and_penalty_old),
-                "tax_payable": calc.round_off_decimal(tax_payable_old),
-            },
-            "new_regime": {
-                "salary_income": calc.round_off_decimal(total_income_from_salaries_new),
-                "rental_income": calc.round_off_decimal(total_rental_income_sum),
-                "capital_gains_income": calc.round_off_decimal(total_capital_gains_income),
-                "business_income": calc.round_off_decimal(total_income_from_business),
-                "exempt_income": calc.round_off_decimal(total_combined_exempt_income),
-                "gross_total_income": calc.round_off_decimal(gross_total_income_new),
-                "deductions": calc.round_off_decimal(total_deduction_amount),
-                "total_income": calc.round_off_decimal(total_income_new),
-                "tax_on_total_income": calc.round_off_decimal(tax_liability_new),
-                "taxes_paid": calc.round_off_decimal(total_tds_or_tcs),
-                "interest_and_penalties": calc.round_off_decimal(interest_and_penalty_new),
-                "tax_payable": calc.round_off_decimal(tax_payable_new),
-            },
-            "recommended": {
-                "regime_type": "New Regime" if net_tax_payable_new < net_tax_payable_old else "Old Regime",
-                "savings": abs(net_tax_payable_new - net_tax_payable_old),
-            }
-        }
-
-        pdf = self.render_to_pdf('itr_summary_report.html', context)
-
-        if pdf:
-            response = HttpResponse(pdf, content_type='application/pdf')
-            filename = f"{slugify(profile.user.username)}-income-tax-report.pdf"
-            content = f"inline; filename={filename}"
-            response['Content-Disposition'] = content
-            return response
-
-        return HttpResponse("Error generating PDF", status=500)
-
-
-class IncometaxComputationsOldPdfView(generics.GenericAPIView, GeneratePdfMixin):
+        if artifact is None:
+            return HttpResponse("Error generating PDF", status=500)
+
+        etag = quote_etag(artifact.etag)
+        last_modified = int(artifact.updated_at.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = FileResponse(artifact.pdf.open('rb'), content_type='application/pdf')
+            filename = f"{slugify(request.user.username)}-{REPORTS[self.report_type].filename}.pdf"
+            response['Content-Disposition'] = f"inline; filename={filename}"
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # revalidated on every use, a changed return serves a new copy straight away.
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+
+class DownloadReportsArchiveApi(generics.GenericAPIView):
+    """
+    Every report and uploaded statement of every year of the user as one ZIP, streamed as it is written.
+    """
     permission_classes = [IsAuthenticated]
+    report_service = ReportArtifactService()
 
     def get(self, request, *args, **kwargs):
-        encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
-        income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
+        if not IncomeTaxReturn.objects.filter(user=request.user).exists():
+            return Response({"error": "No income tax returns found"}, status=status.HTTP_404_NOT_FOUND)
+        response = StreamingHttpResponse(self.report_service.iter_archive(request.user),
+                                         content_type='application/zip')
+        response['Content-Disposition'] = f"attachment; filename={slugify(request.user.username)}-reports.zip"
+        return response
 
-        try:
-            tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=request.user)
-        except IncomeTaxReturn.DoesNotExist:
-            return HttpResponse("Invalid Income Tax Return ID or Unauthorized access.", status=404)
 
-        calc = IncomeTaxCalculations()
-        base_standard_deduction = Decimal('50000')
-
-        salary_incomes = tax_return.salary_incomes.all()
-        rental_incomes = tax_return.rental_incomes.all()
-        capital_gains = tax_return.capital_gains.all()
-        business_incomes = tax_return.business_income.all()
-        interest_incomes = tax_return.exempt_incomes.all()
-        dividend_incomes = tax_return.dividend_income.all()
-        exempt_incomes = tax_return.exempt_incomes_agriculture.all()
-        agriculture_incomes = tax_return.agriculture_income.all()
-
-        salary_incomes_data_old, _, total_income_from_salaries_old, _ = calc.calculate_salary_income(salary_incomes, base_standard_deduction)
-        rental_incomes_data, total_rental_income_old, _ = calc.calculate_rental_income(rental_incomes)
-        total_capital_gains_income, long_term_capital_gains_112A, long_term_capital_gains_others, short_term_capital_gains = calc.calculate_capital_gains(capital_gains)
-        business_incomes_data, total_income_from_business = calc.calculate_business_income(business_incomes)
-        total_interest_income = sum([i.interest_amount for i in interest_incomes])
-        total_dividend_income = sum([d.amount for d in dividend_incomes])
-        total_winnings_income = 0  # Assuming you handle this elsewhere
-        total_exempt_income = sum([e.amount for e in exempt_incomes])
-        total_net_income_from_agriculture = sum([agri_income.net_income for agri_income in agriculture_incomes])
-        total_combined_exempt_income = total_exempt_income + total_net_income_from_agriculture
-
-        deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum = calc.calculate_deductions(tax_return.deductions, interest_incomes)
-        total_deduction_amount = deduction_80c_sum + nps_contribution_sum + medical_premium_sum + interest_on_savings_sum
-
-        total_tds_or_tcs, total_self_assessment_tax, total_advance_tax = calc.calculate_tds_advance_tax(tax_return.tds_or_tcs_deduction.all(), tax_return.self_assesment_and_advance_tax_paid.all(), tax_return.income_tax_return_year.start_date, tax_return.income_tax_return_year.end_date)
-        gross_total_income_old = calc.calculate_gross_total_income(total_income_from_salaries_old, total_rental_income_old, total_income_from_business, total_capital_gains_income, total_interest_income, total_dividend_income, total_winnings_income, total_combined_exempt_income)
-        total_income_old = gross_total_income_old - total_deduction_amount
-        tax_liability_old = calc.calculate_tax_liability_old_regime(gross_total_income_old)
-        surcharge_old = calc.calculate_surcharge(gross_total_income_old, tax_liability_old, regime="old")
-        tax_rebate_old = calc.calculate_tax_rebate_old_regime(gross_total_income_old, tax_liability_old)
-        cess_old = calc.calculate_cess(tax_liability_old, surcharge_old, tax_rebate_old)
-        net_tax_payable_old = tax_liability_old + surcharge_old - tax_rebate_old + cess_old
-        balance_tax_to_be_paid_old = net_tax_payable_old - total_advance_tax - total_tds_or_tcs
-        total_interest_234_old = calc.calculate_interest_234A(balance_tax_to_be_paid_old, timezone.now().date(), tax_return.income_tax_return_year.due_date) + \
-                                 calc.calculate_interest_234B(balance_tax_to_be_paid_old, total_advance_tax, net_tax_payable_old) + \
-                                 calc.calculate_interest_234C(balance_tax_to_be_paid_old, total_advance_tax, net_tax_payable_old)
-        penalty_us_234F_old = calc.calculate_penalty_us_234F(total_income_old, timezone.now().date(), tax_return.income_tax_return_year.due_date)
-        tax_payable_old = balance_tax_to_be_paid_old + total_interest_234_old + penalty_us_234F_old
-
-        context ={
-        "old_regime_data" : {
-            "salary_incomes": salary_incomes_data_old,
-            "total_income_from_salaries": calc.round_off_decimal(total_income_from_salaries_old),
-            "rental_incomes": rental_incomes_data,
-            "long_term_capital_gain_u_s_112a": calc.round_off_decimal(long_term_capital_gains_112A),
-            "long_term_capital_gain_others": calc.round_off_decimal(long_term_capital_gains_others),
-            "short_term_capital_gain": calc.round_off_decimal(short_term_capital_gains),
-            "total_capital_gains_income": calc.round_off_decimal(total_capital_gains_income),
-            "business_incomes": business_incomes_data,
-            "total_income_from_business": calc.round_off_decimal(total_income_from_business),
-            "interest_income": calc.round_off_decimal(total_interest_income),
-            "dividend_income": calc.round_off_decimal(total_dividend_income),
-            "winnings_lotteries_games_bettings": calc.round_off_decimal(total_winnings_income),
-            "total_of_other_incomes": calc.round_off_decimal(total_interest_income + total_dividend_income + total_winnings_income),
-            "exempt_income": calc.round_off_decimal(total_exempt_income),
-            "net_income_from_agriculture": calc.round_off_decimal(total_net_income_from_agriculture),
-            "total_exempt_income": calc.round_off_decimal(total_combined_exempt_income),
-            "deduction_u_s_80c": calc.round_off_decimal(deduction_80c_sum),
-            "nps_contribution_u_s_ccd": calc.round_off_decimal(nps_contribution_sum),
-            "80d_medical_insurance_premium": calc.round_off_decimal(medical_premium_sum),
-            "80tta_interest_on_savings_acc": calc.round_off_decimal(interest_on_savings_sum),
-            "total_deduction_amount": calc.round_off_decimal(total_deduction_amount),
-            "tds_or_tcs": calc.round_off_decimal(total_tds_or_tcs),
-            "self_assessment_tax": calc.round_off_decimal(total_self_assessment_tax),
-            "advance_tax": calc.round_off_decimal(total_advance_tax),
-            "gross_total_income": calc.round_off_decimal(gross_total_income_old),
-            "total_income": calc.round_off_decimal(total_income_old),
-            "tax_liability_at_normal_rates": calc.round_off_decimal(tax_liability_old),
-            "tax_rebate": calc.round_off_decimal(tax_rebate_old),
-            "surcharge": calc.round_off_decimal(surcharge_old),
-            "cess": calc.round_off_decimal(cess_old),
-            "net_tax_payable": calc.round_off_decimal(net_tax_payable_old),
-            "balance_tax_to_be_paid": calc.round_off_decimal(balance_tax_to_be_paid_old),
-            "interest_u_s_234a_b_c": calc.round_off_decimal(total_interest_234_old),
-            "penalt_u_s_234f": calc.round_off_decimal(penalty_us_234F_old),
-            "tax_payable": calc.round_off_decimal(tax_payable_old),
-        }
-    }
-
-        pdf = self.render_to_pdf('itr_computations_old_regime_report.html', context)
-        if pdf:
-            response = HttpResponse(pdf, content_type='application/pdf')
-            filename = f"{slugify(tax_return.user.username)}-old-regime-computation.pdf"
-            content = f"inline; filename={filename}"
-            response['Content-Disposition'] = content
-            return response
-
-        return HttpResponse
+class IncomeTaxPdfView(ReportPdfView):
+    report_type = ReportArtifact.Summary
 
 
-class IncometaxComputationsNewPdfView(generics.GenericAPIView, GeneratePdfMixin):
-    permission_classes = [IsAuthenticated]
-
-    def get(self, request, *args, **kwargs):
-        encoded_income_tax_return_id = self.kwargs['income_tax_return_id']
-        income_tax_return_id = AlphaId.decode(encoded_income_tax_return_id)
-
-        try:
-            tax_return = IncomeTaxReturn.objects.get(id=income_tax_return_id, user=request.user)
-        except IncomeTaxReturn.DoesNotExist:
-            return HttpResponse("Invalid Income Tax Return ID or Unauthorized access.", status=404)
-
-        calc = IncomeTaxCalculations()
-        base_standard_deduction = Decimal('50000')
-
-        salary_incomes = tax_return.salary_incomes.all()
-        rental_incomes = tax_return.rental_incomes.all()
-        capital_gains = tax_return.capital_gains.all()
-        business_incomes = tax_return.business_income.all()
-        interest_incomes = tax_return.exempt_incomes.all()
-        dividend_incomes = tax_return.dividend_income.all()
-        exempt_incomes = tax_return.exempt_incomes_agriculture.all()
-        agriculture_incomes = tax_return.agriculture_income.all()
-
-        salary_incomes_data_new, _, total_income_from_salaries_new, _ = calc.calculate_salary_income(salary_incomes, base_standard_deduction)
-        rental_incomes_data, total_rental_income_new, _ = calc.calculate_rental_income(rental_incomes)
-        total_capital_gains_income, long_term_capital_gains_112A, long_term_capital_gains_others, short_term_capital_gains = calc.calculate_capital_gains(capital_gains)
-        business_incomes_data, total_income_from_business = calc.calculate_business_income(business_incomes)
-        total_interest_income = sum([i.interest_amount for i in interest_incomes])
-        total_dividend_income = sum([d.amount for d in dividend_incomes])
-        total_winnings_income = 0  # Assuming you handle this elsewhere
-        total_exempt_income = sum([e.amount for e in exempt_incomes])
-        total_net_income_from_agriculture = sum([agri_income.net_income for agri_income in agriculture_incomes])
-        total_combined_exempt_income = total_exempt_income + total_net_income_from_agriculture
-
-        deduction_80c_sum, nps_contribution_sum, medical_premium_sum, interest_on_savings_sum = calc.calculate_deductions(tax_return.deductions, interest_incomes)
-        total_deduction_amount = deduction_80c_sum + nps_contribution_sum + medical_premium_sum + interest_on_savings_sum
-
-        total_tds_or_tcs, total_self_assessment_tax, total_advance_tax = calc.calculate_tds_advance_tax(tax_return.tds_or_tcs_deduction.all(), tax_return.self_assesment_and_advance_tax_paid.all(), tax_return.income_tax_return_year.start_date, tax_return.income_tax_return_year.end_date)
-        gross_total_income_new = calc.calculate_gross_total_income(total_income_from_salaries_new, total_rental_income_new, total_income_from_business, total_capital_gains_income, total_interest_income, total_dividend_income, total_winnings_income, total_combined_exempt_income)
-        total_income_new = gross_total_income_new - total_deduction_amount
-        tax_liability_new = calc.calculate_tax_liability_new_regime(gross_total_income_new)
-        surcharge_new = calc.calculate_surcharge(gross_total_income_new, tax_liability_new, regime="new")
-        tax_rebate_new = calc.calculate_tax_rebate_new_regime(gross_total_income_new, tax_liability_new)
-        cess_new = calc.calculate_cess(tax_liability_new, surcharge_new, tax_rebate_new)
-        net_tax_payable_new = tax_liability_new + surcharge_new - tax_rebate_new + cess_new
-        balance_tax_to_be_paid_new = net_tax_payable_new - total_advance_tax - total_tds_or_tcs
-        total_interest_234_new = calc.calculate_interest_234A(balance_tax_to_be_paid_new, timezone.now().date(), tax_return.income_tax_return_year.due_date) + \
-                                 calc.calculate_interest_234B(balance_tax_to_be_paid_new, total_advance_tax, net_tax_payable_new) + \
-                                 calc.calculate_interest_234C(balance_tax_to_be_paid_new, total_advance_tax, net_tax_payable_new)
-        penalty_us_234F_new = calc.calculate_penalty_us_234F(total_income_new, timezone.now().date(), tax_return.income_tax_return_year.due_date)
-        tax_payable_new = balance_tax_to_be_paid_new + total_interest_234_new + penalty_us_234F_new
-
-        context = {
-            "new_regime_data": {
-                "salary_incomes": salary_incomes_data_new,
-                "total_income_from_salaries": calc.round_off_decimal(total_income_from_salaries_new),
-                "rental_incomes": rental_incomes_data,
-                "long_term_capital_gain_u_s_112a": calc.round_off_decimal(long_term_capital_gains_112A),
-                "long_term_capital_gain_others": calc.round_off_decimal(long_term_capital_gains_others),
-                "short_term_capital_gain": calc.round_off_decimal(short_term_capital_gains),
-                "total_capital_gains_income": calc.round_off_decimal(total_capital_gains_income),
-                "business_incomes": business_incomes_data,
-                "total_income_from_business": calc.round_off_decimal(total_income_from_business),
-                "interest_income": calc.round_off_decimal(total_interest_income),
-                "dividend_income": calc.round_off_decimal(total_dividend_income),
-                "winnings_lotteries_games_bettings": calc.round_off_decimal(total_winnings_income),
-                "total_of_other_incomes": calc.round_off_decimal(total_interest_income + total_dividend_income + total_winnings_income),
-                "exempt_income": calc.round_off_decimal(total_exempt_income),
-                "net_income_from_agriculture": calc.round_off_decimal(total_net_income_from_agriculture),
-                "total_exempt_income": calc.round_off_decimal(total_combined_exempt_income),
-                "deduction_u_s_80c": calc.round_off_decimal(deduction_80c_sum),
-                "nps_contribution_u_s_ccd": calc.round_off_decimal(nps_contribution_sum),
-                "80d_medical_insurance_premium": calc.round_off_decimal(medical_premium_sum),
-                "80tta_interest_on_savings_acc": calc.round_off_decimal(interest_on_savings_sum),
-                "total_deduction_amount": calc.round_off_decimal(total_deduction_amount),
-                "tds_or_tcs": calc.round_off_decimal(total_tds_or_tcs),
-                "self_assessment_tax": calc.round_off_decimal(total_self_assessment_tax),
-                "advance_tax": calc.round_off_decimal(total_advance_tax),
-                "gross_total_income": calc.round_off_decimal(gross_total_income_new),
-                "total_income": calc.round_off_decimal(total_income_new),
-                "tax_liability_at_normal_rates": calc.round_off_decimal(tax_liability_new),
-                "tax_rebate": calc.round_off_decimal(tax_rebate_new),
-                "surcharge": calc.round_off_decimal(surcharge_new),
-                "cess": calc.round_off_decimal(cess_new),
-                "net_tax_payable": calc.round_off_decimal(net_tax_payable_new),
-                "balance_tax_to_be_paid": calc.round_off_decimal(balance_tax_to_be_paid_new),
-                "interest_u_s_234a_b_c": calc.round_off_decimal(total_interest_234_new),
-                "penalt_u_s_234f": calc.round_off_decimal(penalty_us_234F_new),
-                "tax_payable": calc.round_off_decimal(tax_payable_new),
-            }
-        }
-
-        pdf = self.render_to_pdf('itr_computations_new_regime_report.html', context)
-        if pdf:
-            response = HttpResponse(pdf, content_type='application/pdf')
-            filename = f"{slugify(tax_return.user.username)}-new-regime-computation.pdf"
-            content = f"inline; filename={filename}"
-            response['Content-Disposition'] = content
-            return response
+class IncometaxComputationsOldPdfView(ReportPdfView):
+    report_type = ReportArtifact.OldRegimeComputation
 
-        return HttpResponse
 
+class IncometaxComputationsNewPdfView(ReportPdfView):
+    report_type = ReportArtifact.NewRegimeComputation
 
@@ -1,4 +1,6 @@
+import functools
 import hashlib
+import itertools
 import logging as lg
 import math
 from django.conf import settings
@@ -21,72 +23,36 @@ class AlphaId(object):
         sorted_list = sorted([(passhash[var], alphabet[var]) for var in range(len(alphabet))])
         return u''.join([val[1] for val in sorted_list])
 
+    @classmethod
+    @functools.lru_cache(maxsize=None)
+    def get_codec(cls, passkey, use_alternate_alphabet):
+        """
+        Jumbled alphabet, character positions and base powers, computed once per passkey and alphabet.
+        """
+        alphabet = cls.ALTERNATE_ALPHABET if use_alternate_alphabet else cls.ALPHABET
+        if passkey:
+            alphabet = cls.__jumble_alphabet(alphabet, passkey.encode('utf-8'))
+        return AlphaIdCodec(alphabet)
+
     @classmethod
     def encode(cls, number, passkey=settings.SECRET_KEY, use_alternate_alphabet=False, prime_number=None):
-        cached_result = AlphaIdCollection.alpha_encoded_cache.get(number)
-        if cached_result:
-            return cached_result
-        else:
-            alphabet = cls.ALTERNATE_ALPHABET if use_alternate_alphabet else cls.ALPHABET
-            if passkey:
-                passkey = passkey.encode('utf-8')
-                alphabet = cls.__jumble_alphabet(alphabet, passkey)
-            base = len(alphabet)
-
-            copy_number = number
-            pad = cls.MINLEN - 1
-            number = int(int(number) * (prime_number or cls.PRIME_NUMBER) + pow(base, pad))
-            encoded_number = []
-            t_log = int(math.log(number, base))
-
-            while True:
-                bcp = int(pow(base, t_log))
-                reduced_number = (number // bcp) % base
-                encoded_number.append(alphabet[reduced_number])
-                number -= reduced_number * bcp
-                t_log -= 1
-                if t_log < 0:
-                    break
-            encoded_result = u"{}".format(u"".join(reversed(encoded_number)))
-
-            AlphaIdCollection.set_encoded_value(copy_number, encoded_result)
-            return encoded_result
+        return AlphaIdCollection.encoded_cache(number, passkey, use_alternate_alphabet, prime_number)
 
     @classmethod
     def decode(cls, string, passkey=settings.SECRET_KEY, use_alternate_alphabet=False, prime_number=None):
         if string is None:
             return string
-        cached_result = AlphaIdCollection.alpha_decoded_cache.get(string)
-        if cached_result:
-            return cached_result
-        else:
-            alphabet = cls.ALPHABET if not use_alternate_alphabet else cls.ALTERNATE_ALPHABET
-            if passkey:
-                passkey = passkey.encode('utf-8')
-                alphabet = cls.__jumble_alphabet(alphabet, passkey)
-            base = len(alphabet)
-            copy_string = string
-            string = u"".join(reversed(string))
-            s_number = 0
-            len_string = len(string) - 1
-            t_number = 0
-
-            while True:
-                bcpow = int(pow(base, len_string - t_number))
-                try:
-                    s_number += alphabet.index(string[t_number:t_number + 1]) * bcpow
-                except ValueError:
-                    return -1
-                t_number += 1
-                if t_number > len_string:
-                    break
-
-            pad = cls.MINLEN - 1
-            s_number = int(s_number - pow(base, pad))
-
-            decoded_number = s_number // (prime_number or cls.PRIME_NUMBER)
-            AlphaIdCollection.set_decoded_value(copy_string, decoded_number)
-            return decoded_number
+        return AlphaIdCollection.decoded_cache(string, passkey, use_alternate_alphabet, prime_number)
+
+    @classmethod
+    def compute_encoded(cls, number, passkey=settings.SECRET_KEY, use_alternate_alphabet=False, prime_number=None):
+        codec = cls.get_codec(passkey, use_alternate_alphabet)
+        return codec.encode(number, prime_number or cls.PRIME_NUMBER, cls.MINLEN - 1)
+
+    @classmethod
+    def compute_decoded(cls, string, passkey=settings.SECRET_KEY, use_alternate_alphabet=False, prime_number=None):
+        codec = cls.get_codec(passkey, use_alternate_alphabet)
+        return codec.decode(string, prime_number or cls.PRIME_NUMBER, cls.MINLEN - 1)
 
     @classmethod
     def decode_if_encoded(cls, string, *args, **kwargs):
@@ -99,47 +65,107 @@ class AlphaId(object):
 
     @classmethod
     def decode_list(cls, string_list, passkey=settings.SECRET_KEY, use_alternate_alphabet=False, prime_number=None):
-        return [AlphaId.decode(string, passkey, use_alternate_alphabet, prime_number) for string in string_list]
+        """
+        Decode a page of ids with one codec lookup, repeated strings are decoded once and the caches are bypassed.
+        """
+        codec = cls.get_codec(passkey, use_alternate_alphabet)
+        prime_number = prime_number or cls.PRIME_NUMBER
+        decoded = {None: None}
+        for string in string_list:
+            if string not in decoded:
+                decoded[string] = codec.decode(string, prime_number, cls.MINLEN - 1)
+        return [decoded[string] for string in string_list]
 
     @classmethod
     def encode_list(cls, number_list, passkey=settings.SECRET_KEY, use_alternate_alphabet=False, prime_number=None):
-        return [AlphaId.encode(number, passkey, use_alternate_alphabet, prime_number) for number in number_list]
+        """
+        Encode a page of ids with one codec lookup, repeated ids are encoded once and the caches are bypassed.
+        """
+        codec = cls.get_codec(passkey, use_alternate_alphabet)
+        prime_number = prime_number or cls.PRIME_NUMBER
+        encoded = {}
+        for number in number_list:
+            if number not in encoded:
+                encoded[number] = codec.encode(number, prime_number, cls.MINLEN - 1)
+        return [encoded[number] for number in number_list]
 
 
-class AlphaIdCollection(object):
+class AlphaIdCodec(object):
     """
-    Class to keep the Encoded AlphaId in app memory
+    One jumbled alphabet with the position of every character and the powers of its base precomputed.
     """
-    # variable to be used globally for the already calculated alpha ids.
-    alpha_encoded_cache = {}
-    alpha_decoded_cache = {}
-
-    @classmethod
-    def set_encoded_value(cls, key, value):
+    PRECOMPUTED_POWERS = 32
+
+    def __init__(self, alphabet):
+        self.alphabet = alphabet
+        self.base = len(alphabet)
+        # the alphabet repeats the digits, so a character can stand for more than one position.
+        self.positions = {}
+        for position, character in enumerate(alphabet):
+            self.positions.setdefault(character, []).append(position)
+        self.powers = [pow(self.base, exponent) for exponent in range(self.PRECOMPUTED_POWERS)]
+
+    def power(self, exponent):
+        if exponent < self.PRECOMPUTED_POWERS:
+            return self.powers[exponent]
+        return pow(self.base, exponent)
+
+    def encode(self, number, prime_number, pad):
+        base = self.base
+        number = int(int(number) * prime_number + self.power(pad))
+        encoded_number = []
+        t_log = int(math.log(number, base))
+
+        while True:
+            bcp = self.power(t_log)
+            reduced_number = (number // bcp) % base
+            encoded_number.append(self.alphabet[reduced_number])
+            number -= reduced_number * bcp
+            t_log -= 1
+            if t_log < 0:
+                break
+        return u"{}".format(u"".join(reversed(encoded_number)))
+
+    def decode(self, string, prime_number, pad):
         """
-        Class Method, used to update the encoded cache
-        :param key
-        :param value
-        :type key : Type should be an integer value
-        :type value : Type String
+        The number string was encoded from. A repeated digit is read at whichever of its positions gives a number
+        encode() could have produced, a multiple of prime_number once the pad is taken off, the smallest one when
+        several do. A string no number encodes to is read at the first positions.
         """
-        cls.alpha_encoded_cache[key] = value
+        s_number = 0
+        offsets = []
+        # the last character is the most significant digit.
+        for t_number, character in enumerate(string):
+            try:
+                first, *others = self.positions[character]
+            except KeyError:
+                return -1
+            s_number += first * self.power(t_number)
+            if others:
+                offsets.append([0] + [(position - first) * self.power(t_number) for position in others])
+        s_number = int(s_number - self.power(pad))
+        candidates = [s_number + sum(combination) for combination in itertools.product(*offsets)]
+        encoded = [candidate for candidate in candidates if candidate % prime_number == 0]
+        return min(encoded or [s_number]) // prime_number
 
-    @classmethod
-    def set_decoded_value(cls, key, value):
-        """
-        Class Method, used to update the decoded cache
-        :param key
-        :param value
-        :type key : Type String
-        :type value : Type should be an integer value
-        """
-        cls.alpha_decoded_cache[key] = value
 
+class AlphaIdCollection(object):
+    """
+    Class to keep the Encoded AlphaId in app memory.
+    Both caches are LRUs bounded by settings.ALPHAID_CACHE_SIZE and filled lazily, cache_info() reports their
+    hits and misses.
+    """
+    encoded_cache = staticmethod(functools.lru_cache(maxsize=settings.ALPHAID_CACHE_SIZE)(AlphaId.compute_encoded))
+    decoded_cache = staticmethod(functools.lru_cache(maxsize=settings.ALPHAID_CACHE_SIZE)(AlphaId.compute_decoded))
 
-# Added inline To load the Alpha ids at the time of server start or app initialization
+    @classmethod
+    def cache_info(cls):
+        return {
+            'encoded': cls.encoded_cache.cache_info()._asdict(),
+            'decoded': cls.decoded_cache.cache_info()._asdict(),
+        }
 
-for i in range(settings.PRELOAD_ALPHAID_LIMIT):
-    encoded_val = AlphaId.encode(i)
-    AlphaIdCollection.set_encoded_value(i, encoded_val)
-    AlphaIdCollection.set_decoded_value(encoded_val, i)
+    @classmethod
+    def cache_clear(cls):
+        cls.encoded_cache.cache_clear()
+        cls.decoded_cache.cache_clear()
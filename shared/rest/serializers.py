@@ -1,4 +1,4 @@
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.relations import RelatedField
@@ -14,14 +14,79 @@ from rest_framework.fields import (  # NOQA # isort:skip
 )
 
 
+class EncodedIdListSerializer(serializers.ListSerializer):
+    """
+    Encodes the ids of every row of the page, and the ids of their foreign keys, with one AlphaId.encode_list
+    call before the rows are serialized. The child serializer and its related fields read them from
+    child.encoded_ids instead of encoding one id at a time.
+    """
+
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.manager.BaseManager) else data
+        instances = list(iterable)
+        ids = set()
+        attnames = self.get_encoded_attnames()
+        for instance in instances:
+            if isinstance(instance, models.Model):
+                ids.update(getattr(instance, attname) for attname in attnames)
+        ids.discard(None)
+        ids = list(ids)
+        self.child.encoded_ids = dict(zip(ids, AlphaId.encode_list(ids)))
+        return super().to_representation(instances)
+
+    def get_encoded_attnames(self):
+        attnames = ['pk']
+        model = getattr(getattr(self.child, 'Meta', None), 'model', None)
+        if model is None:
+            return attnames
+        for field in self.child.fields.values():
+            if not isinstance(field, (StringPrimaryKeyRelatedField, BasePrimaryKeyRelatedField)):
+                continue
+            if getattr(field, 'pk_field', None) is not None or len(field.source_attrs) != 1:
+                continue
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                continue
+            if (model_field.many_to_one or model_field.one_to_one) and model_field.concrete:
+                attnames.append(model_field.attname)
+        return attnames
+
+
+def encode_id(serializer, value):
+    """
+    Encoded value of an id, taken from the page encoded by EncodedIdListSerializer when there is one.
+    """
+    encoded_ids = getattr(serializer, 'encoded_ids', None)
+    if encoded_ids and value in encoded_ids:
+        return encoded_ids[value]
+    return AlphaId.encode(value)
+
+
 class EncodeAlphaID:
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """
+        DRF's many_init, with EncodedIdListSerializer as the list serializer unless Meta declares its own.
+        """
+        list_kwargs = {}
+        for key in serializers.LIST_SERIALIZER_KWARGS_REMOVE:
+            value = kwargs.pop(key, None)
+            if value is not None:
+                list_kwargs[key] = value
+        list_kwargs['child'] = cls(*args, **kwargs)
+        list_kwargs.update({key: value for key, value in kwargs.items() if key in serializers.LIST_SERIALIZER_KWARGS})
+        meta = getattr(cls, 'Meta', None)
+        list_serializer_class = getattr(meta, 'list_serializer_class', EncodedIdListSerializer)
+        return list_serializer_class(*args, **list_kwargs)
+
     def get_id(self, instance):
         id_ = ""
         if type(instance) is dict:
             if "id" in instance:
                 id_ = AlphaId.encode(instance["id"])
         else:
-            id_ = AlphaId.encode(instance.id)
+            id_ = encode_id(self, instance.id)
         return id_
 
 
@@ -54,7 +119,7 @@ class BasePrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
     def to_representation(self, value):
         value = super().to_representation(value)
         if self.use_pk_only_optimization():
-            value = AlphaId.encode(value)
+            value = encode_id(self.parent, value)
         return value
 
     def to_internal_value(self, data):
@@ -122,7 +187,7 @@ class StringPrimaryKeyRelatedField(RelatedField):
     def to_representation(self, value):
         if self.pk_field is not None:
             return self.pk_field.to_representation(value.pk)
-        return AlphaId.encode(value.pk)
+        return encode_id(self.parent, value.pk)
 
 
 class BaseModelSerializer(EncodeAlphaID, serializers.ModelSerializer):